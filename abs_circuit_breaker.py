@@ -0,0 +1,100 @@
+import os
+import time
+import logging
+from typing import Dict, Any
+from threading import Lock
+
+class CircuitOpenError(RuntimeError):
+    """Raised for requests rejected while the upstream circuit is open"""
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream that keeps failing.
+
+    Closed: calls pass, and `failure_threshold` consecutive failures open
+    the breaker. Open: calls are rejected for `reset_timeout` seconds.
+    Half-open: up to `half_open_probes` calls are let through as probes; a
+    success closes the breaker again and a failure re-opens it. A
+    `failure_threshold` of 0 disables the breaker.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, half_open_probes: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.current = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.trips = 0
+        self.lock = Lock()
+
+    @classmethod
+    def from_env(cls) -> 'CircuitBreaker':
+        """Build a breaker from ABS_CIRCUIT_FAILURE_THRESHOLD and ABS_CIRCUIT_RESET_SECONDS"""
+        return cls(
+            failure_threshold=int(os.getenv('ABS_CIRCUIT_FAILURE_THRESHOLD', 5)),
+            reset_timeout=float(os.getenv('ABS_CIRCUIT_RESET_SECONDS', 30))
+        )
+
+    def _update(self) -> str:
+        # An open breaker turns half-open once the reset timeout has passed
+        if self.current == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+            self.current = self.HALF_OPEN
+            self.probes = 0
+            logging.info("Circuit half-open, probing upstream")
+        return self.current
+
+    def is_open(self) -> bool:
+        """Whether calls are currently rejected outright (probes are not counted)"""
+        with self.lock:
+            return self._update() == self.OPEN
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead; in the half-open state this takes a probe slot"""
+        with self.lock:
+            state = self._update()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and self.probes < self.half_open_probes:
+                self.probes += 1
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """Report a call the upstream answered"""
+        with self.lock:
+            if self.current != self.CLOSED:
+                logging.info("Circuit closed, upstream recovered")
+            self.current = self.CLOSED
+            self.failures = 0
+            self.probes = 0
+
+    def record_failure(self) -> None:
+        """Report a call that failed because of the upstream (timeout, connection error, 5xx)"""
+        with self.lock:
+            self.failures += 1
+            if self.failure_threshold <= 0:
+                return
+            state = self._update()
+            if state == self.HALF_OPEN or (state == self.CLOSED and self.failures >= self.failure_threshold):
+                self.current = self.OPEN
+                self.opened_at = self.clock()
+                self.trips += 1
+                logging.warning(f"Circuit open after {self.failures} consecutive upstream failures")
+
+    def state(self) -> Dict[str, Any]:
+        with self.lock:
+            state = self._update()
+            return {
+                'state': state,
+                'consecutive_failures': self.failures,
+                'trips': self.trips,
+                'retry_in': round(max(0.0, self.opened_at + self.reset_timeout - self.clock()), 3)
+                if state == self.OPEN else 0.0
+            }
@@ -0,0 +1,224 @@
+import os
+import logging
+import json
+import sqlite3
+import time
+import zlib
+from typing import Dict, Any, Optional, Tuple
+from queue import Queue
+from threading import Thread, Lock
+
+class DiskCache:
+    """
+    SQLite-backed response cache that survives process restarts.
+
+    Entries keep their absolute expiry time and their ETag/Last-Modified
+    validators, so TTLs and conditional revalidation carry over a restart.
+    Writes are applied by a background writer thread (write-behind), and
+    the total payload size is bounded by `max_bytes`: expired entries are
+    evicted first, then the least recently used ones. Reads never write:
+    access times are collected and applied in batches by the writer, and
+    expired entries are left to clear_expired. The database is only
+    opened on first use.
+    """
+    # Queue item asking the writer to apply the pending access times
+    TOUCH = object()
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, compress: bool = False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.conn = None
+        self.lock = Lock()
+        # Separate read connection: with WAL, reads never wait on the writer
+        self.read_conn = None
+        self.read_lock = Lock()
+        self.write_queue = Queue()
+        self.writer_thread = None
+        # Access times of entries read since the writer last applied them
+        self.touched: Dict[str, float] = {}
+        self.touch_lock = Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional['DiskCache']:
+        """
+        Build a disk cache from ABS_DISK_CACHE_PATH, ABS_DISK_CACHE_MAX_MB and
+        ABS_DISK_CACHE_COMPRESS; returns None when no path is configured
+        
+        With ABS_SHARED_DIR set the cache defaults to a database in that
+        directory, shared by every worker process on the host.
+        """
+        path = os.getenv('ABS_DISK_CACHE_PATH')
+        if not path and os.getenv('ABS_SHARED_DIR'):
+            path = os.path.join(os.getenv('ABS_SHARED_DIR'), 'abs_cache.sqlite3')
+        if not path:
+            return None
+        return cls(
+            path=path,
+            max_bytes=int(float(os.getenv('ABS_DISK_CACHE_MAX_MB', 256)) * 1024 * 1024),
+            compress=os.getenv('ABS_DISK_CACHE_COMPRESS', 'false').lower() in ('1', 'true', 'yes')
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use (caller holds the lock)"""
+        if self.conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, compressed INTEGER NOT NULL, '
+                'size INTEGER NOT NULL, expiry REAL NOT NULL, accessed REAL NOT NULL, validators TEXT)'
+            )
+            # Databases written before validators were kept
+            columns = [row[1] for row in self.conn.execute('PRAGMA table_info(entries)')]
+            if 'validators' not in columns:
+                self.conn.execute('ALTER TABLE entries ADD COLUMN validators TEXT')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+            self.conn.commit()
+            logging.info(f"Disk cache opened at {self.path}")
+        return self.conn
+
+    def _reader(self) -> sqlite3.Connection:
+        """Open the read connection on first use (caller holds the read lock)"""
+        if self.read_conn is None:
+            with self.lock:
+                # Creates the database and schema if needed
+                self._connect()
+            self.read_conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        return self.read_conn
+
+    def _encode(self, value: Dict) -> Tuple[bytes, int]:
+        payload = json.dumps(value, separators=(',', ':')).encode('utf-8')
+        if self.compress:
+            return zlib.compress(payload, 6), 1
+        return payload, 0
+
+    def _decode(self, payload: bytes, compressed: int) -> Dict:
+        if compressed:
+            payload = zlib.decompress(payload)
+        return json.loads(payload)
+
+    def get_entry(self, key: str) -> Optional[Tuple[Dict, float, Optional[Dict]]]:
+        """Return (value, expiry, validators) for a live entry"""
+        with self.read_lock:
+            row = self._reader().execute(
+                'SELECT value, compressed, expiry, validators FROM entries WHERE key = ?', (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        payload, compressed, expiry, validators = row
+        if expiry < time.time():
+            return None
+        self._touch(key)
+        return self._decode(payload, compressed), expiry, json.loads(validators) if validators else None
+
+    def _touch(self, key: str) -> None:
+        """Record an access; the first one since the last batch wakes the writer"""
+        with self.touch_lock:
+            first = not self.touched
+            self.touched[key] = time.time()
+        if first:
+            self._start_writer()
+            self.write_queue.put(self.TOUCH)
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def _start_writer(self) -> None:
+        if self.writer_thread is None:
+            with self.lock:
+                if self.writer_thread is None:
+                    self.writer_thread = Thread(target=self._write_behind, daemon=True)
+                    self.writer_thread.start()
+
+    def set(self, key: str, value: Dict, ttl: int = 3600, validators: Optional[Dict] = None) -> None:
+        """Queue an entry (with its ETag/Last-Modified validators) to be written by the background writer"""
+        self._start_writer()
+        self.write_queue.put((key, value, time.time() + ttl, validators))
+
+    def flush(self) -> None:
+        """Wait until all queued writes are on disk"""
+        if self.writer_thread is not None:
+            self.write_queue.join()
+
+    def _write_behind(self) -> None:
+        while True:
+            item = self.write_queue.get()
+            try:
+                if item is self.TOUCH:
+                    self._apply_touches()
+                else:
+                    self._write(*item)
+            except Exception as e:
+                logging.error(f"Disk cache write error: {str(e)}")
+            finally:
+                self.write_queue.task_done()
+
+    def _write(self, key: str, value: Dict, expiry: float, validators: Optional[Dict]) -> None:
+        payload, compressed = self._encode(value)
+        with self.lock:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO entries (key, value, compressed, size, expiry, accessed, validators) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, payload, compressed, len(payload), expiry, time.time(),
+                 json.dumps(validators) if validators else None)
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def _apply_touches(self) -> None:
+        """Write the pending access times in one transaction"""
+        with self.touch_lock:
+            touched, self.touched = self.touched, {}
+        if not touched:
+            return
+        with self.lock:
+            conn = self._connect()
+            conn.executemany(
+                'UPDATE entries SET accessed = ? WHERE key = ?',
+                [(accessed, key) for key, accessed in touched.items()]
+            )
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Bring the total size under max_bytes (caller holds the lock)"""
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        conn.execute('DELETE FROM entries WHERE expiry < ?', (time.time(),))
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evict_keys = []
+        for key, size in conn.execute('SELECT key, size FROM entries ORDER BY accessed'):
+            if total <= self.max_bytes:
+                break
+            evict_keys.append((key,))
+            total -= size
+        conn.executemany('DELETE FROM entries WHERE key = ?', evict_keys)
+        logging.debug(f"Disk cache evicted {len(evict_keys)} entries")
+
+    def clear_expired(self) -> None:
+        """Remove expired entries"""
+        with self.lock:
+            conn = self._connect()
+            conn.execute('DELETE FROM entries WHERE expiry < ?', (time.time(),))
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            count, total = self._connect().execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries'
+            ).fetchone()
+        return {
+            'entries': count,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'pending_writes': self.write_queue.qsize()
+        }
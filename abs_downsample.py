@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+# Resample frequencies and the pandas period they map to
+RESAMPLE_RULES = {'quarterly': 'Q', 'annual': 'Y'}
+RESAMPLE_LABELS = {'quarterly': '%Y-Q%q', 'annual': '%Y'}
+RESAMPLE_METHODS = ('mean', 'last')
+
+# Fewest points a downsampled series can have (first, last and one bucket's low and high)
+MIN_POINTS = 4
+
+def resample_series(frame: pd.DataFrame, frequency: str, method: str = 'mean') -> pd.DataFrame:
+    """
+    Aggregate monthly observations into quarters or years for every region at once
+
+    The current quarter or year is built from the months published so far.
+
+    Args:
+        frame: DataFrame with region, period (datetime64) and value columns
+        frequency: 'quarterly' or 'annual'
+        method: 'mean' of the months in each period, or the 'last' month's value
+
+    Returns:
+        DataFrame with region, date (YYYY-Qn or YYYY label), period (start of
+        the quarter or year) and value columns, sorted by region and period
+    """
+    if frequency not in RESAMPLE_RULES:
+        raise ValueError(f"Unsupported resample frequency: {frequency}")
+    if method not in RESAMPLE_METHODS:
+        raise ValueError(f"Unsupported resample method: {method}")
+
+    buckets = frame['period'].dt.to_period(RESAMPLE_RULES[frequency]).rename('bucket')
+    grouped = frame.groupby([frame['region'], buckets], sort=True)['value']
+    resampled = (grouped.mean() if method == 'mean' else grouped.last()).reset_index()
+
+    bucket_index = pd.PeriodIndex(resampled['bucket'])
+    resampled['date'] = bucket_index.strftime(RESAMPLE_LABELS[frequency])
+    resampled['period'] = bucket_index.start_time
+    return resampled[['region', 'date', 'period', 'value']]
+
+def downsample_series(frame: pd.DataFrame, max_points: int) -> pd.DataFrame:
+    """
+    Reduce every region's series to at most max_points points, keeping its shape
+
+    Series longer than max_points are cut into equal-count buckets, and the
+    lowest and highest observation of each bucket are kept together with the
+    first and last observation, so peaks, troughs and the latest value
+    survive. All regions are bucketed in one grouped pass.
+
+    Args:
+        frame: DataFrame with region and value columns, sorted by period
+        max_points: Maximum points per region (at least MIN_POINTS)
+
+    Returns:
+        The selected rows of frame, in their original order
+    """
+    if max_points < MIN_POINTS:
+        raise ValueError(f"max_points must be at least {MIN_POINTS}")
+
+    frame = frame.reset_index(drop=True)
+    regions = frame.groupby('region', sort=False)
+    position = regions.cumcount().to_numpy()
+    length = regions['value'].transform('size').to_numpy()
+
+    short = length <= max_points
+    endpoint = (position == 0) | (position == length - 1)
+    interior = ~short & ~endpoint & frame['value'].notna().to_numpy()
+
+    # Interior points 1..length-2 fall into (max_points - 2) // 2 buckets
+    bucket_count = (max_points - 2) // 2
+    bucket = (position - 1) * bucket_count // np.maximum(length - 2, 1)
+    candidates = pd.DataFrame({
+        'region': frame['region'].to_numpy()[interior],
+        'bucket': bucket[interior],
+        'value': frame['value'].to_numpy()[interior]
+    }, index=np.flatnonzero(interior))
+    buckets = candidates.groupby(['region', 'bucket'], sort=False)['value']
+
+    selected = np.concatenate([
+        np.flatnonzero(short | endpoint),
+        buckets.idxmin().to_numpy(dtype=np.int64),
+        buckets.idxmax().to_numpy(dtype=np.int64)
+    ])
+    return frame.take(np.unique(selected))
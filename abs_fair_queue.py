@@ -0,0 +1,153 @@
+import math
+import time
+import itertools
+from collections import OrderedDict
+from queue import Empty
+from heapq import heappush, heappop, heapify
+from threading import Lock, Condition
+from typing import Dict, Any, Optional, List, Tuple, Callable, Hashable
+
+class FairRequestQueue:
+    """
+    Priority queue that shares the dispatcher fairly between clients.
+
+    Requests are kept in one heap per client, in priority order and FIFO
+    within a priority. Waiting requests age: every `aging_interval` seconds
+    in the queue raises a request by one priority level, so low-priority
+    work cannot starve. `get` serves the clients whose next request has the
+    best aged priority in round robin order, so a client that queues many
+    requests takes turns with everyone else instead of holding the upstream
+    lane until its backlog is done.
+
+    Items need `priority` (lower = more urgent), `timestamp` (time.time()
+    when queued) and `client` attributes. put/get/task_done/join/qsize
+    behave like queue.PriorityQueue.
+    """
+    def __init__(self, aging_interval: float = 30.0):
+        self.aging_interval = aging_interval
+        # Per-client heaps of (aged priority, sequence, item), least
+        # recently served client first
+        self.clients: 'OrderedDict[Hashable, List[Tuple[float, int, Any]]]' = OrderedDict()
+        self.sequence = itertools.count()
+        self.size = 0
+        self.unfinished = 0
+        self.mutex = Lock()
+        self.not_empty = Condition(self.mutex)
+        self.all_tasks_done = Condition(self.mutex)
+
+    def _aged(self, item: Any) -> float:
+        # Orders like "priority minus the aging intervals waited" at any
+        # moment, but stays constant while the item is queued
+        if self.aging_interval <= 0:
+            return float(item.priority)
+        return item.priority + item.timestamp / self.aging_interval
+
+    def _level(self, aged: float, now: float) -> float:
+        """Aged priority level of a heap entry at `now`"""
+        if self.aging_interval <= 0:
+            return aged
+        return math.ceil(aged - now / self.aging_interval)
+
+    def _push(self, item: Any) -> None:
+        heap = self.clients.get(item.client)
+        if heap is None:
+            heap = self.clients[item.client] = []
+        heappush(heap, (self._aged(item), next(self.sequence), item))
+        self.size += 1
+
+    def _pop(self, accept: Optional[Callable[[Any], bool]] = None) -> Optional[Any]:
+        """Remove and return the next item to serve (among items passing `accept`)"""
+        now = time.time()
+        best = None
+        for client, heap in self.clients.items():
+            if accept is None:
+                index = 0
+            else:
+                matching = [i for i, entry in enumerate(heap) if accept(entry[2])]
+                if not matching:
+                    continue
+                index = min(matching, key=lambda i: heap[i])
+            level = self._level(heap[index][0], now)
+            # Ties go to the client served least recently
+            if best is None or level < best[0]:
+                best = (level, client, index)
+        if best is None:
+            return None
+
+        _, client, index = best
+        heap = self.clients[client]
+        if index == 0:
+            entry = heappop(heap)
+        else:
+            entry = heap[index]
+            heap[index] = heap[-1]
+            heap.pop()
+            heapify(heap)
+        if heap:
+            self.clients.move_to_end(client)
+        else:
+            del self.clients[client]
+        self.size -= 1
+        return entry[2]
+
+    def put(self, item: Any) -> None:
+        """Queue a request"""
+        with self.mutex:
+            self._push(item)
+            self.unfinished += 1
+            self.not_empty.notify()
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        """
+        Remove and return the next request to serve
+
+        Raises:
+            queue.Empty: if no request is available (non-blocking or timed out)
+        """
+        with self.not_empty:
+            if not self.not_empty.wait_for(lambda: self.size > 0, timeout if block else 0):
+                raise Empty
+            return self._pop()
+
+    def reschedule(self, item: Any, accept: Callable[[Any], bool]) -> Any:
+        """
+        Put back a request taken with `get` and return the request to serve
+        in its place
+
+        Used when a request waited (e.g. for a rate limit token) after it was
+        taken and more urgent requests may have been queued meanwhile. Only
+        requests passing `accept` are considered, which always includes
+        `item` itself. The task count is unchanged.
+        """
+        with self.mutex:
+            self._push(item)
+            return self._pop(accept)
+
+    def task_done(self) -> None:
+        """Mark a request returned by `get` as processed"""
+        with self.all_tasks_done:
+            if self.unfinished <= 0:
+                raise ValueError('task_done() called too many times')
+            self.unfinished -= 1
+            if self.unfinished == 0:
+                self.all_tasks_done.notify_all()
+
+    def join(self) -> None:
+        """Block until every queued request has been processed"""
+        with self.all_tasks_done:
+            self.all_tasks_done.wait_for(lambda: self.unfinished == 0)
+
+    def qsize(self) -> int:
+        with self.mutex:
+            return self.size
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Queued requests in total and per client"""
+        with self.mutex:
+            return {
+                'depth': self.size,
+                'clients': {str(client): len(heap) for client, heap in self.clients.items()}
+            }
@@ -0,0 +1,128 @@
+from dataclasses import dataclass
+from typing import Dict, Any, List
+import numpy as np
+import pandas as pd
+
+# Trailing windows (in months) of the rolling means
+ROLLING_WINDOWS = (3, 12)
+
+# Months between a value and the one it is compared with year on year
+YEAR_PERIODS = 12
+
+@dataclass
+class RegionMatrix:
+    # Row labels, in order of first appearance
+    regions: List[str]
+    # YYYY-MM label of every column; columns are consecutive months
+    labels: np.ndarray
+    # Observation values (regions x months), NaN where a month is missing
+    values: np.ndarray
+
+def align_regions(frame: pd.DataFrame) -> RegionMatrix:
+    """
+    Scatter every region's monthly observations into one dense matrix
+
+    Columns span every month from the earliest to the latest observation,
+    so a lag of k columns is a lag of k months for all regions at once.
+    When a region has several rows for a month (several series) the last
+    one is kept.
+
+    Args:
+        frame: DataFrame with region, period (datetime64) and value columns
+
+    Returns:
+        RegionMatrix of the observations
+    """
+    months = frame['period'].to_numpy().astype('datetime64[M]')
+    known = ~np.isnat(months)
+    region_codes, regions = pd.factorize(frame['region'], sort=False)
+    if not known.any():
+        raise ValueError("No dated observations to align")
+
+    month_numbers = months[known].astype(np.int64)
+    first = month_numbers.min()
+    values = np.full((len(regions), month_numbers.max() - first + 1), np.nan)
+    values[region_codes[known], month_numbers - first] = frame['value'].to_numpy(np.float64)[known]
+
+    labels = np.arange(first, first + values.shape[1]).astype('datetime64[M]').astype(str)
+    return RegionMatrix(regions=list(regions), labels=labels, values=values)
+
+def compute_indicators(matrix: RegionMatrix) -> Dict[str, np.ndarray]:
+    """
+    Compute every region's indicators in one vectorized pass over the matrix
+
+    Indicators are taken at each region's latest observed month; those
+    that need a missing month (or one before the range) are NaN.
+
+    Returns:
+        Arrays with one entry per region:
+            - latest: index of the latest observed month (-1 if none)
+            - value: latest value
+            - month_on_month, year_on_year: change from 1 and 12 months before
+            - rolling_mean_<n>: mean of the observed values in the trailing
+              n months (for every n in ROLLING_WINDOWS)
+            - rank: position of the latest value across regions (1 = highest)
+    """
+    values = matrix.values
+    observed = ~np.isnan(values)
+    region_count, month_count = values.shape
+    rows = np.arange(region_count)
+
+    has_data = observed.any(axis=1)
+    latest = np.where(has_data, month_count - 1 - np.argmax(observed[:, ::-1], axis=1), -1)
+    value = np.where(has_data, values[rows, np.maximum(latest, 0)], np.nan)
+
+    def lagged(months: int) -> np.ndarray:
+        columns = latest - months
+        in_range = has_data & (columns >= 0)
+        return np.where(in_range, values[rows, np.maximum(columns, 0)], np.nan)
+
+    indicators = {
+        'latest': latest,
+        'value': value,
+        'month_on_month': value - lagged(1),
+        'year_on_year': value - lagged(YEAR_PERIODS)
+    }
+
+    # Prefix sums turn every trailing window into two lookups
+    zero = np.zeros((region_count, 1))
+    sums = np.hstack([zero, np.cumsum(np.where(observed, values, 0.0), axis=1)])
+    counts = np.hstack([zero, np.cumsum(observed, axis=1)])
+    end = latest + 1
+    for window in ROLLING_WINDOWS:
+        start = end - window
+        in_range = has_data & (start >= 0)
+        start = np.maximum(start, 0)
+        window_count = counts[rows, end] - counts[rows, start]
+        window_sum = sums[rows, end] - sums[rows, start]
+        indicators[f"rolling_mean_{window}"] = np.where(
+            in_range & (window_count > 0), window_sum / np.maximum(window_count, 1), np.nan
+        )
+
+    # Ties share the best rank; NaN compares false so regions without data are not counted
+    higher = (value[np.newaxis, :] > value[:, np.newaxis]).sum(axis=1)
+    indicators['rank'] = np.where(has_data, higher + 1, np.nan)
+    return indicators
+
+def _number(value: float) -> Any:
+    return None if np.isnan(value) else float(value)
+
+def region_indicators(matrix: RegionMatrix) -> Dict[str, Dict[str, Any]]:
+    """
+    JSON-ready indicators per region (None where an indicator is undefined)
+
+    Returns:
+        Dictionary mapping region code to its latest_date, value,
+        month_on_month, year_on_year, rolling means and rank
+    """
+    indicators = compute_indicators(matrix)
+    names = [name for name in indicators if name not in ('latest', 'rank')]
+    result = {}
+    for i, region in enumerate(matrix.regions):
+        latest = indicators['latest'][i]
+        result[region] = {
+            'latest_date': str(matrix.labels[latest]) if latest >= 0 else None,
+            **{name: _number(indicators[name][i]) for name in names},
+            'rank': None if np.isnan(indicators['rank'][i]) else int(indicators['rank'][i])
+        }
+    return result
@@ -0,0 +1,45 @@
+import os
+import sys
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from threading import Lock
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_listener = None
+_log_files = set()
+_lock = Lock()
+
+def setup_logging(log_file: str) -> None:
+    """
+    Route root logging through a non-blocking queue handler
+
+    Records are only put on an in-memory queue by the calling thread; a
+    background listener formats them and writes them to stdout and to every
+    log file registered here. Calling it again with another file adds that
+    file to the listener. The level comes from ABS_LOG_LEVEL (default DEBUG).
+    """
+    global _listener
+    with _lock:
+        if log_file in _log_files:
+            return
+        _log_files.add(log_file)
+
+        file_handler = logging.FileHandler(log_file, delay=True)
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+        if _listener is None:
+            stream_handler = logging.StreamHandler(sys.stdout)
+            stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            log_queue = SimpleQueue()
+            _listener = QueueListener(log_queue, stream_handler, file_handler, respect_handler_level=True)
+            _listener.start()
+            atexit.register(_listener.stop)
+
+            root = logging.getLogger()
+            root.setLevel(os.getenv('ABS_LOG_LEVEL', 'DEBUG').upper())
+            root.addHandler(QueueHandler(log_queue))
+        else:
+            _listener.handlers = _listener.handlers + (file_handler,)
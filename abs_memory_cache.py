@@ -0,0 +1,243 @@
+import os
+import sys
+import time
+import heapq
+import logging
+from collections import OrderedDict
+from itertools import count
+from typing import Dict, Any, Optional, Tuple, List
+from threading import Lock
+
+def estimate_size(value: Any) -> int:
+    """Approximate in-memory size of a JSON-like value in bytes"""
+    size = 0
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+    return size
+
+class _Shard:
+    """One lock-protected slice of the cache (callers hold `lock`)"""
+    def __init__(self, max_bytes: int, max_entries: int):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        # key -> (value, expiry, validators, size), least recently used first
+        self.entries: OrderedDict = OrderedDict()
+        # (expiry, sequence, key); superseded items are skipped lazily
+        self.expiry_heap: List[Tuple[float, int, str]] = []
+        self.bytes = 0
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def remove(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[3]
+
+    def _pop_expired(self, deadline: float) -> bool:
+        """Drop the entry that expires first if it expired before `deadline`"""
+        while self.expiry_heap:
+            expiry, _, key = self.expiry_heap[0]
+            entry = self.entries.get(key)
+            if entry is None or entry[1] != expiry:
+                heapq.heappop(self.expiry_heap)
+                continue
+            if expiry >= deadline:
+                return False
+            heapq.heappop(self.expiry_heap)
+            self.remove(key)
+            self.expirations += 1
+            return True
+        return False
+
+    def purge(self, deadline: float) -> int:
+        removed = 0
+        while self._pop_expired(deadline):
+            removed += 1
+        return removed
+
+    def make_room(self, size: int, now: float, count: int = 1) -> None:
+        """Evict expired entries first, then least recently used ones"""
+        def over_budget():
+            return (self.bytes + size > self.max_bytes
+                    or len(self.entries) + count > self.max_entries)
+
+        while over_budget() and self._pop_expired(now):
+            pass
+        while over_budget() and self.entries:
+            key = next(iter(self.entries))
+            self.remove(key)
+            self.evictions += 1
+
+    def put(self, key: str, value: Dict, expiry: float, validators: Optional[Dict],
+            size: int, sequence: int, now: float) -> None:
+        """Store an entry, making room for it first"""
+        self.remove(key)
+        self.make_room(size, now)
+        self.entries[key] = (value, expiry, validators, size)
+        self.bytes += size
+        heapq.heappush(self.expiry_heap, (expiry, sequence, key))
+        self.compact_heap()
+
+    def compact_heap(self) -> None:
+        """Rebuild the heap once superseded items dominate it"""
+        if len(self.expiry_heap) > 2 * len(self.entries) + 64:
+            self.expiry_heap = [
+                item for item in self.expiry_heap
+                if item[2] in self.entries and self.entries[item[2]][1] == item[0]
+            ]
+            heapq.heapify(self.expiry_heap)
+
+class MemoryCache:
+    """
+    Byte-budgeted, sharded in-memory response cache.
+
+    Keys are spread over `shards` independently locked shards, each owning an
+    equal part of the `max_bytes` and `max_size` budgets. Expiry times are
+    kept in a per-shard heap, so expired entries are found without scanning
+    and are evicted before any live entry; live entries go in LRU order.
+    Expired entries stay readable through `get_stale` for `stale_ttl`
+    seconds so they can be revalidated upstream.
+
+    Entries too large for one shard (e.g. wide multi-region responses) go to
+    a separate large-entry shard that may use the whole `max_bytes`; the
+    bytes it holds are taken out of the regular shards' budgets, so the
+    total stays within `max_bytes`.
+    """
+    def __init__(self, max_size: int = 1000, stale_ttl: int = 86400,
+                 max_bytes: int = 128 * 1024 * 1024, shards: int = 8):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        # Expired entries are kept this long for conditional revalidation
+        self.stale_ttl = stale_ttl
+        shards = max(1, int(shards))
+        self.shards = [
+            _Shard(max(1, max_bytes // shards), max(1, -(-max_size // shards)))
+            for _ in range(shards)
+        ]
+        self.large = _Shard(max_bytes, max(1, max_size))
+        self.sequence = count()
+
+    @classmethod
+    def from_env(cls) -> 'MemoryCache':
+        """
+        Build a cache from ABS_MEMORY_CACHE_MAX_MB, ABS_MEMORY_CACHE_MAX_ENTRIES,
+        ABS_MEMORY_CACHE_SHARDS and ABS_CACHE_STALE_TTL
+        """
+        return cls(
+            max_size=int(os.getenv('ABS_MEMORY_CACHE_MAX_ENTRIES', 1000)),
+            stale_ttl=int(os.getenv('ABS_CACHE_STALE_TTL', 86400)),
+            max_bytes=int(float(os.getenv('ABS_MEMORY_CACHE_MAX_MB', 128)) * 1024 * 1024),
+            shards=int(os.getenv('ABS_MEMORY_CACHE_SHARDS', 8))
+        )
+
+    def _shard(self, key: str) -> _Shard:
+        return self.shards[hash(key) % len(self.shards)]
+
+    def _candidates(self, key: str) -> Tuple[_Shard, ...]:
+        """Shards that may hold a key: its own and, if not empty, the large-entry shard"""
+        return (self._shard(key), self.large) if self.large.entries else (self._shard(key),)
+
+    def _rebalance(self) -> None:
+        """Give the regular shards what the large-entry shard leaves of the byte budget"""
+        budget = max(1, (self.max_bytes - self.large.bytes) // len(self.shards))
+        now = time.time()
+        for shard in self.shards:
+            with shard.lock:
+                shard.max_bytes = budget
+                shard.make_room(0, now, count=0)
+
+    def get(self, key: str) -> Optional[Dict]:
+        for shard in self._candidates(key):
+            with shard.lock:
+                entry = shard.entries.get(key)
+                if entry is None:
+                    continue
+                if entry[1] < time.time():
+                    break
+                # Move to end (most recently used)
+                shard.entries.move_to_end(key)
+                shard.hits += 1
+                return entry[0]
+        shard = self._shard(key)
+        with shard.lock:
+            shard.misses += 1
+        return None
+
+    def get_stale(self, key: str) -> Optional[Tuple[Dict, float, Optional[Dict]]]:
+        """Return (value, expiry, validators) even if the entry has expired"""
+        for shard in self._candidates(key):
+            with shard.lock:
+                entry = shard.entries.get(key)
+                if entry is not None:
+                    return entry[:3]
+        return None
+
+    def set(self, key: str, value: Dict, ttl: int = 3600, validators: Optional[Dict] = None,
+            size: Optional[int] = None):
+        if size is None:
+            size = estimate_size(value)
+        shard = self._shard(key)
+        now = time.time()
+        expiry = now + ttl
+        with shard.lock:
+            shard.remove(key)
+            fits = size <= shard.max_bytes
+            if fits:
+                shard.put(key, value, expiry, validators, size, next(self.sequence), now)
+        
+        if fits or size > self.max_bytes:
+            # Drop an older copy held by the large-entry shard
+            if key in self.large.entries:
+                with self.large.lock:
+                    self.large.remove(key)
+                self._rebalance()
+            if not fits:
+                logging.warning(f"Response of {size} bytes exceeds the memory cache budget of {self.max_bytes} bytes, not cached")
+            return
+        
+        with self.large.lock:
+            self.large.put(key, value, expiry, validators, size, next(self.sequence), now)
+        self._rebalance()
+
+    def clear_expired(self):
+        """Remove entries expired for longer than the stale grace period"""
+        deadline = time.time() - self.stale_ttl
+        for shard in self.shards:
+            with shard.lock:
+                shard.purge(deadline)
+                shard.compact_heap()
+        with self.large.lock:
+            purged = self.large.purge(deadline)
+            self.large.compact_heap()
+        if purged:
+            self._rebalance()
+
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self.shards) + len(self.large.entries)
+
+    def stats(self) -> Dict[str, Any]:
+        totals = {'entries': 0, 'bytes': 0, 'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+        for shard in self.shards + [self.large]:
+            with shard.lock:
+                totals['entries'] += len(shard.entries)
+                totals['bytes'] += shard.bytes
+                totals['hits'] += shard.hits
+                totals['misses'] += shard.misses
+                totals['evictions'] += shard.evictions
+                totals['expirations'] += shard.expirations
+        lookups = totals['hits'] + totals['misses']
+        totals['hit_ratio'] = round(totals['hits'] / lookups, 4) if lookups else 0.0
+        totals['max_bytes'] = self.max_bytes
+        totals['shards'] = len(self.shards)
+        totals['large_entries'] = len(self.large.entries)
+        return totals
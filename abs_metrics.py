@@ -0,0 +1,164 @@
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Tuple, List
+from threading import Lock
+
+# Upper bounds (seconds) of the stage timing histogram buckets
+TIMING_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+class _Timing:
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(TIMING_BUCKETS)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        for i, bound in enumerate(TIMING_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+
+class Metrics:
+    """
+    In-process counters, gauges and per-stage timing histograms.
+
+    Updates only take a lock and bump numbers, so they are cheap enough for
+    the request hot path. Gauges are callables evaluated when a snapshot or
+    the Prometheus text is rendered.
+    """
+    def __init__(self, prefix: str = 'abs'):
+        self.prefix = prefix
+        self.counters: Dict[Tuple[str, LabelKey], float] = {}
+        self.timings: Dict[LabelKey, _Timing] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+        self.lock = Lock()
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Increase a counter"""
+        key = (name, _label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, stage: str, seconds: float, **labels) -> None:
+        """Record the duration of a processing stage"""
+        key = _label_key({'stage': stage, **labels})
+        with self.lock:
+            timing = self.timings.get(key)
+            if timing is None:
+                timing = self.timings[key] = _Timing()
+            timing.observe(seconds)
+
+    @contextmanager
+    def timed(self, stage: str, **labels):
+        """Time the enclosed block as `stage`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    def register_gauge(self, name: str, read: Callable[[], float]) -> None:
+        """Report the value returned by `read` as a gauge"""
+        with self.lock:
+            self.gauges[name] = read
+
+    def _read_gauges(self) -> Dict[str, float]:
+        with self.lock:
+            gauges = dict(self.gauges)
+        values = {}
+        for name, read in gauges.items():
+            try:
+                values[name] = float(read())
+            except Exception as e:
+                logging.debug(f"Gauge {name} unavailable: {str(e)}")
+        return values
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters, gauges and stage timings as plain JSON data"""
+        with self.lock:
+            counters: Dict[str, Any] = {}
+            for (name, key), value in self.counters.items():
+                label = ','.join(f"{k}={v}" for k, v in key)
+                if label:
+                    counters.setdefault(name, {})[label] = value
+                else:
+                    counters[name] = value
+            stages = {}
+            for key, timing in self.timings.items():
+                labels = dict(key)
+                stage = labels.pop('stage')
+                label = f"{stage}[{','.join(f'{k}={v}' for k, v in labels.items())}]" if labels else stage
+                stages[label] = {
+                    'count': timing.count,
+                    'total_seconds': round(timing.total, 6),
+                    'avg_seconds': round(timing.total / timing.count, 6) if timing.count else 0.0,
+                    'max_seconds': round(timing.max, 6)
+                }
+        return {
+            'counters': counters,
+            'gauges': self._read_gauges(),
+            'stages': stages
+        }
+
+    def prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            timings = sorted(
+                (key, timing.count, timing.total, list(timing.buckets))
+                for key, timing in self.timings.items()
+            )
+
+        seen = set()
+        for (name, key), value in counters:
+            metric = f"{self.prefix}_{name}_total"
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_format_labels(key)} {value:g}")
+
+        for name, value in sorted(self._read_gauges().items()):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value:g}")
+
+        if timings:
+            metric = f"{self.prefix}_stage_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for key, count, total, buckets in timings:
+                cumulative = 0
+                for bound, bucket in zip(TIMING_BUCKETS, buckets):
+                    cumulative += bucket
+                    lines.append(f"{metric}_bucket{_format_labels(key, (('le', f'{bound:g}'),))} {cumulative}")
+                lines.append(f"{metric}_bucket{_format_labels(key, (('le', '+Inf'),))} {count}")
+                lines.append(f"{metric}_sum{_format_labels(key)} {total:.6f}")
+                lines.append(f"{metric}_count{_format_labels(key)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def reset(self) -> None:
+        with self.lock:
+            self.counters.clear()
+            self.timings.clear()
+
+# Process-wide registry shared by the request manager and the RPC server
+metrics = Metrics()
@@ -0,0 +1,302 @@
+import os
+import logging
+import time
+import struct
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, Mapping
+from threading import Lock
+from time import sleep
+from contextlib import contextmanager
+from abc import ABC, abstractmethod
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+class TokenBucket:
+    """
+    Token bucket allowing `burst` requests at once and refilling at
+    `rate_per_minute`. Tokens are reserved before waiting, so concurrent
+    callers are spaced out instead of waking up together.
+    """
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self, rate_per_minute: float, burst: int = 1):
+        self.rate_per_minute = float(rate_per_minute)
+        self.capacity = max(1, int(burst))
+        self.tokens = float(self.capacity)
+        self.last_refill = self.clock()
+        self.paused_until = 0.0
+        self.lock = Lock()
+
+    @contextmanager
+    def _locked(self):
+        """Hold the bucket state for a read-modify-write"""
+        with self.lock:
+            yield
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self.last_refill)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate_per_minute / 60)
+        self.last_refill = now
+
+    def _wait_for(self, deficit: float) -> float:
+        """Seconds until a token deficit has been refilled"""
+        if deficit <= 0:
+            return 0.0
+        return deficit * 60 / self.rate_per_minute
+
+    def reserve(self, tokens: int = 1) -> float:
+        """Take tokens now and return how long the caller must wait before using them"""
+        with self._locked():
+            now = self.clock()
+            self._refill(now)
+            self.tokens -= tokens
+            return self._wait_for(-self.tokens)
+
+    def try_acquire(self, tokens: int = 1) -> bool:
+        """Take tokens only if they are available right away"""
+        with self._locked():
+            self._refill(self.clock())
+            if self.tokens < tokens:
+                return False
+            self.tokens -= tokens
+            return True
+
+    def acquire(self, tokens: int = 1) -> float:
+        """Block until tokens are available; returns the time slept"""
+        wait_time = self.reserve(tokens)
+        if wait_time > 0:
+            sleep(wait_time)
+        return wait_time
+
+    def set_rate(self, rate_per_minute: float) -> None:
+        with self._locked():
+            self._refill(self.clock())
+            self.rate_per_minute = float(rate_per_minute)
+
+    def get_rate(self) -> float:
+        with self._locked():
+            return self.rate_per_minute
+
+    def pause(self, seconds: float) -> None:
+        """Hold back new reservations for `seconds` (e.g. an upstream Retry-After)"""
+        with self._locked():
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+    def paused_for(self) -> float:
+        """Seconds left of the current pause"""
+        with self._locked():
+            return max(0.0, self.paused_until - self.clock())
+
+    def state(self) -> Dict[str, Any]:
+        """Current rate and refill state"""
+        with self._locked():
+            self._refill(self.clock())
+            return {
+                'rate_per_minute': round(self.rate_per_minute, 3),
+                'capacity': self.capacity,
+                'tokens': round(self.tokens, 3),
+                'seconds_until_token': round(self._wait_for(1 - self.tokens), 3)
+            }
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Token bucket whose state lives in a small file shared by every process
+    on the host.
+
+    Each operation takes an exclusive `fcntl` lock on the file, loads the
+    tokens, rate and pause, applies the change and writes them back, so all
+    workers draw from one budget. Wall-clock time is used because it is
+    comparable across processes and containers sharing the file.
+    """
+    clock = staticmethod(time.time)
+    STATE = struct.Struct('<4d')
+
+    def __init__(self, path: str, rate_per_minute: float, burst: int = 1):
+        if fcntl is None:
+            raise RuntimeError("Shared rate limiting requires fcntl (POSIX only)")
+        super().__init__(rate_per_minute, burst)
+        self.path = path
+        self.fd = None
+        self.pid = None
+
+    def _open(self) -> int:
+        """Open the state file once per process (file locks are not shared with forked children)"""
+        if self.fd is None or self.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self.pid = os.getpid()
+        return self.fd
+
+    @contextmanager
+    def _locked(self):
+        with self.lock:
+            fd = self._open()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                data = os.pread(fd, self.STATE.size, 0)
+                if len(data) == self.STATE.size:
+                    self.tokens, self.last_refill, self.rate_per_minute, self.paused_until = self.STATE.unpack(data)
+                    self.tokens = min(self.tokens, float(self.capacity))
+                yield
+                os.pwrite(fd, self.STATE.pack(
+                    self.tokens, self.last_refill, self.rate_per_minute, self.paused_until
+                ), 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+class RateLimiter(ABC):
+    """Interface for the limiters used by ABSRequestManager"""
+    @abstractmethod
+    def acquire(self, endpoint: str) -> float:
+        """Block until a request to `endpoint` may start; returns the time slept"""
+
+    def record_response(self, endpoint: str, status_code: int, headers: Mapping[str, str]) -> None:
+        """Adapt to an upstream response"""
+        pass
+
+    def state(self) -> Dict[str, Any]:
+        return {}
+
+class AdaptiveRateLimiter(RateLimiter):
+    """
+    Global token bucket with optional per-endpoint budgets.
+
+    On 429/503 responses the global rate is halved (down to `min_rate`) and
+    requests are paused for any Retry-After period. Each successful response
+    then recovers the rate by `recovery_step` towards the configured maximum.
+
+    With `shared_dir` the buckets are kept in files in that directory, so
+    every worker process on the host shares one budget, one backoff and one
+    pause.
+    """
+    THROTTLE_STATUSES = (429, 503)
+
+    def __init__(self, requests_per_minute: float, burst: int = 1,
+                 endpoint_limits: Optional[Dict[str, float]] = None,
+                 min_rate: Optional[float] = None, backoff_factor: float = 0.5,
+                 recovery_step: Optional[float] = None, shared_dir: Optional[str] = None):
+        self.max_rate = float(requests_per_minute)
+        self.min_rate = min_rate if min_rate is not None else max(1.0, self.max_rate / 10)
+        self.backoff_factor = backoff_factor
+        self.recovery_step = recovery_step if recovery_step is not None else max(0.5, self.max_rate / 20)
+        self.shared_dir = shared_dir
+        self.bucket = self._make_bucket('global', requests_per_minute, burst)
+        self.endpoint_buckets = {
+            endpoint: self._make_bucket(endpoint, rate, burst)
+            for endpoint, rate in (endpoint_limits or {}).items()
+        }
+        self.throttled_count = 0
+        self.lock = Lock()
+
+    def _make_bucket(self, name: str, rate_per_minute: float, burst: int) -> TokenBucket:
+        if self.shared_dir:
+            return SharedTokenBucket(os.path.join(self.shared_dir, f"ratelimit-{name}.bucket"), rate_per_minute, burst)
+        return TokenBucket(rate_per_minute, burst)
+
+    @classmethod
+    def from_env(cls) -> 'AdaptiveRateLimiter':
+        """
+        Build a limiter from ABS_REQUESTS_PER_MINUTE, ABS_RATE_LIMIT_BURST,
+        ABS_ENDPOINT_RATE_LIMITS (e.g. "LM=20,CPI=5") and ABS_SHARED_DIR
+        """
+        endpoint_limits = {}
+        for item in os.getenv('ABS_ENDPOINT_RATE_LIMITS', '').split(','):
+            if '=' in item:
+                endpoint, rate = item.split('=', 1)
+                endpoint_limits[endpoint.strip()] = float(rate)
+        return cls(
+            requests_per_minute=int(os.getenv('ABS_REQUESTS_PER_MINUTE', 30)),
+            burst=int(os.getenv('ABS_RATE_LIMIT_BURST', 5)),
+            endpoint_limits=endpoint_limits,
+            shared_dir=os.getenv('ABS_SHARED_DIR') or None
+        )
+
+    def acquire(self, endpoint: str) -> float:
+        slept = 0.0
+
+        # Honour any Retry-After pause before reserving a token
+        pause = self.bucket.paused_for()
+        if pause > 0:
+            logging.debug(f"Rate limiting: paused by upstream for {pause:.2f} seconds")
+            sleep(pause)
+            slept += pause
+
+        wait_time = self.bucket.reserve()
+        endpoint_bucket = self.endpoint_buckets.get(endpoint)
+        if endpoint_bucket is not None:
+            wait_time = max(wait_time, endpoint_bucket.reserve())
+
+        if wait_time > 0:
+            logging.debug(f"Rate limiting: sleeping for {wait_time:.2f} seconds")
+            sleep(wait_time)
+            slept += wait_time
+        return slept
+
+    def record_response(self, endpoint: str, status_code: int, headers: Mapping[str, str]) -> None:
+        try:
+            status_code = int(status_code)
+        except (TypeError, ValueError):
+            return
+
+        if status_code in self.THROTTLE_STATUSES:
+            with self.lock:
+                self.throttled_count += 1
+                new_rate = max(self.min_rate, self.bucket.get_rate() * self.backoff_factor)
+                self.bucket.set_rate(new_rate)
+                retry_after = _parse_retry_after(headers.get('Retry-After'))
+                if retry_after:
+                    self.bucket.pause(retry_after)
+            logging.warning(
+                f"Upstream throttled {endpoint} ({status_code}); "
+                f"rate reduced to {new_rate:.1f}/min, retry after {retry_after or 0:.0f}s"
+            )
+            return
+
+        # Upstream reports an exhausted quota before throttling us
+        remaining = headers.get('RateLimit-Remaining') or headers.get('X-RateLimit-Remaining')
+        if remaining is not None and str(remaining).strip() == '0':
+            reset = _parse_retry_after(headers.get('RateLimit-Reset') or headers.get('X-RateLimit-Reset'))
+            if reset:
+                self.bucket.pause(reset)
+
+        if 200 <= status_code < 400:
+            with self.lock:
+                rate = self.bucket.get_rate()
+                if rate < self.max_rate:
+                    self.bucket.set_rate(min(self.max_rate, rate + self.recovery_step))
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            'max_rate_per_minute': self.max_rate,
+            'shared': bool(self.shared_dir),
+            'paused_for': round(self.bucket.paused_for(), 3),
+            'throttled_count': self.throttled_count,
+            'global': self.bucket.state(),
+            'endpoints': {
+                endpoint: bucket.state()
+                for endpoint, bucket in self.endpoint_buckets.items()
+            }
+        }
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After style header given as delta seconds or an HTTP date"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
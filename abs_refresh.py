@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Callable, Hashable
+from threading import Thread, Lock, Event
+
+@dataclass
+class TrackedKey:
+    refresh: Callable[[], Any]
+    expires_at: Callable[[], Optional[float]]
+    group: Optional[str] = None
+    # Access count, halved every decay interval
+    hits: float = 0.0
+    last_refresh: float = 0.0
+    pending: Any = None
+    # Set when a release of the key's group has been published since the
+    # last refresh
+    release_due: bool = False
+
+class RefreshScheduler:
+    """
+    Keeps frequently requested data warm by refreshing it before it expires.
+
+    Owners call `track` on every access with a callable that starts a
+    (low-priority) refresh and one that reports the current expiry time.
+    Every `interval` seconds, keys with at least `min_hits` recent accesses
+    that expire within `refresh_ahead` seconds, or whose group had a
+    scheduled release since the last run, are refreshed in order of access
+    frequency, at most `max_per_cycle` at a time.
+    """
+    def __init__(self, interval: float = 60, refresh_ahead: float = 300,
+                 max_per_cycle: int = 10, min_hits: int = 2,
+                 decay_interval: float = 3600, max_tracked: int = 500,
+                 release_calendar: Optional[Dict[str, List[float]]] = None):
+        self.interval = interval
+        self.refresh_ahead = refresh_ahead
+        self.max_per_cycle = max_per_cycle
+        self.min_hits = min_hits
+        self.decay_interval = decay_interval
+        self.max_tracked = max_tracked
+        self.release_calendar = {
+            group: sorted(times) for group, times in (release_calendar or {}).items()
+        }
+        self.tracked: Dict[Hashable, TrackedKey] = {}
+        self.lock = Lock()
+        self.last_run = time.time()
+        self.last_decay = time.time()
+        self.refresh_count = 0
+        self.stop_event = Event()
+        self.thread = None
+
+    @classmethod
+    def from_env(cls) -> Optional['RefreshScheduler']:
+        """
+        Build a scheduler from ABS_REFRESH_SCHEDULER, ABS_REFRESH_INTERVAL,
+        ABS_REFRESH_AHEAD, ABS_REFRESH_MAX_PER_CYCLE, ABS_REFRESH_MIN_HITS and
+        ABS_RELEASE_CALENDAR; returns None when refreshing is disabled
+        """
+        if os.getenv('ABS_REFRESH_SCHEDULER', 'false').lower() not in ('1', 'true', 'yes'):
+            return None
+        calendar_path = os.getenv('ABS_RELEASE_CALENDAR')
+        return cls(
+            interval=float(os.getenv('ABS_REFRESH_INTERVAL', 60)),
+            refresh_ahead=float(os.getenv('ABS_REFRESH_AHEAD', 300)),
+            max_per_cycle=int(os.getenv('ABS_REFRESH_MAX_PER_CYCLE', 10)),
+            min_hits=int(os.getenv('ABS_REFRESH_MIN_HITS', 2)),
+            release_calendar=load_release_calendar(calendar_path) if calendar_path else None
+        )
+
+    def track(self, key: Hashable, refresh: Callable[[], Any],
+              expires_at: Callable[[], Optional[float]], group: Optional[str] = None) -> None:
+        """Record an access to `key` and how to refresh it"""
+        with self.lock:
+            tracked = self.tracked.get(key)
+            if tracked is None:
+                if len(self.tracked) >= self.max_tracked:
+                    coldest = min(self.tracked, key=lambda k: self.tracked[k].hits)
+                    del self.tracked[coldest]
+                tracked = self.tracked[key] = TrackedKey(refresh, expires_at, group)
+            tracked.hits += 1
+
+    def _released_groups(self, since: float, now: float) -> set:
+        return {
+            group for group, times in self.release_calendar.items()
+            if any(since < release <= now for release in times)
+        }
+
+    def due(self, now: Optional[float] = None) -> List[Hashable]:
+        """Keys to refresh now, most frequently accessed first"""
+        now = now if now is not None else time.time()
+        released = self._released_groups(self.last_run, now)
+        candidates = []
+        with self.lock:
+            for key, tracked in self.tracked.items():
+                if tracked.group in released:
+                    tracked.release_due = True
+                if tracked.hits < self.min_hits:
+                    continue
+                if tracked.pending is not None and not tracked.pending.done():
+                    continue
+                expiry = tracked.expires_at()
+                if tracked.release_due or expiry is None or expiry - self.refresh_ahead <= now:
+                    candidates.append((tracked.hits, key))
+        candidates.sort(key=lambda item: item[0], reverse=True)
+        return [key for _, key in candidates[:self.max_per_cycle]]
+
+    def run_once(self, now: Optional[float] = None) -> int:
+        """Start refreshes for due keys; returns how many were started"""
+        now = now if now is not None else time.time()
+        keys = self.due(now)
+        self.last_run = max(self.last_run, now)
+
+        started = 0
+        for key in keys:
+            with self.lock:
+                tracked = self.tracked.get(key)
+            if tracked is None:
+                continue
+            try:
+                tracked.pending = tracked.refresh()
+                tracked.last_refresh = now
+                tracked.release_due = False
+                started += 1
+            except Exception as e:
+                logging.error(f"Background refresh of {key} failed: {str(e)}")
+        self.refresh_count += started
+        if started:
+            logging.debug(f"Background refresh started for {started} keys")
+
+        # Forget keys that are no longer requested
+        if now - self.last_decay >= self.decay_interval:
+            self.last_decay = now
+            with self.lock:
+                for key in list(self.tracked):
+                    self.tracked[key].hits /= 2
+                    if self.tracked[key].hits < 0.5:
+                        del self.tracked[key]
+        return started
+
+    def start(self) -> None:
+        if self.thread is None:
+            self.thread = Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def _run(self) -> None:
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"Refresh scheduler error: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            hot = sum(1 for tracked in self.tracked.values() if tracked.hits >= self.min_hits)
+            return {
+                'tracked': len(self.tracked),
+                'hot': hot,
+                'refreshes': self.refresh_count
+            }
+
+def load_release_calendar(path: str) -> Dict[str, List[float]]:
+    """
+    Load release times per dataflow from a JSON file such as
+    ``{"LM": ["2025-01-16T11:30:00+11:00", ...]}``
+
+    Times without a UTC offset are taken as local time.
+    """
+    with open(path) as f:
+        raw = json.load(f)
+    return {
+        group: [datetime.fromisoformat(value).timestamp() for value in values]
+        for group, values in raw.items()
+    }
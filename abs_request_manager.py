@@ -2,28 +2,25 @@ import os
 import logging
 import json
 import time
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+import asyncio
+import random
+from typing import Dict, Any, Optional, List, Tuple
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
-from queue import PriorityQueue
-from threading import Thread, Lock
+from threading import Thread, Lock, Semaphore
 from dataclasses import dataclass, field
 from time import sleep
-from collections import OrderedDict
-
-# Load environment variables
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('abs_api.log'),
-        logging.StreamHandler()
-    ]
-)
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from abs_rate_limiter import RateLimiter, AdaptiveRateLimiter
+from abs_disk_cache import DiskCache
+from abs_memory_cache import MemoryCache
+from abs_refresh import RefreshScheduler
+from abs_fair_queue import FairRequestQueue
+from abs_circuit_breaker import CircuitBreaker, CircuitOpenError
+from abs_metrics import metrics
+from abs_logging import setup_logging
+from abs_sdmx import read_sdmx_csv
 
 @dataclass(order=True)
 class PrioritizedRequest:
@@ -32,82 +29,162 @@ class PrioritizedRequest:
     request_id: str = field(compare=False)
     endpoint: str = field(compare=False)
     params: Dict = field(compare=False)
-    callback: callable = field(compare=False)
-
-class MemoryCache:
-    def __init__(self, max_size=1000):
-        self.cache = OrderedDict()
-        self.max_size = max_size
-        self.lock = Lock()
-
-    def get(self, key: str) -> Optional[Dict]:
-        with self.lock:
-            if key not in self.cache:
-                return None
-            value, expiry = self.cache[key]
-            if expiry < time.time():
-                del self.cache[key]
-                return None
-            # Move to end (most recently used)
-            self.cache.move_to_end(key)
-            return value
-
-    def set(self, key: str, value: Dict, ttl: int = 3600):
-        with self.lock:
-            # Remove oldest item if cache is full
-            if len(self.cache) >= self.max_size:
-                self.cache.popitem(last=False)
-            expiry = time.time() + ttl
-            self.cache[key] = (value, expiry)
-            self.cache.move_to_end(key)
-
-    def clear_expired(self):
-        """Remove expired entries"""
-        with self.lock:
-            current_time = time.time()
-            expired_keys = [
-                k for k, (_, exp) in self.cache.items() 
-                if exp < current_time
-            ]
-            for k in expired_keys:
-                del self.cache[k]
+    cache_key: str = field(compare=False)
+    # Background refreshes are fetched even if a fresh copy is cached
+    refresh: bool = field(default=False, compare=False)
+    # Requests are shared fairly between clients (e.g. one RPC call each)
+    client: str = field(default='default', compare=False)
+
+class StaleResponse(dict):
+    """
+    An expired response served in place of a fresh one
+
+    It behaves as the plain response dict; callers that keep responses in
+    their own caches must not store it as fresh. `refresh` resolves to the
+    revalidated response when a refresh was queued for it.
+    """
+    def __init__(self, response: Dict, refresh: Optional[Future] = None):
+        super().__init__(response)
+        self.refresh = refresh
 
 class ABSRequestManager:
-    def __init__(self):
+    # Queue priority of background refreshes (lower number = higher priority)
+    REFRESH_PRIORITY = 9
+    # Queue client of background refreshes
+    REFRESH_CLIENT = 'refresh'
+
+    def __init__(self, rate_limiter: Optional[RateLimiter] = None, disk_cache: Optional[DiskCache] = None):
         self.api_key = os.getenv('ABS_API_KEY')
         if not self.api_key:
             raise ValueError("ABS API key not found in environment variables")
         
         # In-memory cache
-        self.cache = MemoryCache()
+        self.cache = MemoryCache.from_env()
+        
+        # Optional persistent cache tier behind the memory cache
+        self.disk_cache = disk_cache or DiskCache.from_env()
+        
+        # Serve expired entries (within the stale grace period) immediately
+        # while a low-priority refresh runs
+        self.stale_while_revalidate = os.getenv('ABS_STALE_WHILE_REVALIDATE', 'false').lower() in ('1', 'true', 'yes')
+        
+        # Optional scheduler refreshing frequently requested keys before expiry
+        self.refresh_scheduler = RefreshScheduler.from_env()
+        
+        # Extra callables run by the periodic cache cleanup (see add_cleanup)
+        self.cleanup_tasks: List[callable] = []
         
         # Rate limiting settings
         self.requests_per_minute = int(os.getenv('ABS_REQUESTS_PER_MINUTE', 30))
-        self.request_window = 60  # seconds
-        self.min_request_interval = self.request_window / self.requests_per_minute
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter.from_env()
+        
+        # Transient upstream errors are retried with jittered exponential
+        # backoff; every retry takes a rate limit token
+        self.max_retries = int(os.getenv('ABS_MAX_RETRIES', 3))
+        self.retry_base_delay = float(os.getenv('ABS_RETRY_BASE_DELAY', 0.5))
+        self.retry_max_delay = float(os.getenv('ABS_RETRY_MAX_DELAY', 10))
+        
+        # Repeated upstream failures open the circuit; requests then fail
+        # fast (or get a stale response) until a probe succeeds
+        self.circuit_breaker = CircuitBreaker.from_env()
+        
+        # Request queue shared round robin between clients; waiting requests
+        # gain one priority level per ABS_QUEUE_AGING_SECONDS
+        self.request_queue = FairRequestQueue(
+            aging_interval=float(os.getenv('ABS_QUEUE_AGING_SECONDS', 30))
+        )
+        
+        # In-flight requests keyed by cache key; identical requests attach
+        # their futures here instead of queueing a second upstream fetch
+        self.inflight: Dict[str, List[Future]] = {}
+        self.inflight_lock = Lock()
+        
+        # Latest deadline (time.time()) of the callers waiting on each
+        # in-flight key; None means at least one caller waits indefinitely
+        self.deadlines: Dict[str, Optional[float]] = {}
+        
+        # HTTP workers; the dispatcher hands a request to a free worker once
+        # the rate limiter allows it to start
+        self.http_workers = int(os.getenv('ABS_HTTP_WORKERS', 4))
+        self.worker_slots = Semaphore(self.http_workers)
+        self.http_executor = ThreadPoolExecutor(
+            max_workers=self.http_workers,
+            thread_name_prefix='abs-http'
+        )
         
-        # Request queue and processing
-        self.request_queue = PriorityQueue()
-        self.processing_lock = Lock()
-        self.last_request_time = 0
+        # Keep-alive connection pool sized for the HTTP workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.http_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Authorization': f'Bearer {self.api_key}',
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate'
+        })
+        
+        # Callbacks run on their own executor so slow callbacks cannot block fetching
+        self.callback_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('ABS_CALLBACK_WORKERS', 4)),
+            thread_name_prefix='abs-callback'
+        )
         
-        # Start request processing thread
-        self.processing_thread = Thread(target=self._process_queue, daemon=True)
-        self.processing_thread.start()
+        # Dispatcher, cache cleanup and refresh threads are started on first
+        # use (see start) so building the manager stays cheap
+        self.processing_thread: Optional[Thread] = None
+        self.cleanup_thread: Optional[Thread] = None
+        self.start_lock = Lock()
         
-        # Cache cleanup thread
-        self.cleanup_thread = Thread(target=self._cleanup_cache, daemon=True)
-        self.cleanup_thread.start()
+        metrics.register_gauge('queue_depth', self.request_queue.qsize)
+        metrics.register_gauge('queue_clients', lambda: len(self.request_queue.stats()['clients']))
+        metrics.register_gauge('inflight_requests', lambda: len(self.inflight))
+        metrics.register_gauge('circuit_open', lambda: self.circuit_breaker.state()['state'] != CircuitBreaker.CLOSED)
+        metrics.register_gauge('memory_cache_hit_ratio', lambda: self.cache.stats()['hit_ratio'])
+        metrics.register_gauge('memory_cache_bytes', lambda: self.cache.stats()['bytes'])
         
-        # Base URL for ABS API
-        self.base_url = 'https://api.data.abs.gov.au/data'
+        # Base URL for ABS API (overridable, e.g. for a local stub server)
+        self.base_url = os.getenv('ABS_API_BASE_URL', 'https://api.data.abs.gov.au/data').rstrip('/')
         
         logging.info(f"ABS Request Manager initialized with {self.requests_per_minute} requests per minute limit")
 
+    @property
+    def started(self) -> bool:
+        return self.processing_thread is not None
+
+    def start(self) -> None:
+        """Start the dispatcher, cache cleanup and refresh threads if not yet running"""
+        if self.processing_thread is not None:
+            return
+        with self.start_lock:
+            if self.processing_thread is not None:
+                return
+            self.cleanup_thread = Thread(target=self._cleanup_cache, daemon=True)
+            self.cleanup_thread.start()
+            if self.refresh_scheduler:
+                self.refresh_scheduler.start()
+            processing_thread = Thread(target=self._process_queue, daemon=True)
+            processing_thread.start()
+            self.processing_thread = processing_thread
+        logging.info("ABS Request Manager started")
+
+    def add_cleanup(self, task: callable) -> None:
+        """Run `task` with every periodic cache cleanup (e.g. to sweep a caller's own cache)"""
+        self.cleanup_tasks.append(task)
+
     def _cleanup_cache(self):
         """Periodically clean up expired cache entries"""
         while True:
             self.cache.clear_expired()
+            if self.disk_cache:
+                try:
+                    self.disk_cache.clear_expired()
+                except Exception as e:
+                    logging.error(f"Disk cache cleanup error: {str(e)}")
+            for task in list(self.cleanup_tasks):
+                try:
+                    task()
+                except Exception as e:
+                    logging.error(f"Cache cleanup error: {str(e)}")
             sleep(300)  # Clean every 5 minutes
 
     def _generate_cache_key(self, endpoint: str, params: Dict) -> str:
@@ -117,111 +194,582 @@ class ABSRequestManager:
         return f"abs_api:{endpoint}:{sorted_params}"
 
     def _get_cached_response(self, cache_key: str) -> Optional[Dict]:
-        """Get cached response if available"""
-        return self.cache.get(cache_key)
+        """Get cached response if available, reading through to the disk cache"""
+        response = self.cache.get(cache_key)
+        if response is not None or not self.disk_cache:
+            return response
+        
+        try:
+            entry = self.disk_cache.get_entry(cache_key)
+        except Exception as e:
+            logging.error(f"Disk cache read error: {str(e)}")
+            return None
+        if entry is None:
+            return None
+        
+        # Promote to memory for the rest of its TTL, validators included
+        response, expiry, validators = entry
+        self.cache.set(cache_key, response, max(1, int(expiry - time.time())), validators)
+        return response
 
-    def _cache_response(self, cache_key: str, response: Dict, ttl: int = 3600) -> None:
-        """Cache the API response"""
-        self.cache.set(cache_key, response, ttl)
+    def _cache_response(self, cache_key: str, response: Dict, ttl: int = 3600,
+                        validators: Optional[Dict] = None) -> None:
+        """
+        Cache the API response in memory at once, and queue it with its
+        validators for the disk cache's background writer
+        """
+        self.cache.set(cache_key, response, ttl, validators)
+        if self.disk_cache:
+            self.disk_cache.set(cache_key, response, ttl, validators)
 
-    def _make_request(self, endpoint: str, params: Dict) -> Dict[str, Any]:
-        """Make the actual API request"""
-        headers = {
-            'Authorization': f'Bearer {self.api_key}',
-            'Accept': 'application/json'
+    def _get_live_response(self, cache_key: str) -> Optional[Dict]:
+        """Unexpired response from the memory cache, without touching hit statistics"""
+        entry = self.cache.get_stale(cache_key)
+        if entry is None or entry[1] < time.time():
+            return None
+        return entry[0]
+
+    def _get_stale_response(self, cache_key: str) -> Optional[Dict]:
+        """Get an expired response that is still within the stale grace period"""
+        entry = self.cache.get_stale(cache_key)
+        if entry is None or entry[1] + self.cache.stale_ttl < time.time():
+            return None
+        return entry[0]
+
+    def _cache_expiry(self, cache_key: str) -> Optional[float]:
+        """Expiry time of the cached response, if any"""
+        entry = self.cache.get_stale(cache_key)
+        return entry[1] if entry else None
+
+    def get_cache_version(self, endpoint: str, params: Dict) -> Optional[float]:
+        """
+        Token that changes whenever a request's cached response is replaced
+        
+        Returns:
+            The expiry time of the live cached response, or None if there is none
+        """
+        expiry = self._cache_expiry(self._generate_cache_key(endpoint, params))
+        return expiry if expiry is not None and expiry >= time.time() else None
+
+    def get_cached(self, endpoint: str, params: Dict) -> Optional[Dict]:
+        """Return the cached response for a request, if any"""
+        return self._get_cached_response(self._generate_cache_key(endpoint, params))
+
+    def prime_cache(self, endpoint: str, params: Dict, response: Dict, ttl: int = 3600) -> None:
+        """Store a response obtained elsewhere (e.g. split from a batched query) under a request's cache key"""
+        self._cache_response(self._generate_cache_key(endpoint, params), response, ttl)
+
+    def get_rate_limit_state(self) -> Dict[str, Any]:
+        """Current rate limiter rate and refill state"""
+        return self.rate_limiter.state()
+
+    def get_circuit_state(self) -> Dict[str, Any]:
+        """Upstream circuit breaker state"""
+        return self.circuit_breaker.state()
+
+    def get_queue_stats(self) -> Dict[str, Any]:
+        """Queued requests in total and per client"""
+        return self.request_queue.stats()
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Memory and disk cache size and hit/miss/eviction counters"""
+        return {
+            'memory': self.cache.stats(),
+            'disk': self.disk_cache.stats() if self.disk_cache else None
         }
+
+    def _make_request(self, endpoint: str, params: Dict,
+                      cache_key: Optional[str] = None) -> Tuple[Dict[str, Any], Optional[Dict]]:
+        """
+        Make the actual API request over the pooled session
         
-        url = f"{self.base_url}/{endpoint}"
+        When an expired cache entry with validators exists for cache_key, the
+        request is made conditional and a 304 returns the cached payload.
+        
+        Returns:
+            Tuple of the response payload and its validators (ETag/Last-Modified)
+        """
+        headers = {}
+        stale = self.cache.get_stale(cache_key) if cache_key else None
+        stale_validators = stale[2] if stale else None
+        if stale_validators:
+            if stale_validators.get('etag'):
+                headers['If-None-Match'] = stale_validators['etag']
+            if stale_validators.get('last_modified'):
+                headers['If-Modified-Since'] = stale_validators['last_modified']
+        
+        # SDMX-CSV responses are streamed into compact columns instead of
+        # holding the whole body and a parsed JSON tree in memory
+        stream_csv = params.get('format') == 'csv'
+        extra = {}
+        if stream_csv:
+            headers['Accept'] = 'application/vnd.sdmx.data+csv'
+            extra['stream'] = True
+        elif params.get('format') == 'structure-json':
+            headers['Accept'] = 'application/vnd.sdmx.structure+json'
+        
+        # Endpoints are relative to the data API unless given as full URLs
+        # (e.g. structure queries)
+        url = endpoint if endpoint.startswith(('http://', 'https://')) else f"{self.base_url}/{endpoint}"
         
         try:
-            response = requests.get(
-                url,
-                headers=headers,
-                params=params,
-                timeout=30
-            )
-            response.raise_for_status()
-            return response.json()
+            with metrics.timed('http', endpoint=endpoint):
+                response = self.session.get(
+                    url,
+                    headers=headers,
+                    params=params,
+                    timeout=30,
+                    **extra
+                )
+            with response:
+                self.rate_limiter.record_response(endpoint, response.status_code, response.headers)
+                metrics.inc('upstream_responses', endpoint=endpoint, status=response.status_code)
+                
+                if response.status_code == 304 and stale_validators:
+                    logging.debug(f"Not modified, revalidated cached response for {endpoint}")
+                    return stale[0], stale_validators
+                
+                response.raise_for_status()
+                validators = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified')
+                }
+                if not any(isinstance(v, str) for v in validators.values()):
+                    validators = None
+                
+                with metrics.timed('decode', endpoint=endpoint):
+                    if stream_csv:
+                        response.encoding = response.encoding or 'utf-8'
+                        return read_sdmx_csv(response.iter_lines(decode_unicode=True)), validators
+                    return response.json(), validators
             
         except requests.exceptions.RequestException as e:
+            status = getattr(getattr(e, 'response', None), 'status_code', None)
+            metrics.inc('upstream_errors', endpoint=endpoint, error=status or type(e).__name__)
             logging.error(f"API request error: {str(e)}")
             raise
 
+    def _complete_inflight(self, cache_key: str, response: Optional[Dict] = None,
+                           error: Optional[BaseException] = None) -> None:
+        """Resolve the futures of every caller waiting on the same in-flight fetch"""
+        with self.inflight_lock:
+            futures = self.inflight.pop(cache_key, [])
+            self.deadlines.pop(cache_key, None)
+        
+        for future in futures:
+            try:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(response)
+            except InvalidStateError:
+                # Cancelled by its caller while the fetch was in flight
+                pass
+
+    def _fail(self, cache_key: str, error: BaseException) -> None:
+        """Resolve the waiters of a failed request, with a stale response while the circuit is open"""
+        if isinstance(error, CircuitOpenError) or self.circuit_breaker.is_open():
+            stale_response = self._get_stale_response(cache_key)
+            if stale_response is not None:
+                logging.debug(f"Upstream unavailable, serving stale response: {cache_key}")
+                self._complete_inflight(cache_key, StaleResponse(stale_response))
+                return
+        self._complete_inflight(cache_key, error=error)
+
+    def _abandoned(self, request: PrioritizedRequest) -> Optional[str]:
+        """
+        Check whether anyone still waits for a queued request
+        
+        Returns:
+            'cancelled' if every caller cancelled its future, 'expired' if the
+            latest caller deadline has passed, otherwise None
+        """
+        with self.inflight_lock:
+            futures = self.inflight.get(request.cache_key)
+            deadline = self.deadlines.get(request.cache_key)
+        # Refreshes queued without a waiting caller are always fetched
+        if futures and all(future.done() for future in futures):
+            return 'cancelled'
+        if deadline is not None and deadline < time.time():
+            return 'expired'
+        return None
+
+    def _skip(self, request: PrioritizedRequest) -> bool:
+        """
+        Complete a dequeued request without fetching it when nobody waits
+        for it any more, when the upstream circuit is open, or when another
+        worker process has filled the shared disk cache while it was queued
+        """
+        reason = self._abandoned(request)
+        if reason:
+            metrics.inc('requests_dropped', reason=reason)
+            logging.debug(f"Dropping {reason} request: {request.request_id}")
+            self._complete_inflight(request.cache_key, error=TimeoutError("Request deadline exceeded"))
+            return True
+        
+        if self.circuit_breaker.is_open():
+            metrics.inc('circuit_rejected')
+            self._fail(request.cache_key, CircuitOpenError("ABS API circuit open"))
+            return True
+        
+        if self.disk_cache and not request.refresh:
+            response = self._get_cached_response(request.cache_key)
+            if response is not None:
+                self._complete_inflight(request.cache_key, response)
+                return True
+        return False
+
     def _process_queue(self) -> None:
-        """Process requests from the queue"""
+        """Dispatch queued requests to the HTTP workers"""
         while True:
+            # Wait for a free worker before taking the next request so the
+            # highest priority request is picked when the worker is available
+            self.worker_slots.acquire()
+            request = self.request_queue.get()
+            
             try:
-                # Get next request from queue
-                request = self.request_queue.get()
+                # Drop requests nobody waits for before they use a rate
+                # limit token or an HTTP call
+                if self._skip(request):
+                    self.worker_slots.release()
+                    self.request_queue.task_done()
+                    continue
+                
+                # Wait for the rate limiter to allow the request to start
+                slept = self.rate_limiter.acquire(request.endpoint)
+                metrics.observe('rate_limit_wait', slept or 0.0)
+                
+                # Requests queued while waiting for the token may be more
+                # urgent; the token goes to whichever the scheduler picks now
+                if slept:
+                    endpoint = request.endpoint
+                    chosen = self.request_queue.reschedule(request, lambda other: other.endpoint == endpoint)
+                    if chosen is not request:
+                        request = chosen
+                        if self._skip(request):
+                            self.worker_slots.release()
+                            self.request_queue.task_done()
+                            continue
+                
+                metrics.observe('queue_wait', time.time() - request.timestamp)
+                self.http_executor.submit(self._execute_request, request)
                 
-                # Ensure minimum interval between requests
-                with self.processing_lock:
-                    current_time = time.time()
-                    time_since_last = current_time - self.last_request_time
-                    if time_since_last < self.min_request_interval:
-                        sleep_time = self.min_request_interval - time_since_last
-                        logging.debug(f"Rate limiting: sleeping for {sleep_time:.2f} seconds")
-                        sleep(sleep_time)
-                    
-                    # Generate cache key
-                    cache_key = self._generate_cache_key(request.endpoint, request.params)
-                    
-                    # Check cache first
-                    cached_response = self._get_cached_response(cache_key)
-                    if cached_response:
-                        logging.debug(f"Cache hit for request: {request.request_id}")
-                        request.callback(cached_response)
-                        self.request_queue.task_done()
-                        continue
-                    
-                    # Make API request
-                    logging.debug(f"Making API request: {request.request_id}")
-                    response = self._make_request(request.endpoint, request.params)
-                    
-                    # Update last request time
-                    self.last_request_time = time.time()
-                    
-                    # Cache the response
-                    self._cache_response(cache_key, response)
-                    
-                    # Call the callback with the response
-                    request.callback(response)
-                    
             except Exception as e:
-                logging.error(f"Error processing request: {str(e)}")
-            
-            finally:
+                logging.error(f"Error dispatching request: {str(e)}")
+                self._complete_inflight(request.cache_key, error=e)
+                self.worker_slots.release()
                 self.request_queue.task_done()
 
-    def request(self, endpoint: str, params: Dict, priority: int = 1, callback: callable = None) -> None:
+    def _is_transient(self, error: BaseException) -> bool:
+        """Whether a request error is worth retrying (timeouts, connection errors, 429 and 5xx)"""
+        if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError,
+                              requests.exceptions.ChunkedEncodingError)):
+            return True
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+        return isinstance(status, int) and (status == 429 or status >= 500)
+
+    def _retry_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number `attempt` (from 0)"""
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+
+    def _fetch(self, request: PrioritizedRequest) -> Tuple[Dict[str, Any], Optional[Dict]]:
         """
-        Queue a new API request
+        Fetch a request through the circuit breaker, retrying transient errors
         
-        Args:
-            endpoint: API endpoint
-            params: Request parameters
-            priority: Request priority (lower number = higher priority)
-            callback: Function to call with the response
+        Retries stop early when nobody waits for the response any more or
+        the backoff would run past the callers' deadline.
         """
+        attempt = 0
+        while True:
+            if not self.circuit_breaker.allow():
+                metrics.inc('circuit_rejected')
+                raise CircuitOpenError("ABS API circuit open")
+            try:
+                result = self._make_request(request.endpoint, request.params, request.cache_key)
+            except Exception as e:
+                if not self._is_transient(e):
+                    # The upstream answered; the request itself is at fault
+                    self.circuit_breaker.record_success()
+                    raise
+                status = getattr(getattr(e, 'response', None), 'status_code', None)
+                if status != 429:
+                    self.circuit_breaker.record_failure()
+                if attempt >= self.max_retries or self._abandoned(request) or self.circuit_breaker.is_open():
+                    raise
+                delay = self._retry_delay(attempt)
+                with self.inflight_lock:
+                    deadline = self.deadlines.get(request.cache_key)
+                if deadline is not None and time.time() + delay > deadline:
+                    raise
+                attempt += 1
+                metrics.inc('upstream_retries', endpoint=request.endpoint)
+                logging.warning(f"Retrying {request.request_id} in {delay:.2f}s (attempt {attempt}): {str(e)}")
+                sleep(delay)
+                self.rate_limiter.acquire(request.endpoint)
+                continue
+            self.circuit_breaker.record_success()
+            return result
+
+    def _execute_request(self, request: PrioritizedRequest) -> None:
+        """Fetch, cache and deliver a single request on an HTTP worker"""
+        try:
+            # Make API request
+            logging.debug(f"Making API request: {request.request_id}")
+            response, validators = self._fetch(request)
+            
+            # Cache the response (a 304 extends the TTL of the cached payload)
+            self._cache_response(request.cache_key, response, validators=validators)
+            
+            # Resolve every coalesced caller with the response
+            self._complete_inflight(request.cache_key, response)
+                
+        except Exception as e:
+            logging.error(f"Error processing request: {str(e)}")
+            self._fail(request.cache_key, e)
+        
+        finally:
+            self.worker_slots.release()
+            self.request_queue.task_done()
+
+    def _enqueue(self, endpoint: str, params: Dict, cache_key: str, priority: int,
+                 refresh: bool = False, client: str = 'default') -> None:
+        """Put a request for an in-flight cache key on the queue"""
         request_id = f"{time.time()}_{endpoint}"
-        request = PrioritizedRequest(
+        self.request_queue.put(PrioritizedRequest(
             priority=priority,
             timestamp=time.time(),
             request_id=request_id,
             endpoint=endpoint,
             params=params,
-            callback=callback or (lambda x: None)
-        )
-        
-        self.request_queue.put(request)
+            cache_key=cache_key,
+            refresh=refresh,
+            client=client
+        ))
         logging.debug(f"Request queued: {request_id}")
 
+    def _track(self, cache_key: str, endpoint: str, params: Dict) -> None:
+        """Report an access to the refresh scheduler"""
+        if self.refresh_scheduler:
+            self.refresh_scheduler.track(
+                cache_key,
+                lambda: self.refresh(endpoint, params),
+                lambda: self._cache_expiry(cache_key),
+                group=endpoint
+            )
+
+    def _extend_deadline(self, cache_key: str, deadline: Optional[float]) -> None:
+        """Keep an in-flight key alive until the latest deadline of its callers (call with inflight_lock held)"""
+        current = self.deadlines.get(cache_key)
+        if current is None or deadline is None:
+            self.deadlines[cache_key] = None if cache_key in self.deadlines else deadline
+        else:
+            self.deadlines[cache_key] = max(current, deadline)
+
+    def submit(self, endpoint: str, params: Dict, priority: int = 1,
+               deadline: Optional[float] = None, client: Optional[str] = None,
+               track: bool = True) -> Future:
+        """
+        Queue a new API request and return a future for its response
+        
+        Cached responses are returned as an already completed future.
+        Requests identical to one already in flight share its upstream fetch.
+        In stale-while-revalidate mode an expired response is returned right
+        away as a StaleResponse, and a single low-priority refresh is queued
+        (its future is the StaleResponse's `refresh`).
+        
+        Cancelling the future detaches the caller. A queued request whose
+        callers have all cancelled, or whose deadline has passed, is dropped
+        before it is fetched. While the upstream circuit is open the future
+        completes at once with a cached response, a StaleResponse or a
+        CircuitOpenError.
+        
+        Args:
+            endpoint: API endpoint
+            params: Request parameters
+            priority: Request priority (lower number = higher priority)
+            deadline: time.time() after which the caller no longer waits
+                (None to wait indefinitely)
+            client: Queue client the request is scheduled under; clients
+                take turns at each priority level
+            track: Report the key to the refresh scheduler; off for
+                responses the caller keeps elsewhere (e.g. merged into the
+                series cache, which is tracked instead)
+            
+        Returns:
+            Future resolving to the response, or to the request error
+        """
+        self.start()
+        future = Future()
+        cache_key = self._generate_cache_key(endpoint, params)
+        if track:
+            self._track(cache_key, endpoint, params)
+        
+        # While the circuit is open, answer from the cache (even if expired)
+        # or fail at once instead of queueing behind a dead upstream
+        if self.circuit_breaker.is_open():
+            response = self._get_cached_response(cache_key)
+            if response is None:
+                response = self._get_stale_response(cache_key)
+                if response is not None:
+                    response = StaleResponse(response)
+            if response is not None:
+                metrics.inc('requests', result='stale')
+                future.set_result(response)
+            else:
+                metrics.inc('requests', result='rejected')
+                future.set_exception(CircuitOpenError("ABS API circuit open"))
+            return future
+        
+        stale_response = None
+        queue_priority = None
+        queue_client = client or 'default'
+        
+        # Memory and disk lookup outside the in-flight lock, so disk reads
+        # never hold up other submits or completing fetches
+        cached_response = self._get_cached_response(cache_key)
+        
+        with self.inflight_lock:
+            # Re-checked (memory only) under the in-flight lock so a fetch
+            # completing right now is seen either in the cache or in the
+            # in-flight table
+            if not cached_response:
+                cached_response = self._get_live_response(cache_key)
+            if not cached_response:
+                if self.stale_while_revalidate:
+                    stale_response = self._get_stale_response(cache_key)
+                if stale_response is not None:
+                    # The stale copy is answered now; its refresh is a waiter
+                    # of the (new or already pending) fetch
+                    stale_response = StaleResponse(stale_response, refresh=Future())
+                    if cache_key in self.inflight:
+                        self.inflight[cache_key].append(stale_response.refresh)
+                        self._extend_deadline(cache_key, None)
+                    else:
+                        self.inflight[cache_key] = [stale_response.refresh]
+                        self.deadlines[cache_key] = None
+                        queue_priority = self.REFRESH_PRIORITY
+                        queue_client = self.REFRESH_CLIENT
+                elif cache_key in self.inflight:
+                    # Attach to an identical request that is already pending
+                    self.inflight[cache_key].append(future)
+                    self._extend_deadline(cache_key, deadline)
+                    metrics.inc('requests', result='coalesced')
+                    logging.debug(f"Request coalesced with in-flight fetch: {endpoint}")
+                    return future
+                else:
+                    self.inflight[cache_key] = [future]
+                    self.deadlines[cache_key] = deadline
+                    queue_priority = priority
+        
+        if queue_priority is not None:
+            self._enqueue(endpoint, params, cache_key, queue_priority, client=queue_client)
+        
+        # Answer cache hits without going through the queue
+        if cached_response:
+            metrics.inc('requests', result='cache_hit')
+            logging.debug(f"Cache hit for request: {endpoint}")
+            future.set_result(cached_response)
+        elif stale_response is not None:
+            metrics.inc('requests', result='stale')
+            logging.debug(f"Serving stale response while revalidating: {endpoint}")
+            future.set_result(stale_response)
+        else:
+            metrics.inc('requests', result='fetch')
+        return future
+
+    def refresh(self, endpoint: str, params: Dict, priority: Optional[int] = None) -> Future:
+        """
+        Queue a fetch that replaces the cached response even if it is still fresh
+        
+        Args:
+            endpoint: API endpoint
+            params: Request parameters
+            priority: Request priority (defaults to REFRESH_PRIORITY)
+            
+        Returns:
+            Future resolving to the refreshed response
+        """
+        self.start()
+        future = Future()
+        cache_key = self._generate_cache_key(endpoint, params)
+        with self.inflight_lock:
+            if cache_key in self.inflight:
+                self.inflight[cache_key].append(future)
+                self._extend_deadline(cache_key, None)
+                return future
+            self.inflight[cache_key] = [future]
+            self.deadlines[cache_key] = None
+        self._enqueue(endpoint, params, cache_key,
+                      self.REFRESH_PRIORITY if priority is None else priority,
+                      refresh=True, client=self.REFRESH_CLIENT)
+        return future
+
+    def submit_async(self, endpoint: str, params: Dict, priority: int = 1,
+                     deadline: Optional[float] = None, client: Optional[str] = None,
+                     track: bool = True) -> asyncio.Future:
+        """
+        Queue a new API request and return an awaitable for its response
+        
+        Must be called from a running event loop. Cancelling the awaitable
+        detaches the caller from the request.
+        """
+        return asyncio.wrap_future(self.submit(endpoint, params, priority, deadline, client, track))
+
+    def request(self, endpoint: str, params: Dict, priority: int = 1, callback: callable = None,
+                error_callback: callable = None) -> None:
+        """
+        Queue a new API request
+        
+        Cached responses are delivered to the callback immediately; other
+        responses are delivered on the callback executor. Requests identical
+        to one already in flight share its upstream fetch.
+        
+        Args:
+            endpoint: API endpoint
+            params: Request parameters
+            priority: Request priority (lower number = higher priority)
+            callback: Function to call with the response
+            error_callback: Function to call with the exception if the request fails
+        """
+        future = self.submit(endpoint, params, priority)
+        if callback is None and error_callback is None:
+            return
+        
+        def deliver(completed: Future) -> None:
+            if completed.cancelled():
+                return
+            error = completed.exception()
+            handler, value = (error_callback, error) if error is not None else (callback, completed.result())
+            if handler is None:
+                return
+            try:
+                handler(value)
+            except Exception as e:
+                logging.error(f"Error in request callback: {str(e)}")
+        
+        if future.done():
+            # Cache hits are delivered on the caller's thread
+            deliver(future)
+        else:
+            future.add_done_callback(lambda completed: self.callback_executor.submit(deliver, completed))
+
 # Global request manager instance
 _request_manager = None
+_request_manager_lock = Lock()
 
 def get_request_manager() -> ABSRequestManager:
-    """Get or create the global request manager instance"""
+    """
+    Get or create the global request manager instance
+    
+    The first call loads .env and sets up abs_api.log; importing this module
+    has no side effects. The manager's threads start on its first request.
+    """
     global _request_manager
     if _request_manager is None:
-        _request_manager = ABSRequestManager()
+        with _request_manager_lock:
+            if _request_manager is None:
+                load_dotenv()
+                # Written by a background listener, off the request path
+                setup_logging('abs_api.log')
+                _request_manager = ABSRequestManager()
     return _request_manager
@@ -0,0 +1,84 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Hashable, Tuple
+from threading import Lock
+
+class SerializedResult(dict):
+    """
+    An RPC result that also carries its JSON encoding
+
+    It behaves as the plain result dict everywhere; servers that know about
+    it can write `serialized` instead of encoding the dict again.
+    """
+    def __init__(self, value: Dict[str, Any], serialized: bytes):
+        super().__init__(value)
+        self.serialized = serialized
+
+class ResultCache:
+    """
+    LRU cache of final analysis results with dependency validation.
+
+    Each result is stored with the versions of the data it was built from
+    (e.g. one token per region cache entry). A lookup passes the current
+    versions and only hits when they are unchanged, so refreshing any
+    underlying entry invalidates every result built from it. Results are
+    also dropped after `ttl` seconds.
+    """
+    def __init__(self, max_entries: int = 256, ttl: int = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls) -> Optional['ResultCache']:
+        """Build a result cache from ABS_RESULT_CACHE, ABS_RESULT_CACHE_SIZE and ABS_RESULT_CACHE_TTL"""
+        if os.getenv('ABS_RESULT_CACHE', 'true').lower() not in ('1', 'true', 'yes'):
+            return None
+        return cls(
+            max_entries=int(os.getenv('ABS_RESULT_CACHE_SIZE', 256)),
+            ttl=int(os.getenv('ABS_RESULT_CACHE_TTL', 3600))
+        )
+
+    def get(self, key: Hashable, dependencies: Tuple) -> Optional[Any]:
+        """Return the result for `key` if it was built from `dependencies`"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_dependencies, result, created = entry
+            if (stored_dependencies != dependencies or None in dependencies
+                    or created + self.ttl < time.time()):
+                del self.entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def set(self, key: Hashable, dependencies: Tuple, result: Any) -> None:
+        """Store a result together with the dependency versions it was built from"""
+        if None in dependencies:
+            return
+        with self.lock:
+            self.entries[key] = (dependencies, result, time.time())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
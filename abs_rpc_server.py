@@ -1,91 +1,523 @@
-import sys
+from __future__ import annotations
+
 import logging
 import os
 from dotenv import load_dotenv
-from jsonrpclib.SimpleJSONRPCServer import SimpleJSONRPCServer
+import jsonrpclib
+from jsonrpclib import utils as jsonrpc_utils
+from jsonrpclib.SimpleJSONRPCServer import SimpleJSONRPCServer, SimpleJSONRPCRequestHandler, NoMulticallResult
+from jsonrpclib.jsonrpc import Fault
 from datetime import datetime
-import pandas as pd
-import numpy as np
-from typing import Dict, List, Any
-from threading import Event
-from abs_request_manager import get_request_manager
-from time import sleep
-import requests
-
-# Load environment variables
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('abs_labour_force.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+from typing import TYPE_CHECKING, Dict, List, Any, Tuple, Optional
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from threading import Thread, Lock, BoundedSemaphore, local
+import json
+import gzip
+import base64
+import itertools
+from abs_request_manager import get_request_manager, StaleResponse
+from abs_series_cache import SeriesCache
+from abs_sdmx import decode_observations, observation_columns, encode_columns, select_observations
+from abs_structure import StructureRegistry, SeriesSelection
+from abs_metrics import metrics
+from abs_result_cache import ResultCache, SerializedResult
+from abs_logging import setup_logging
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if TYPE_CHECKING:
+    # pandas (and abs_downsample with it) is imported on first analysis so
+    # the server starts listening without paying for it
+    import pandas as pd
+
+class RegionData(dict):
+    """
+    A region's response assembled from the caches, with the data_version
+    it was built from
+
+    The version is read before the response is built, so a merge racing
+    with the assembly can only make the data look older than it is.
+    """
+    def __init__(self, data: Dict[str, Any], version: Optional[Any]):
+        super().__init__(data)
+        self.version = version
 
 class ABSDataRetriever:
     def __init__(self):
         self.base_url = 'https://api.data.abs.gov.au/data'
-        self.api_key = os.getenv('ABS_API_KEY')
+        # Loads .env on first use, so the key is read after it
         self.request_manager = get_request_manager()
+        self.api_key = os.getenv('ABS_API_KEY')
         if not self.api_key:
             raise ValueError("ABS API key not found in environment variables")
         
-    def get_labour_force_data(self, start_date: str, end_date: str, region_code: str) -> Dict[str, Any]:
+        # Maximum number of region codes OR-ed into a single SDMX query
+        self.max_batch_regions = int(os.getenv('ABS_MAX_BATCH_REGIONS', 25))
+        
+        # Period-aware series cache; only missing edge months are fetched
+        self.series_cache = SeriesCache.from_env()
+        if self.series_cache is not None:
+            # Expired entries of series nobody asks for again are swept too
+            self.request_manager.add_cleanup(self.series_cache.clear_expired)
+        
+        # Upstream response format: 'csv' streams SDMX-CSV straight into
+        # compact columns, 'json' downloads and parses SDMX-JSON
+        self.response_format = os.getenv('ABS_RESPONSE_FORMAT', 'json')
+        
+        # Seconds to wait for a response when the caller gives no deadline
+        self.request_timeout = float(os.getenv('ABS_REQUEST_TIMEOUT', 60))
+        
+        # Cached LM data structure used to validate series selections
+        self.structures = StructureRegistry.from_env(self.request_manager)
+
+    def select_series(self, dimensions: Dict[str, Any], deadline: Optional[float] = None) -> SeriesSelection:
         """
-        Retrieve labour force data from ABS API
+        Validate dimension codes (e.g. MEASURE, SEX, AGE, TSEST) against the
+        LM data structure
         
         Args:
-            start_date: Start date in YYYY-MM format
-            end_date: End date in YYYY-MM format
-            region_code: ABS region code
+            dimensions: Codes per dimension id, as lists or "+"-joined strings
+            deadline: time.time() to give up fetching the data structure at
+                (default request_timeout from now)
             
         Returns:
-            Dictionary containing the labour force data
+            SeriesSelection to pass to the retrieval methods
         """
-        # Create an event to wait for the response
-        response_event = Event()
-        response_data = {}
-        
-        def callback(data):
-            response_data['result'] = data
-            response_event.set()
-        
-        # Prepare request parameters
-        params = {
+        return self.structures.select('LM', dimensions, self._deadline(deadline) - time.time())
+
+    def _series_id(self, selection: Optional[SeriesSelection]) -> str:
+        """Series cache key of the selected LM series"""
+        return selection.series_id if selection else 'LM'
+
+    def _build_params(self, start_date: str, end_date: str, region_code: str,
+                      selection: Optional[SeriesSelection] = None) -> Dict[str, Any]:
+        """
+        Build the LM query parameters for one region code (or an OR-ed list
+        of codes), filtering every selected dimension upstream
+
+        Filtered requests ask for observations only (detail=dataonly);
+        unfiltered ones keep the full response with its attributes.
+        """
+        return {
             'startPeriod': start_date,
             'endPeriod': end_date,
             'c[REGION]': region_code,
+            **(selection.filters() if selection else {}),
             'frequency': 'M',
-            'detail': 'Full',
-            'format': 'json'
+            'detail': 'dataonly' if selection else 'Full',
+            'format': self.response_format
         }
-        
-        # Queue the request
-        self.request_manager.request(
+
+    def _select(self, data: Dict[str, Any], selection: Optional[SeriesSelection]) -> Dict[str, Any]:
+        """Drop observations outside the selection (if upstream ignored a filter)"""
+        return select_observations(data, selection.codes()) if selection else data
+
+    def _submit(self, params: Dict[str, Any], deadline: Optional[float] = None,
+                client: Optional[str] = None) -> Future:
+        """Queue an LM request and return a future for its response"""
+        # With the series cache, its entries are refreshed (see _track_series)
+        # rather than the raw edge-range and batched keys nothing reads again
+        return self.request_manager.submit(
             endpoint='LM',
             params=params,
             priority=1,
-            callback=callback
+            deadline=deadline,
+            client=client,
+            track=self.series_cache is None
         )
+
+    def _deadline(self, deadline: Optional[float]) -> float:
+        """The caller's deadline, or one request_timeout from now"""
+        return time.time() + self.request_timeout if deadline is None else deadline
+
+    def wait_for_response(self, future: Future, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Wait for a queued request's response until the deadline
         
-        # Wait for response (with timeout)
-        if not response_event.wait(timeout=60):
+        On timeout the future is cancelled so the queued request is dropped
+        instead of being fetched for nobody.
+        
+        Args:
+            future: Future returned by one of the submit methods
+            deadline: time.time() to give up at (default request_timeout from now)
+        """
+        try:
+            return future.result(timeout=max(0.0, self._deadline(deadline) - time.time()))
+        except FutureTimeoutError:
+            # Nobody reads the response any more
+            future.cancel()
             raise TimeoutError("Request timed out")
+
+    def _missing_ranges(self, start_date: str, end_date: str, region_code: str,
+                        selection: Optional[SeriesSelection] = None) -> List[Tuple[str, str]]:
+        """Period ranges of a region that still have to be fetched upstream"""
+        if self.series_cache is None:
+            cached = self.request_manager.get_cached('LM', self._build_params(start_date, end_date, region_code, selection))
+            return [] if cached else [(start_date, end_date)]
+        return self.series_cache.missing_ranges(self._series_id(selection), region_code, start_date, end_date)
+
+    def _store_range(self, region_code: str, start_date: str, end_date: str, data: Dict[str, Any],
+                     selection: Optional[SeriesSelection] = None, stale: bool = False) -> None:
+        """
+        Store a single-region response fetched for a period range
+
+        Stale responses are never stored as fresh: they only extend a live
+        series cache entry, and the request manager already keeps its own copy.
+        """
+        if self.series_cache is None:
+            if not stale:
+                self.request_manager.prime_cache('LM', self._build_params(start_date, end_date, region_code, selection), data)
+        else:
+            self.series_cache.merge(self._series_id(selection), region_code, data, start_date, end_date, stale=stale)
+
+    def _revalidate(self, response: StaleResponse, region_codes: List[str], start_date: str, end_date: str,
+                    selection: Optional[SeriesSelection] = None) -> None:
+        """Merge the refreshed copy of a stale response into the series cache once it arrives"""
+        if self.series_cache is None or response.refresh is None:
+            return
+        
+        def store(done: Future) -> None:
+            if done.cancelled() or done.exception() is not None or isinstance(done.result(), StaleResponse):
+                return
+            try:
+                data = self._select(done.result(), selection)
+                split = self._split_by_region(data, region_codes) if len(region_codes) > 1 else {region_codes[0]: data}
+                for region_code, region_data in split.items():
+                    self._store_range(region_code, start_date, end_date, region_data, selection)
+            except Exception as e:
+                logging.error(f"Error storing revalidated data for regions {'+'.join(region_codes)}: {str(e)}")
+        
+        response.refresh.add_done_callback(store)
+
+    def _store_empty(self, region_code: str, start_date: str, end_date: str,
+                     selection: Optional[SeriesSelection] = None) -> None:
+        """Record that an edge range of a region's cached series has no observations"""
+        if self.series_cache is not None:
+            self.series_cache.merge_empty(self._series_id(selection), region_code, start_date, end_date)
+
+    def _is_no_records(self, error: BaseException) -> bool:
+        """Whether an upstream error is the SDMX answer for a range without observations (404 NoRecordsFound)"""
+        return getattr(getattr(error, 'response', None), 'status_code', None) == 404
+
+    def _assemble(self, start_date: str, end_date: str, region_code: str,
+                  selection: Optional[SeriesSelection] = None) -> Optional[RegionData]:
+        """Build a region's response for the full period range from the caches"""
+        version = self.data_version(start_date, end_date, region_code, selection)
+        if self.series_cache is None:
+            data = self.request_manager.get_cached('LM', self._build_params(start_date, end_date, region_code, selection))
+        else:
+            self._track_series(region_code, selection)
+            data = self.series_cache.build_response(self._series_id(selection), region_code, start_date, end_date)
+        return RegionData(data, version) if data else None
+
+    def data_version(self, start_date: str, end_date: str, region_code: str,
+                     selection: Optional[SeriesSelection] = None) -> Optional[Any]:
+        """Token that changes whenever the cached data behind a region's response changes"""
+        if self.series_cache is None:
+            return self.request_manager.get_cache_version('LM', self._build_params(start_date, end_date, region_code, selection))
+        return self.series_cache.version(self._series_id(selection), region_code)
+
+    def _track_series(self, region_code: str, selection: Optional[SeriesSelection] = None) -> None:
+        """Report a region's series cache entry to the refresh scheduler"""
+        scheduler = self.request_manager.refresh_scheduler
+        if scheduler:
+            series_id = self._series_id(selection)
+            scheduler.track(
+                ('series', series_id, region_code),
+                lambda: self._refresh_series(region_code, selection),
+                lambda: self.series_cache.expiry(series_id, region_code),
+                group='LM'
+            )
+
+    def _refresh_series(self, region_code: str, selection: Optional[SeriesSelection] = None) -> Optional[Future]:
+        """
+        Re-fetch a region's cached range through the current month at low
+        priority and merge it into the series cache with a renewed TTL
+        """
+        series_id = self._series_id(selection)
+        covered = self.series_cache.covered_range(series_id, region_code)
+        if covered is None:
+            return None
+        start_date, end_date = covered[0], max(covered[1], datetime.now().strftime('%Y-%m'))
+        future = self.request_manager.refresh('LM', self._build_params(start_date, end_date, region_code, selection))
         
-        if 'result' not in response_data:
-            raise ValueError("No data received from API")
+        def store(done: Future) -> None:
+            if done.cancelled() or done.exception() is not None:
+                return
+            try:
+                data = self._select(done.result(), selection)
+                self.series_cache.merge(series_id, region_code, data, start_date, end_date, renew=True)
+            except Exception as e:
+                logging.error(f"Error refreshing series for region {region_code}: {str(e)}")
         
-        return response_data['result']
+        future.add_done_callback(store)
+        return future
+
+    def _when_all(self, futures: List[Future], finish: callable, result_of: callable = None) -> Future:
+        """
+        Return a future resolving to finish(results) once all futures are done
+        
+        `result_of(future)` reads each result (default future.result()), so
+        callers can turn expected errors into results.
+        """
+        result = Future()
+        remaining = [len(futures)]
+        lock = Lock()
+        result_of = result_of or (lambda future: future.result())
+        
+        def complete():
+            try:
+                result.set_result(finish([result_of(future) for future in futures]))
+            except Exception as e:
+                result.set_exception(e)
+        
+        def cancel_inputs(done: Future) -> None:
+            # A caller giving up on the combined result gives up on its parts
+            if done.cancelled():
+                for future in futures:
+                    future.cancel()
+        
+        def on_done(_):
+            # Done callbacks of different futures may run on different threads
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                complete()
+        
+        result.add_done_callback(cancel_inputs)
+        if not futures:
+            complete()
+        for future in futures:
+            future.add_done_callback(on_done)
+        return result
+
+    def submit_labour_force_data(self, start_date: str, end_date: str, region_code: str,
+                                 deadline: Optional[float] = None, client: Optional[str] = None,
+                                 selection: Optional[SeriesSelection] = None) -> Future:
+        """
+        Queue a labour force data request without waiting for it
+        
+        With the series cache enabled, only the months missing at the edges
+        of the cached range are requested upstream. Cancelling the returned
+        future cancels the underlying requests.
+        
+        Args:
+            start_date: Start date in YYYY-MM format
+            end_date: End date in YYYY-MM format
+            region_code: ABS region code
+            deadline: time.time() after which the response is no longer needed
+            client: Request queue client the upstream requests are scheduled under
+            selection: Series to request (see select_series); all series by default
+            
+        Returns:
+            Future resolving to the labour force data
+        """
+        ranges = self._missing_ranges(start_date, end_date, region_code, selection)
+        futures = [
+            self._submit(self._build_params(range_start, range_end, region_code, selection), deadline, client)
+            for range_start, range_end in ranges
+        ]
+        narrowed = ranges != [(start_date, end_date)]
+        
+        def edge_result(future: Future) -> Optional[Dict[str, Any]]:
+            # An edge of a cached range with nothing published (yet) is
+            # answered with 404; the cached months are still served
+            try:
+                return future.result()
+            except Exception as e:
+                if narrowed and self._is_no_records(e):
+                    return None
+                raise
+        
+        def finish(responses: List[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+            served = None
+            for (range_start, range_end), data in zip(ranges, responses):
+                if data is None:
+                    self._store_empty(region_code, range_start, range_end, selection)
+                    continue
+                stale = isinstance(data, StaleResponse)
+                if stale:
+                    self._revalidate(data, [region_code], range_start, range_end, selection)
+                selected = self._select(data, selection)
+                self._store_range(region_code, range_start, range_end, selected, selection, stale=stale)
+                if stale and not narrowed:
+                    # Answered as is; only the revalidated copy is cached
+                    served = selected
+            data = self._assemble(start_date, end_date, region_code, selection) or served
+            if not data:
+                raise ValueError("No data received from API")
+            return data
+        
+        return self._when_all(futures, finish, edge_result)
+        
+    def get_labour_force_data(self, start_date: str, end_date: str, region_code: str,
+                              deadline: Optional[float] = None, client: Optional[str] = None,
+                              selection: Optional[SeriesSelection] = None) -> Dict[str, Any]:
+        """
+        Retrieve labour force data from ABS API
+        
+        Args:
+            start_date: Start date in YYYY-MM format
+            end_date: End date in YYYY-MM format
+            region_code: ABS region code
+            deadline: time.time() to give up at (default request_timeout from now)
+            client: Request queue client the upstream requests are scheduled under
+            selection: Series to request (see select_series); all series by default
+            
+        Returns:
+            Dictionary containing the labour force data
+        """
+        deadline = self._deadline(deadline)
+        return self.wait_for_response(
+            self.submit_labour_force_data(start_date, end_date, region_code, deadline, client, selection),
+            deadline
+        )
+
+    def get_labour_force_data_batch(self, start_date: str, end_date: str, region_codes: List[str],
+                                    deadline: Optional[float] = None,
+                                    client: Optional[str] = None,
+                                    selection: Optional[SeriesSelection] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Retrieve labour force data for several regions with OR-ed SDMX queries
+        
+        Regions already cached are served from the cache. Regions missing the
+        same period ranges are folded into queries of up to max_batch_regions
+        codes (e.g. ``1+2+3GBRI``), and each response is split back into
+        per-region payloads that are cached per region.
+        
+        Args:
+            start_date: Start date in YYYY-MM format
+            end_date: End date in YYYY-MM format
+            region_codes: ABS region codes
+            deadline: time.time() to give up at (default request_timeout from now)
+            client: Request queue client the upstream requests are scheduled under
+            selection: Series to request (see select_series); all series by default
+            
+        Returns:
+            Dictionary mapping region code to its labour force data. Regions
+            missing from the upstream response are omitted.
+        """
+        deadline = self._deadline(deadline)
+        
+        # Group regions by the period ranges they still need
+        plans = {}
+        for region_code in dict.fromkeys(region_codes):
+            ranges = tuple(self._missing_ranges(start_date, end_date, region_code, selection))
+            plans.setdefault(ranges, []).append(region_code)
+        
+        # Queue every chunk up front, then gather
+        batches = []
+        for ranges, plan_regions in plans.items():
+            narrowed = ranges != ((start_date, end_date),)
+            for i in range(0, len(plan_regions), self.max_batch_regions):
+                chunk = plan_regions[i:i + self.max_batch_regions]
+                for range_start, range_end in ranges:
+                    future = self._submit(self._build_params(range_start, range_end, '+'.join(chunk), selection), deadline, client)
+                    batches.append((chunk, range_start, range_end, narrowed, future))
+        served = {}
+        try:
+            for chunk, range_start, range_end, narrowed, future in batches:
+                try:
+                    response = self.wait_for_response(future, deadline)
+                except Exception as e:
+                    # Nothing published for this edge of the cached range
+                    if not (narrowed and self._is_no_records(e)):
+                        raise
+                    for region_code in chunk:
+                        self._store_empty(region_code, range_start, range_end, selection)
+                    continue
+                stale = isinstance(response, StaleResponse)
+                if stale:
+                    self._revalidate(response, chunk, range_start, range_end, selection)
+                split = self._split_by_region(self._select(response, selection), chunk)
+                for region_code in chunk:
+                    if region_code in split:
+                        self._store_range(region_code, range_start, range_end, split[region_code], selection, stale=stale)
+                        if stale and not narrowed:
+                            # Answered as is; only the revalidated copy is cached
+                            served[region_code] = split[region_code]
+                    elif narrowed:
+                        self._store_empty(region_code, range_start, range_end, selection)
+        except Exception:
+            # Chunks still queued are not needed any more
+            for *_, future in batches:
+                future.cancel()
+            raise
+        
+        results = {}
+        for region_code in dict.fromkeys(region_codes):
+            data = self._assemble(start_date, end_date, region_code, selection) or served.get(region_code)
+            if data:
+                results[region_code] = data
+        
+        return results
+
+    def _split_by_region(self, raw_data: Dict[str, Any], region_codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Split a multi-region response into single-region compact payloads
+        
+        Each part keeps the original dimensions with the REGION dimension
+        narrowed to one value, so it decodes like the response to a
+        single-region query.
+        
+        Args:
+            raw_data: Raw JSON data (or compact columns) covering several regions
+            region_codes: Region codes that were requested
+            
+        Returns:
+            Dictionary mapping region code to its compact columns payload
+        """
+        dimensions, indices, values = observation_columns(raw_data)
+        region_pos = next(
+            (i for i, dim in enumerate(dimensions) if dim.get('id') == 'REGION'),
+            None
+        )
+        if region_pos is None:
+            raise ValueError("REGION dimension not found in ABS data structure")
+        
+        region_dim = dimensions[region_pos]
+        split = {}
+        for region_index, value in enumerate(region_dim.get('values', [])):
+            region_code = value.get('id')
+            if region_code not in region_codes:
+                continue
+            mask = indices[:, region_pos] == region_index
+            if not mask.any():
+                continue
+            region_indices = indices[mask]
+            region_indices[:, region_pos] = 0
+            region_dimensions = list(dimensions)
+            region_dimensions[region_pos] = {**region_dim, 'values': [value]}
+            split[region_code] = encode_columns(region_dimensions, region_indices, values[mask])
+        
+        return split
 
 class ABSAnalyzer:
+    SERIES_FORMATS = ('records', 'columnar', 'binary')
+
     def __init__(self):
         self.data_retriever = ABSDataRetriever()
+        
+        # Final responses keyed by normalized request, validated against the
+        # versions of the region data they were built from
+        self.result_cache = ResultCache.from_env()
+        
+        # Region indicators keyed by (dates, region set, selection), shared
+        # by results that differ only in their time series options
+        self.indicator_cache = ResultCache.from_env()
+        
+        # Calls without a client_id each get their own request queue client
+        self.call_ids = itertools.count(1)
 
-    def get_regions(self):
-        # Return real ABS regions with correct ASGS codes
+    @staticmethod
+    def get_regions():
+        # Return real ABS regions with correct ASGS codes (static, so it is
+        # served without building the analyzer)
         regions = [
             # Victoria
             {"code": "2GMEL", "name": "Greater Melbourne", "state": "Victoria"},
@@ -122,6 +554,27 @@ class ABSAnalyzer:
         ]
         return {"regions": regions}
 
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Stage timings, counters and gauges plus cache and rate limiter state
+        
+        Returns:
+            Dictionary of metrics (the same counters, gauges and timings are
+            served in Prometheus text format at /metrics)
+        """
+        request_manager = self.data_retriever.request_manager
+        series_cache = self.data_retriever.series_cache
+        return {
+            **metrics.snapshot(),
+            'cache': request_manager.get_cache_stats(),
+            'series_cache': series_cache.stats() if series_cache else None,
+            'result_cache': self.result_cache.stats() if self.result_cache else None,
+            'rate_limit': request_manager.get_rate_limit_state(),
+            'queue': request_manager.get_queue_stats(),
+            'circuit_breaker': request_manager.get_circuit_state(),
+            'refresh': request_manager.refresh_scheduler.stats() if request_manager.refresh_scheduler else None
+        }
+
     def _process_region_data(self, raw_data: Dict[str, Any]) -> pd.DataFrame:
         """
         Process raw ABS data into a pandas DataFrame
@@ -133,37 +586,9 @@ class ABSAnalyzer:
             Processed DataFrame with employment statistics
         """
         try:
-            # Extract observations from the ABS data structure
-            observations = raw_data.get('dataSets', [{}])[0].get('observations', {})
-            if not observations:
-                raise ValueError("No observations found in ABS data")
-            
-            # Convert observations to list of dictionaries
-            data_list = []
-            for key, value in observations.items():
-                indices = key.split(':')
-                if len(value) >= 1:  # Ensure there's at least one value
-                    data_list.append({
-                        'time_period': indices[0],
-                        'value': value[0]
-                    })
-            
-            # Convert to DataFrame
-            df = pd.DataFrame(data_list)
-            
-            # Convert values to numeric
-            df['value'] = pd.to_numeric(df['value'], errors='coerce')
-            
-            # Add date column in proper format
-            df['date'] = pd.to_datetime(df['time_period'], format='%Y-%m').dt.strftime('%Y-%m')
-            
-            # Calculate rates based on the type of data
-            # Note: The actual calculation will depend on the specific data structure from the ABS API
-            # You may need to adjust these calculations based on the actual data received
-            
-            df = df.sort_values('date')
-            
-            return df
+            # Decode observations into typed, period-sorted columns
+            with metrics.timed('process_region_data'):
+                return decode_observations(raw_data)
             
         except Exception as e:
             logging.error(f"Error processing ABS data: {str(e)}")
@@ -178,26 +603,106 @@ class ABSAnalyzer:
                 - start_date: Start date in YYYY-MM format
                 - end_date: End date in YYYY-MM format
                 - selected_regions: List of region codes
+                - batch: Fetch regions with batched multi-region queries (default True)
+                - series_format: 'records' (default), 'columnar' or 'binary'
+                - timeout: Seconds the client will wait for the answer
+                  (default ABS_REQUEST_TIMEOUT); upstream requests still
+                  queued when it runs out are dropped
+                - client_id: Groups the upstream requests of several calls
+                  for fair queuing (default: one group per call)
+                - resample: 'quarterly' or 'annual' time series instead of monthly
+                - resample_method: 'mean' (default) or 'last' month of each period
+                - max_points: Maximum time series points per region; longer
+                  series are downsampled keeping their lows and highs
+                - dimensions: Codes of other LM dimensions to request, e.g.
+                  {'MEASURE': 'M13', 'SEX': '3', 'AGE': '1599', 'TSEST': '20'};
+                  validated against the cached data structure and filtered
+                  upstream
                 
         Returns:
             Dictionary containing analyzed data and visualizations
         """
+        from abs_downsample import RESAMPLE_RULES, RESAMPLE_METHODS, MIN_POINTS
+
         try:
             start_date = params['start_date']
             end_date = params['end_date']
             region_codes = params.get('selected_regions', []) or params.get('selected_states', [])
+            # The client's time budget bounds every upstream wait below
+            deadline = time.time() + float(params.get('timeout') or self.data_retriever.request_timeout)
+            # Upstream requests of concurrent calls take turns in the queue
+            client = str(params.get('client_id') or f"rpc-{next(self.call_ids)}")
 
             if not region_codes:
                 raise ValueError("No regions selected for analysis")
 
-            results = []
-            for region_code in region_codes:
+            series_format = params.get('series_format', 'records')
+            if series_format not in self.SERIES_FORMATS:
+                raise ValueError(f"Unsupported series format: {series_format}")
+            
+            resample = params.get('resample')
+            if resample is not None and resample not in RESAMPLE_RULES:
+                raise ValueError(f"Unsupported resample frequency: {resample}")
+            resample_method = params.get('resample_method', 'mean')
+            if resample_method not in RESAMPLE_METHODS:
+                raise ValueError(f"Unsupported resample method: {resample_method}")
+            max_points = params.get('max_points')
+            if max_points is not None:
+                max_points = int(max_points)
+                if max_points < MIN_POINTS:
+                    raise ValueError(f"max_points must be at least {MIN_POINTS}")
+            
+            dimensions = params.get('dimensions')
+            selection = self.data_retriever.select_series(dimensions, deadline) if dimensions else None
+
+            # Repeat requests for the same dates and region set are answered
+            # from the result cache while none of their regions has changed
+            region_codes = list(dict.fromkeys(region_codes))
+            result_regions = tuple(sorted(region_codes))
+            result_key = (start_date, end_date, result_regions, series_format,
+                          resample, resample_method if resample else None, max_points, selection)
+            if self.result_cache is not None:
+                cached = self.result_cache.get(result_key, self._data_versions(start_date, end_date, result_regions, selection))
+                if cached is not None:
+                    return cached
+
+            # Fetch all regions with batched queries unless disabled; regions
+            # the batch could not provide fall back to single-region requests
+            batch_data = {}
+            if params.get('batch', True) and len(region_codes) > 1:
                 try:
-                    data = self.data_retriever.get_labour_force_data(
-                        start_date, 
+                    batch_data = self.data_retriever.get_labour_force_data_batch(
+                        start_date,
                         end_date,
-                        region_code
+                        region_codes,
+                        deadline,
+                        client,
+                        selection
                     )
+                except Exception as e:
+                    logging.warning(f"Batched retrieval failed, falling back to per-region requests: {str(e)}")
+
+            # Queue every remaining region up front so they are fetched
+            # concurrently, then gather the results in order
+            futures = {}
+            for region_code in region_codes:
+                if region_code not in batch_data and region_code not in futures:
+                    futures[region_code] = self.data_retriever.submit_labour_force_data(
+                        start_date,
+                        end_date,
+                        region_code,
+                        deadline,
+                        client,
+                        selection
+                    )
+
+            # Results are cached under the data versions they were built from
+            results = []
+            region_versions = {}
+            for region_code in region_codes:
+                try:
+                    data = batch_data.get(region_code) or self.data_retriever.wait_for_response(futures[region_code], deadline)
+                    region_versions[region_code] = getattr(data, 'version', None)
                     processed_data = self._process_region_data(data)
                     processed_data['region'] = region_code  # Add region identifier
                     results.append(processed_data)
@@ -208,72 +713,501 @@ class ABSAnalyzer:
             if not results:
                 raise ValueError("No data could be processed for any region")
 
-            return self._aggregate_results(results)
+            # Indicators are shared by calls for the same regions, range and
+            # selection whatever their series options
+            complete = len(results) == len(region_codes)
+            versions = tuple(region_versions[region_code] for region_code in result_regions) if complete else None
+            response = self._aggregate_results(
+                results, series_format, resample, resample_method, max_points,
+                cache_key=(start_date, end_date, result_regions, selection) if complete else None,
+                versions=versions
+            )
+            if self.result_cache is None or not complete:
+                return response
+
+            with metrics.timed('serialize'):
+                response = SerializedResult(response, _dumps(response))
+            self.result_cache.set(result_key, versions, response)
+            return response
 
         except Exception as e:
             logging.error(f"Analysis error: {str(e)}")
             raise
 
-    def _aggregate_results(self, results: List[pd.DataFrame]) -> Dict[str, Any]:
+    def _data_versions(self, start_date: str, end_date: str, region_codes: Tuple[str, ...],
+                       selection: Optional[SeriesSelection] = None) -> Tuple:
+        """Versions of the cached region data an analysis result depends on"""
+        return tuple(
+            self.data_retriever.data_version(start_date, end_date, region_code, selection)
+            for region_code in region_codes
+        )
+
+    def _encode_series(self, df: pd.DataFrame, series_format: str) -> Any:
+        """
+        Encode one region's time series for the wire
+        
+        Args:
+            df: Region DataFrame sorted by period
+            series_format: 'records' (list of {date, value} dicts), 'columnar'
+                (parallel date and value arrays) or 'binary' (base64 buffers of
+                little-endian int32 months since 1970-01 and float64 values)
+        """
+        if series_format == 'records':
+            return df[['date', 'value']].to_dict('records')
+        if series_format == 'columnar':
+            return {
+                'dates': df['date'].astype(str).tolist(),
+                'values': df['value'].tolist()
+            }
+        if series_format == 'binary':
+            months = df['period'].to_numpy().astype('datetime64[M]').astype('<i4')
+            return {
+                'length': len(df),
+                'dates': base64.b64encode(months.tobytes()).decode('ascii'),
+                'values': base64.b64encode(df['value'].to_numpy().astype('<f8').tobytes()).decode('ascii')
+            }
+        raise ValueError(f"Unsupported series format: {series_format}")
+
+    def _region_indicators(self, combined_df: pd.DataFrame, cache_key: Optional[Tuple] = None,
+                           versions: Optional[Tuple] = None) -> Tuple[str, Dict[str, Dict[str, Any]]]:
+        """
+        Latest date and per-region indicators of the combined monthly data
+        
+        Args:
+            combined_df: All regions' observations, each region sorted by period
+            cache_key: (start_date, end_date, region codes, selection) to
+                cache the indicators under; None to skip the cache
+            versions: Versions of the region data combined_df was built
+                from (see RegionData), in the order of the cache key regions
+            
+        Returns:
+            Tuple of the latest date and the indicators per region (see
+            abs_indicators.region_indicators)
+        """
+        from abs_indicators import align_regions, region_indicators
+        
+        if cache_key is None or self.indicator_cache is None:
+            versions = None
+        if versions is not None:
+            cached = self.indicator_cache.get(cache_key, versions)
+            if cached is not None:
+                return cached
+        
+        with metrics.timed('indicators'):
+            matrix = align_regions(combined_df)
+            indicators = (str(matrix.labels[-1]), region_indicators(matrix))
+        if versions is not None:
+            self.indicator_cache.set(cache_key, versions, indicators)
+        return indicators
+
+    def _aggregate_results(self, results: List[pd.DataFrame], series_format: str = 'records',
+                           resample: Optional[str] = None, resample_method: str = 'mean',
+                           max_points: Optional[int] = None,
+                           cache_key: Optional[Tuple] = None,
+                           versions: Optional[Tuple] = None) -> Dict[str, Any]:
         """
         Aggregate results from multiple regions
         
+        Indicators always come from the monthly data; only the returned time
+        series are resampled and downsampled.
+        
         Args:
             results: List of processed DataFrames
+            series_format: Time series wire format (see _encode_series)
+            resample: 'quarterly' or 'annual' to resample the time series
+            resample_method: 'mean' or 'last' value of each resampled period
+            max_points: Maximum time series points per region
+            cache_key: Indicator cache key (see _region_indicators)
+            versions: Versions of the region data behind results
             
         Returns:
             Dictionary containing aggregated statistics and visualizations
         """
+        import pandas as pd
+        from abs_downsample import resample_series, downsample_series
+
         try:
-            # Combine all regional data
-            combined_df = pd.concat(results, ignore_index=True)
-            
-            # Get latest and previous month data
-            latest_data = combined_df.sort_values('date').groupby('region').last()
-            prev_data = combined_df.sort_values('date').groupby('region').nth(-2)
-            
-            # Calculate changes
-            changes = latest_data - prev_data
-            
-            # Prepare the response
-            response = {
-                "latest_date": combined_df['date'].max(),
-                "regions": {}
-            }
-            
-            # Process each region
-            for region in latest_data.index:
-                response["regions"][region] = {
-                    "current": {
-                        "value": float(latest_data.loc[region, 'value'])
-                    },
-                    "changes": {
-                        "value": float(changes.loc[region, 'value'])
+            with metrics.timed('aggregate_results'):
+                # Combine all regional data; every region's frame is already
+                # sorted by period, so no re-sort is needed
+                combined_df = pd.concat(results, ignore_index=True)
+                
+                # Latest values, month-on-month and year-on-year changes,
+                # rolling means and ranks of all regions in one matrix pass
+                latest_date, indicators = self._region_indicators(combined_df, cache_key, versions)
+                response = {
+                    "latest_date": latest_date,
+                    "regions": {
+                        region: {
+                            "current": {"value": region_data['value']},
+                            "changes": {"value": region_data['month_on_month']},
+                            "indicators": region_data
+                        }
+                        for region, region_data in indicators.items()
                     }
                 }
-            
-            # Add time series data
-            response["time_series"] = {
-                region: df[['date', 'value']]
-                .to_dict('records')
-                for region, df in combined_df.groupby('region')
-            }
-            
-            return response
+                
+                # Add time series data, reduced for charting if requested
+                series_df = combined_df[['region', 'date', 'period', 'value']]
+                if resample:
+                    series_df = resample_series(series_df, resample, resample_method)
+                if max_points:
+                    series_df = downsample_series(series_df, max_points)
+                response["time_series_format"] = series_format
+                response["time_series_resolution"] = resample or 'monthly'
+                response["time_series"] = {
+                    region: self._encode_series(df, series_format)
+                    for region, df in series_df.groupby('region')
+                }
+                
+                return response
             
         except Exception as e:
             logging.error(f"Error aggregating results: {str(e)}")
             raise
 
-def start_rpc_server(host='localhost', port=8080):
-    server = SimpleJSONRPCServer((host, port))
-    analyzer = ABSAnalyzer()
+class LazyAnalyzer:
+    """
+    Builds the ABSAnalyzer on first use, or ahead of it from warm_up
     
-    server.register_function(analyzer.get_regions, 'get_regions')
+    Building the analyzer creates the request manager and the first
+    analysis imports pandas, so deferring both lets a new server answer
+    get_regions and health probes as soon as it is listening.
+    """
+    def __init__(self, factory=ABSAnalyzer):
+        self.factory = factory
+        self.analyzer: Optional[ABSAnalyzer] = None
+        self.error: Optional[str] = None
+        self.lock = Lock()
+        self.started = time.time()
+
+    def get(self) -> ABSAnalyzer:
+        """Return the analyzer, building it on the first call"""
+        if self.analyzer is None:
+            with self.lock:
+                if self.analyzer is None:
+                    try:
+                        with metrics.timed('analyzer_init'):
+                            self.analyzer = self.factory()
+                    except Exception as e:
+                        self.error = str(e)
+                        raise
+                    self.error = None
+        return self.analyzer
+
+    def warm_up(self) -> Thread:
+        """Build the analyzer, import pandas and start the request manager on a background thread"""
+        def run():
+            try:
+                analyzer = self.get()
+                # Imports the first analysis would otherwise pay for
+                import pandas  # noqa: F401
+                import abs_downsample  # noqa: F401
+                import abs_indicators  # noqa: F401
+                analyzer.data_retriever.request_manager.start()
+                logging.info(f"Analyzer warmed up {time.time() - self.started:.2f}s after start")
+            except Exception as e:
+                logging.error(f"Analyzer warm-up failed: {str(e)}")
+        
+        thread = Thread(target=run, daemon=True, name='abs-warmup')
+        thread.start()
+        return thread
+
+    def analyze_labour_force(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self.get().analyze_labour_force(params)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return self.get().get_metrics()
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Liveness and readiness state
+        
+        Returns:
+            Dictionary with status, ready (False only if the analyzer could
+            not be built), uptime and whether the analyzer and request
+            manager have been started
+        """
+        analyzer = self.analyzer
+        state = {
+            'status': 'ok' if self.error is None else 'error',
+            'ready': self.error is None,
+            'uptime': round(time.time() - self.started, 3),
+            'analyzer': 'loaded' if analyzer else ('failed' if self.error else 'idle')
+        }
+        if analyzer:
+            request_manager = analyzer.data_retriever.request_manager
+            state['request_manager'] = 'started' if request_manager.started else 'idle'
+            state['circuit_breaker'] = request_manager.get_circuit_state()['state']
+        if self.error:
+            state['error'] = self.error
+        return state
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize a JSON-RPC response with orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+class CompressingJSONRPCRequestHandler(SimpleJSONRPCRequestHandler):
+    """
+    JSON-RPC request handler that gzips responses larger than
+    encode_threshold for clients sending Accept-Encoding: gzip, and serves
+    Prometheus metrics on GET metrics_path and liveness and readiness
+    probes on GET liveness_path and readiness_path
+    """
+    metrics_path = '/metrics'
+    liveness_path = '/healthz'
+    readiness_path = '/readyz'
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == self.metrics_path:
+            self._send_body(200, metrics.prometheus().encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8')
+        elif path == self.liveness_path:
+            self._send_body(200, _dumps({'status': 'ok'}), 'application/json')
+        elif path == self.readiness_path and hasattr(self.server, 'health'):
+            # Not ready while draining or when the analyzer cannot be built
+            health = self.server.health()
+            self._send_body(200 if health['ready'] else 503, _dumps(health), 'application/json')
+        else:
+            self.report_404()
+
+    def _send_body(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.is_rpc_path_valid():
+            self.report_404()
+            return
+
+        config = getattr(self.server, 'json_config', jsonrpclib.config.DEFAULT)
+
+        try:
+            data = self.rfile.read(int(self.headers['content-length']))
+            data = self.decode_request_content(data)
+            if data is None:
+                # Unknown encoding, response has been sent
+                return
+
+            response = self.server._marshaled_dispatch(
+                jsonrpc_utils.from_bytes(data), getattr(self, '_dispatch', None), self.path
+            )
+            status = 200
+        except Exception as e:
+            logging.exception(f"Server-side error: {str(e)}")
+            status = 500
+            response = jsonrpclib.Fault(
+                -32603, f"Server error: {type(e).__name__}: {e}", config=config
+            ).response()
+
+        if not isinstance(response, bytes):
+            response = jsonrpc_utils.to_bytes(response or "")
+
+        self.send_response(status)
+        self.send_header('Content-type', config.content_type)
+        if (self.encode_threshold is not None and len(response) > self.encode_threshold
+                and 'gzip' in self.accept_encodings()):
+            with metrics.timed('compress'):
+                response = gzip.compress(response, compresslevel=5)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-length', str(len(response)))
+        self.end_headers()
+        if response:
+            self.wfile.write(response)
+
+class ConcurrentJSONRPCServer(SimpleJSONRPCServer):
+    """
+    JSON-RPC server handling connections on a bounded thread pool
+    
+    Slow methods run in their own lane of `slow_workers` concurrent calls
+    with at most `slow_max_pending` waiting; further slow calls are rejected
+    with a busy fault. The remaining `workers` connection threads are kept
+    for cheap methods, so these never queue behind slow analysis calls.
+    Connections beyond the pool and `max_pending` get an immediate HTTP 503.
+    
+    `health_check` (a callable returning a dict with a 'ready' flag) backs
+    the readiness probe; the server reports itself not ready once shutdown
+    has begun.
+    """
+    BUSY_FAULT_CODE = -32000
+
+    def __init__(self, addr, workers: int = 8, max_pending: int = 16, slow_methods=(),
+                 slow_workers: int = 4, slow_max_pending: int = 8, health_check=None,
+                 requestHandler=CompressingJSONRPCRequestHandler, **kwargs):
+        self.health_check = health_check
+        self.draining = False
+        self.slow_methods = set(slow_methods)
+        self.slow_slots = BoundedSemaphore(slow_workers)
+        self.slow_admission = BoundedSemaphore(slow_workers + slow_max_pending)
+        
+        connection_workers = workers + slow_workers + slow_max_pending
+        self.connection_pool = ThreadPoolExecutor(
+            max_workers=connection_workers,
+            thread_name_prefix='abs-rpc'
+        )
+        self.connection_slots = BoundedSemaphore(connection_workers + max_pending)
+        # Pre-serialized result of the call being dispatched on this thread
+        self.raw_results = local()
+        super().__init__(addr, requestHandler=requestHandler, **kwargs)
+
+    def process_request(self, request, client_address):
+        """Queue the connection on the pool, or reject it when saturated"""
+        if not self.connection_slots.acquire(blocking=False):
+            metrics.inc('rpc_rejected', method='connection')
+            logging.warning(f"RPC server saturated, rejecting connection from {client_address}")
+            self._reject(request)
+            return
+        self.connection_pool.submit(self._process_request_slot, request, client_address)
+
+    def _process_request_slot(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.connection_slots.release()
+
+    def _reject(self, request):
+        """Answer with HTTP 503 without reading the request"""
+        body = json.dumps({
+            'jsonrpc': '2.0',
+            'id': None,
+            'error': {'code': self.BUSY_FAULT_CODE, 'message': 'Server busy, retry later'}
+        }).encode('utf-8')
+        try:
+            request.sendall(
+                b"HTTP/1.1 503 Service Unavailable\r\n"
+                b"Content-Type: application/json\r\n"
+                b"Retry-After: 1\r\n"
+                b"Connection: close\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode('ascii')
+                + body
+            )
+        except OSError:
+            pass
+        finally:
+            self.shutdown_request(request)
+
+    def _marshaled_dispatch(self, data, dispatch_method=None, path=None):
+        """Dispatch a request and serialize the response with the fast encoder"""
+        try:
+            request = jsonrpclib.loads(data, self.json_config)
+        except Exception:
+            # Let the base class build the parse error fault
+            return super()._marshaled_dispatch(data, dispatch_method, path)
+        
+        # Only a single call's result can be spliced in pre-serialized
+        self.raw_results.allowed = isinstance(request, dict)
+        self.raw_results.result = None
+        try:
+            response = self._unmarshaled_dispatch(request, dispatch_method)
+        except NoMulticallResult:
+            return ""
+        finally:
+            raw = self.raw_results.result
+            self.raw_results.result = None
+        if response is None:
+            # Notification
+            return ""
+        with metrics.timed('serialize'):
+            if raw is not None and isinstance(response, dict) and 'result' in response:
+                envelope = _dumps({key: value for key, value in response.items() if key != 'result'})
+                return envelope[:-1] + b',"result":' + raw.serialized + b'}'
+            return _dumps(response)
+
+    def _dispatch(self, method, params, config=None):
+        # Client-sent names are only used as metric labels once registered
+        label = method if method in self.funcs else 'unknown'
+        metrics.inc('rpc_calls', method=label)
+        if method not in self.slow_methods:
+            return self._timed_dispatch(method, label, params, config)
+        
+        if not self.slow_admission.acquire(blocking=False):
+            metrics.inc('rpc_rejected', method=label)
+            logging.warning(f"Slow lane saturated, rejecting {method}")
+            return Fault(self.BUSY_FAULT_CODE, "Server busy, retry later", config=config or self.json_config)
+        try:
+            with self.slow_slots:
+                return self._timed_dispatch(method, label, params, config)
+        finally:
+            self.slow_admission.release()
+
+    def _timed_dispatch(self, method, label, params, config=None):
+        with metrics.timed('rpc', method=label):
+            result = super()._dispatch(method, params, config)
+        # Method errors come back as faults rather than exceptions
+        if isinstance(result, Fault):
+            metrics.inc('rpc_errors', method=label, code=result.faultCode)
+        elif isinstance(result, SerializedResult) and getattr(self.raw_results, 'allowed', False):
+            # Written as is by _marshaled_dispatch instead of being re-encoded
+            self.raw_results.result = result
+            return None
+        return result
+
+    def health(self) -> Dict[str, Any]:
+        """Readiness state from health_check, not ready while draining"""
+        state = dict(self.health_check()) if self.health_check else {'status': 'ok', 'ready': True}
+        if self.draining:
+            state.update(status='draining', ready=False)
+        return state
+
+    def shutdown(self):
+        self.draining = True
+        super().shutdown()
+
+    def server_close(self):
+        super().server_close()
+        self.connection_pool.shutdown(wait=False)
+
+def create_rpc_server(host='localhost', port=8080, concurrent=True, warm_up: Optional[bool] = None):
+    """
+    Build the RPC server with the analysis methods registered
+    
+    Only configuration is loaded here. The analyzer (with the request
+    manager and pandas) is built on a warm-up thread once the socket is
+    listening, or by the first call that needs it when warm_up is off
+    (default from ABS_WARMUP).
+    """
+    load_dotenv()
+    setup_logging('abs_labour_force.log')
+    if not os.getenv('ABS_API_KEY'):
+        raise ValueError("ABS API key not found in environment variables")
+    
+    analyzer = LazyAnalyzer()
+    if concurrent:
+        server = ConcurrentJSONRPCServer(
+            (host, port),
+            workers=int(os.getenv('ABS_RPC_WORKERS', 8)),
+            max_pending=int(os.getenv('ABS_RPC_MAX_PENDING', 16)),
+            slow_methods=['analyze_labour_force'],
+            slow_workers=int(os.getenv('ABS_RPC_ANALYSIS_WORKERS', 4)),
+            slow_max_pending=int(os.getenv('ABS_RPC_ANALYSIS_MAX_PENDING', 8)),
+            health_check=analyzer.health
+        )
+    else:
+        server = SimpleJSONRPCServer((host, port))
+    
+    server.register_function(ABSAnalyzer.get_regions, 'get_regions')
     server.register_function(analyzer.analyze_labour_force, 'analyze_labour_force')
+    server.register_function(analyzer.get_metrics, 'get_metrics')
+    server.register_function(getattr(server, 'health', analyzer.health), 'get_health')
     
+    if warm_up is None:
+        warm_up = os.getenv('ABS_WARMUP', 'true').lower() in ('1', 'true', 'yes')
+    if warm_up:
+        analyzer.warm_up()
+    return server
+
+def start_rpc_server(host='localhost', port=8080, concurrent=True):
+    server = create_rpc_server(host, port, concurrent)
     print(f"Starting RPC server on {host}:{port}")
     server.serve_forever()
 
 if __name__ == "__main__":
-    start_rpc_server()
\ No newline at end of file
+    start_rpc_server()
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import csv
+import base64
+from array import array
+from operator import itemgetter
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple, Iterable
+
+if TYPE_CHECKING:
+    # Imported on first use; loading numpy and pandas dominates cold start
+    import numpy as np
+    import pandas as pd
+
+# Compact payload: SDMX structure plus base64 buffers of little-endian int32
+# observation indices (observations x dimensions) and float64 values
+COLUMNS_FORMAT = 'sdmx-columns'
+
+# SDMX-CSV columns that are neither dimensions nor the observation value
+CSV_STRUCTURE_COLUMNS = ('DATAFLOW', 'STRUCTURE', 'STRUCTURE_ID', 'ACTION')
+
+def _dimension_position(dimensions: List[Dict[str, Any]], dimension_id: str) -> Optional[int]:
+    return next(
+        (i for i, dim in enumerate(dimensions) if dim.get('id') == dimension_id),
+        None
+    )
+
+def _observation_values(observations: Dict[str, List]) -> np.ndarray:
+    """First value of every observation as float64"""
+    import numpy as np
+    try:
+        return np.fromiter(
+            map(itemgetter(0), observations.values()),
+            dtype=np.float64,
+            count=len(observations)
+        )
+    except (TypeError, ValueError, IndexError):
+        # Missing (null or empty) or non-numeric observations
+        import pandas as pd
+        values = [value[0] if value else None for value in observations.values()]
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(np.float64)
+
+def encode_columns(dimensions: List[Dict[str, Any]], indices: np.ndarray, values: np.ndarray) -> Dict[str, Any]:
+    """Build a compact columns payload from observation index and value arrays"""
+    import numpy as np
+    return {
+        'format': COLUMNS_FORMAT,
+        'structure': {'dimensions': {'observation': dimensions}},
+        'indices': base64.b64encode(np.ascontiguousarray(indices, dtype='<i4').tobytes()).decode('ascii'),
+        'values': base64.b64encode(np.ascontiguousarray(values, dtype='<f8').tobytes()).decode('ascii')
+    }
+
+def observation_columns(raw_data: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], np.ndarray, np.ndarray]:
+    """
+    Observation dimensions, index matrix and values of an SDMX-JSON or
+    compact columns payload
+
+    Returns:
+        Tuple of (observation dimensions, int64 array of shape
+        observations x dimensions, float64 array of values)
+    """
+    import numpy as np
+    dimensions = raw_data.get('structure', {}).get('dimensions', {}).get('observation', [])
+
+    if raw_data.get('format') == COLUMNS_FORMAT:
+        indices = np.frombuffer(base64.b64decode(raw_data['indices']), dtype='<i4')
+        values = np.frombuffer(base64.b64decode(raw_data['values']), dtype='<f8')
+        return dimensions, indices.astype(np.int64).reshape(len(values), len(dimensions)), values
+
+    observations = raw_data.get('dataSets', [{}])[0].get('observations', {})
+    if not observations:
+        return dimensions, np.empty((0, len(dimensions)), dtype=np.int64), np.empty(0, dtype=np.float64)
+
+    # Parse every "i:j:k" key at once into an (observations x dimensions) matrix
+    indices = np.fromstring(':'.join(observations), dtype=np.int64, sep=':')
+    if indices.size != len(observations) * len(dimensions):
+        raise ValueError("Observation keys do not match the ABS data structure")
+    return dimensions, indices.reshape(len(observations), len(dimensions)), _observation_values(observations)
+
+def select_observations(raw_data: Dict[str, Any], codes: Dict[str, Iterable[str]]) -> Dict[str, Any]:
+    """
+    Keep only the observations whose dimension codes are in `codes`
+
+    Guards against upstreams that ignore component filters. Payloads that
+    only contain the selected codes are returned unchanged.
+
+    Args:
+        raw_data: SDMX-JSON or compact columns payload
+        codes: Allowed codes per dimension id; dimensions missing from the
+            payload are ignored
+
+    Returns:
+        The payload itself, or a compact columns payload with the matching observations
+    """
+    import numpy as np
+    dimensions, indices, values = observation_columns(raw_data)
+    mask = None
+    for dimension_id, allowed in codes.items():
+        position = _dimension_position(dimensions, dimension_id)
+        if position is None:
+            continue
+        allowed = set(allowed)
+        keep = np.array([value.get('id') in allowed for value in dimensions[position]['values']], dtype=bool)
+        if keep.all():
+            continue
+        matches = keep[indices[:, position]] if len(keep) else np.zeros(len(values), dtype=bool)
+        mask = matches if mask is None else mask & matches
+    if mask is None:
+        return raw_data
+    return encode_columns(dimensions, indices[mask], values[mask])
+
+def read_sdmx_csv(lines: Iterable[str]) -> Dict[str, Any]:
+    """
+    Stream-parse SDMX-CSV rows into a compact columns payload
+
+    Rows are consumed one at a time and only their codes and values are
+    kept, so memory scales with the number of observations rather than
+    with the size of the response body. Label columns ("CODE: Label") are
+    reduced to their codes; attribute columns are ignored.
+    """
+    import numpy as np
+    reader = csv.reader(lines)
+    try:
+        header = next(reader)
+    except StopIteration:
+        raise ValueError("Empty SDMX-CSV response")
+
+    header = [column.split(': ', 1)[0].strip() for column in header]
+    if 'OBS_VALUE' not in header:
+        raise ValueError("OBS_VALUE column not found in SDMX-CSV response")
+    value_position = header.index('OBS_VALUE')
+    dimension_positions = [
+        i for i in range(value_position) if header[i] not in CSV_STRUCTURE_COLUMNS
+    ]
+
+    dimensions = [{'id': header[i], 'values': []} for i in dimension_positions]
+    code_indices = [{} for _ in dimension_positions]
+    indices = array('i')
+    values = array('d')
+
+    for row in reader:
+        if len(row) <= value_position:
+            continue
+        for dimension, codes, position in zip(dimensions, code_indices, dimension_positions):
+            code = row[position].split(': ', 1)[0]
+            index = codes.get(code)
+            if index is None:
+                index = codes[code] = len(codes)
+                dimension['values'].append({'id': code})
+            indices.append(index)
+        cell = row[value_position]
+        try:
+            values.append(float(cell) if cell else np.nan)
+        except ValueError:
+            values.append(np.nan)
+
+    return encode_columns(
+        dimensions,
+        np.frombuffer(indices, dtype=np.intc).reshape(len(values), len(dimensions)),
+        np.frombuffer(values, dtype=np.float64)
+    )
+
+def decode_observations(raw_data: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Decode flat SDMX-JSON observations into typed columns
+
+    Observation keys are parsed in bulk into an integer index matrix and
+    mapped through the structure's dimension values, so no per-observation
+    Python objects are built.
+
+    Args:
+        raw_data: Raw JSON data from ABS API, or a compact columns payload
+
+    Returns:
+        DataFrame sorted by period with columns:
+            - date: YYYY-MM period label (ordered categorical)
+            - period: period start (datetime64)
+            - value: observation value (float64)
+            - series: non-time, non-region dimension codes joined by '.' (categorical)
+    """
+    import numpy as np
+    import pandas as pd
+
+    dimensions, indices, values = observation_columns(raw_data)
+    if not len(values):
+        raise ValueError("No observations found in ABS data")
+
+    time_position = _dimension_position(dimensions, 'TIME_PERIOD')
+    if time_position is None:
+        raise ValueError("TIME_PERIOD dimension not found in ABS data structure")
+
+    # Periods: sort the (few) period labels once and remap indices to ranks
+    time_labels = np.array([value.get('id') for value in dimensions[time_position]['values']], dtype=object)
+    label_order = np.argsort(time_labels, kind='stable')
+    label_rank = np.empty_like(label_order)
+    label_rank[label_order] = np.arange(len(label_order))
+    period_codes = label_rank[indices[:, time_position]]
+    sorted_labels = time_labels[label_order]
+    period_starts = pd.to_datetime(sorted_labels, format='%Y-%m', errors='coerce').values
+
+    # Series: combine the remaining dimensions into one code per observation
+    region_position = _dimension_position(dimensions, 'REGION')
+    series_positions = [
+        i for i in range(len(dimensions)) if i not in (time_position, region_position)
+    ]
+    if series_positions:
+        shape = tuple(len(dimensions[i]['values']) for i in series_positions)
+        flat = np.ravel_multi_index(tuple(indices[:, series_positions].T), shape)
+        unique_series, series_codes = np.unique(flat, return_inverse=True)
+        series_labels = [
+            '.'.join(
+                dimensions[position]['values'][index].get('id')
+                for position, index in zip(series_positions, np.unravel_index(code, shape))
+            )
+            for code in unique_series
+        ]
+    else:
+        series_codes = np.zeros(len(values), dtype=np.int64)
+        series_labels = ['']
+
+    order = np.argsort(period_codes, kind='stable')
+    return pd.DataFrame({
+        'date': pd.Categorical.from_codes(period_codes[order], categories=sorted_labels, ordered=True),
+        'period': period_starts[period_codes[order]],
+        'value': values[order],
+        'series': pd.Categorical.from_codes(series_codes.reshape(-1)[order], categories=series_labels)
+    })
@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Any, Optional, List, Tuple
+from threading import Lock
+from abs_sdmx import observation_columns, encode_columns
+
+if TYPE_CHECKING:
+    # Imported on first use, so the server starts without loading numpy
+    import numpy as np
+
+def period_to_month(period: str) -> int:
+    """Convert a YYYY-MM period to a month number"""
+    try:
+        year, month = str(period)[:7].split('-')
+        year, month = int(year), int(month)
+    except ValueError:
+        raise ValueError(f"Invalid monthly period: {period}")
+    if not 1 <= month <= 12:
+        raise ValueError(f"Invalid monthly period: {period}")
+    return year * 12 + month - 1
+
+def month_to_period(month: int) -> str:
+    """Convert a month number back to a YYYY-MM period"""
+    return f"{month // 12:04d}-{month % 12 + 1:02d}"
+
+@dataclass
+class SeriesEntry:
+    # Non-time observation dimensions, in upstream order, with the union of
+    # every value seen across merged responses
+    dimensions: List[Dict[str, Any]]
+    time_position: int
+    start: int
+    end: int
+    created: float = field(default_factory=time.time)
+    # Bumped on every merge, so results built from the entry can be validated
+    version: int = 0
+    # Months after `end` that were requested and had no data yet, treated
+    # as covered until `checked_until` (time.time())
+    checked_end: int = -1
+    checked_until: float = 0.0
+    # Bytes held by the observation arrays
+    size: int = 0
+    # series code tuple -> (sorted int32 months, float64 values)
+    observations: Dict[Tuple[str, ...], Tuple[np.ndarray, np.ndarray]] = field(default_factory=dict)
+
+class SeriesCache:
+    """
+    Observations per (dataflow, region, series) indexed by month.
+
+    Each (dataflow, region) entry records the contiguous range of months
+    already fetched, so a request for a new date range only needs the
+    missing months at its edges. Months after the last observed period are
+    only treated as covered for `empty_ttl` seconds after they were found
+    empty, which keeps not-yet-released months fetchable without asking
+    upstream on every request. Entries are dropped after `ttl` seconds to
+    pick up revisions, and the least recently used ones are evicted once
+    their observations exceed `max_bytes` (every series selection adds an
+    entry per region).
+    """
+    def __init__(self, ttl: int = 86400, empty_ttl: int = 900, max_bytes: int = 128 * 1024 * 1024):
+        self.ttl = ttl
+        self.empty_ttl = empty_ttl
+        self.max_bytes = max_bytes
+        # Least recently used first
+        self.entries: OrderedDict = OrderedDict()
+        self.bytes = 0
+        self.lock = Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional['SeriesCache']:
+        """
+        Build a series cache from ABS_SERIES_CACHE, ABS_SERIES_CACHE_TTL,
+        ABS_SERIES_EMPTY_TTL and ABS_SERIES_CACHE_MAX_MB
+        """
+        if os.getenv('ABS_SERIES_CACHE', 'true').lower() not in ('1', 'true', 'yes'):
+            return None
+        return cls(
+            ttl=int(os.getenv('ABS_SERIES_CACHE_TTL', 86400)),
+            empty_ttl=int(os.getenv('ABS_SERIES_EMPTY_TTL', 900)),
+            max_bytes=int(float(os.getenv('ABS_SERIES_CACHE_MAX_MB', 128)) * 1024 * 1024)
+        )
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        """Caller holds the lock"""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def _live_entry(self, dataflow: str, region: str) -> Optional[SeriesEntry]:
+        """Caller holds the lock"""
+        entry = self.entries.get((dataflow, region))
+        if entry is None:
+            return None
+        if entry.created + self.ttl < time.time():
+            self._remove((dataflow, region))
+            return None
+        self.entries.move_to_end((dataflow, region))
+        return entry
+
+    def _resize(self, key: Tuple[str, str], entry: SeriesEntry) -> None:
+        """Account for an entry's new observations and evict over budget (caller holds the lock)"""
+        size = sum(months.nbytes + values.nbytes for months, values in entry.observations.values())
+        self.bytes += size - entry.size
+        entry.size = size
+        # The entry just written is the most recently used and is kept
+        while self.bytes > self.max_bytes and len(self.entries) > 1:
+            oldest = next(iter(self.entries))
+            if oldest == key:
+                break
+            self._remove(oldest)
+
+    def clear_expired(self) -> int:
+        """Remove entries older than `ttl`; returns the number removed"""
+        deadline = time.time() - self.ttl
+        with self.lock:
+            expired = [key for key, entry in self.entries.items() if entry.created < deadline]
+            for key in expired:
+                self._remove(key)
+        return len(expired)
+
+    def _covered_end(self, entry: SeriesEntry) -> int:
+        """Last month needing no fetch, including recently checked empty months (caller holds the lock)"""
+        if entry.checked_until > time.time():
+            return max(entry.end, entry.checked_end)
+        return entry.end
+
+    def _mark_checked(self, entry: SeriesEntry, end: int) -> None:
+        """Record that months up to `end` were requested (caller holds the lock)"""
+        if end <= entry.end:
+            return
+        entry.checked_end = max(end, self._covered_end(entry))
+        entry.checked_until = time.time() + self.empty_ttl
+
+    def missing_ranges(self, dataflow: str, region: str, start_date: str, end_date: str) -> List[Tuple[str, str]]:
+        """
+        Period ranges that must be fetched upstream to serve a request
+
+        Returns:
+            List of (startPeriod, endPeriod) tuples; empty when fully cached
+        """
+        start, end = period_to_month(start_date), period_to_month(end_date)
+        with self.lock:
+            entry = self._live_entry(dataflow, region)
+            covered_end = self._covered_end(entry) if entry is not None else None
+            if entry is None or start > covered_end + 1 or end < entry.start - 1:
+                return [(start_date, end_date)]
+            ranges = []
+            if start < entry.start:
+                ranges.append((month_to_period(start), month_to_period(min(end, entry.start - 1))))
+            if end > covered_end:
+                ranges.append((month_to_period(max(start, covered_end + 1)), month_to_period(end)))
+            return ranges
+
+    def covered_range(self, dataflow: str, region: str) -> Optional[Tuple[str, str]]:
+        """(startPeriod, endPeriod) already cached for a region, if any"""
+        with self.lock:
+            entry = self._live_entry(dataflow, region)
+            if entry is None or entry.end < entry.start:
+                return None
+            return month_to_period(entry.start), month_to_period(entry.end)
+
+    def version(self, dataflow: str, region: str) -> Optional[Tuple[float, int]]:
+        """Token identifying the current contents of a region's entry, if cached"""
+        with self.lock:
+            entry = self._live_entry(dataflow, region)
+            return (entry.created, entry.version) if entry is not None else None
+
+    def expiry(self, dataflow: str, region: str) -> Optional[float]:
+        """Time at which a region's entry expires, if cached"""
+        with self.lock:
+            entry = self._live_entry(dataflow, region)
+            return entry.created + self.ttl if entry is not None else None
+
+    def merge(self, dataflow: str, region: str, raw_data: Dict[str, Any], start_date: str, end_date: str,
+              renew: bool = False, stale: bool = False) -> None:
+        """
+        Add the observations of a single-region response (SDMX-JSON or
+        compact columns) fetched for start_date..end_date
+
+        With `renew` the entry's TTL restarts, as for a refresh of its
+        whole range. A `stale` response (an expired copy served while the
+        upstream is revalidated) only extends a live entry; it never starts
+        a new one with a fresh TTL.
+        """
+        import numpy as np
+        dimensions, indices, values = observation_columns(raw_data)
+        time_position = next(
+            (i for i, dim in enumerate(dimensions) if dim.get('id') == 'TIME_PERIOD'),
+            None
+        )
+        if time_position is None:
+            raise ValueError("TIME_PERIOD dimension not found in ABS data structure")
+
+        series_dimensions = [dim for i, dim in enumerate(dimensions) if i != time_position]
+        series_positions = [i for i in range(len(dimensions)) if i != time_position]
+
+        # Map observations to months and group them by series
+        period_months = np.array(
+            [period_to_month(value.get('id')) for value in dimensions[time_position].get('values', [])],
+            dtype=np.int32
+        )
+        months = period_months[indices[:, time_position]]
+        series_rows, series_inverse = np.unique(
+            indices[:, series_positions], axis=0, return_inverse=True
+        )
+        series_inverse = series_inverse.reshape(-1)
+        decoded = {}
+        for row_number, row in enumerate(series_rows):
+            series = tuple(
+                series_dimensions[i]['values'][index].get('id') for i, index in enumerate(row)
+            )
+            mask = series_inverse == row_number
+            decoded[series] = (months[mask], values[mask])
+
+        start, end = period_to_month(start_date), period_to_month(end_date)
+        last_observed = int(months.max()) if len(months) else None
+
+        with self.lock:
+            entry = self._live_entry(dataflow, region)
+            if (entry is None or start > entry.end + 1 or end < entry.start - 1
+                    or [dim.get('id') for dim in entry.dimensions] != [dim.get('id') for dim in series_dimensions]):
+                if last_observed is None or stale:
+                    return
+                entry = SeriesEntry(
+                    dimensions=[{**dim, 'values': []} for dim in series_dimensions],
+                    time_position=time_position,
+                    start=start,
+                    end=start - 1
+                )
+                self._remove((dataflow, region))
+                self.entries[(dataflow, region)] = entry
+
+            for dim, new_dim in zip(entry.dimensions, series_dimensions):
+                known = {value.get('id') for value in dim['values']}
+                dim['values'].extend(
+                    value for value in new_dim.get('values', []) if value.get('id') not in known
+                )
+            for series, (new_months, new_values) in decoded.items():
+                if series in entry.observations:
+                    # New observations win over cached ones for the same month
+                    old_months, old_values = entry.observations[series]
+                    new_months = np.concatenate([new_months, old_months])
+                    new_values = np.concatenate([new_values, old_values])
+                unique_months, first = np.unique(new_months, return_index=True)
+                entry.observations[series] = (unique_months, new_values[first])
+
+            # The start edge is covered even if the series begins later; the
+            # end edge only as far as data has actually been published
+            entry.start = min(entry.start, start)
+            if last_observed is not None:
+                entry.end = max(entry.end, min(end, last_observed))
+            self._mark_checked(entry, end)
+            if renew:
+                entry.created = time.time()
+            entry.version += 1
+            self._resize((dataflow, region), entry)
+
+    def merge_empty(self, dataflow: str, region: str, start_date: str, end_date: str) -> None:
+        """
+        Record that start_date..end_date, an edge of a cached range, has no
+        observations (e.g. upstream answered 404 NoRecordsFound)
+
+        A leading edge is covered from then on, as in merge; a trailing edge
+        only for empty_ttl seconds, until new months may have been released.
+        """
+        start, end = period_to_month(start_date), period_to_month(end_date)
+        with self.lock:
+            entry = self._live_entry(dataflow, region)
+            if entry is None:
+                return
+            if end == entry.start - 1:
+                entry.start = start
+            elif start <= self._covered_end(entry) + 1:
+                self._mark_checked(entry, end)
+
+    def build_response(self, dataflow: str, region: str, start_date: str, end_date: str) -> Optional[Dict[str, Any]]:
+        """Build a single-region compact columns payload for a range from cached observations"""
+        import numpy as np
+        start, end = period_to_month(start_date), period_to_month(end_date)
+        with self.lock:
+            entry = self._live_entry(dataflow, region)
+            if entry is None:
+                return None
+
+            selected = []
+            for series, (months, values) in entry.observations.items():
+                lo, hi = np.searchsorted(months, [start, end + 1])
+                if hi > lo:
+                    selected.append((series, months[lo:hi], values[lo:hi]))
+            dimensions = [{**dim, 'values': list(dim['values'])} for dim in entry.dimensions]
+            time_position = entry.time_position
+
+        code_index = [
+            {value.get('id'): i for i, value in enumerate(dim['values'])}
+            for dim in dimensions
+        ]
+        all_months = np.unique(np.concatenate([months for _, months, _ in selected])) if selected else np.empty(0, dtype=np.int32)
+
+        blocks = []
+        for series, months, values in selected:
+            block = np.empty((len(months), len(dimensions) + 1), dtype=np.int64)
+            series_columns = [c for c in range(len(dimensions) + 1) if c != time_position]
+            for column, (i, code) in zip(series_columns, enumerate(series)):
+                block[:, column] = code_index[i][code]
+            block[:, time_position] = np.searchsorted(all_months, months)
+            blocks.append(block)
+
+        dimensions.insert(time_position, {
+            'id': 'TIME_PERIOD',
+            'values': [{'id': month_to_period(int(month))} for month in all_months]
+        })
+        return encode_columns(
+            dimensions,
+            np.concatenate(blocks) if blocks else np.empty((0, len(dimensions)), dtype=np.int64),
+            np.concatenate([values for _, _, values in selected]) if selected else np.empty(0)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                f"{dataflow}:{region}": {
+                    'start': month_to_period(entry.start),
+                    'end': month_to_period(entry.end),
+                    'series': len(entry.observations)
+                }
+                for (dataflow, region), entry in self.entries.items()
+            }
@@ -0,0 +1,194 @@
+import os
+import re
+import time
+import logging
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Tuple, Union, Iterable
+from threading import Lock
+
+# Dimensions that are chosen per request rather than through a selection
+REGION_DIMENSION = 'REGION'
+TIME_DIMENSION = 'TIME_PERIOD'
+
+# Codelist id in an SDMX URN such as "...Codelist=ABS:CL_SEX(1.0.0)"
+_CODELIST_URN = re.compile(r'Codelist=[^:]+:([^(]+)')
+
+@dataclass
+class Dimension:
+    id: str
+    position: int
+    # Codelist code -> position in the codelist
+    codes: Dict[str, int]
+
+@dataclass(frozen=True)
+class SeriesSelection:
+    """
+    Validated dimension codes to request from a dataflow
+
+    `dimensions` holds (dimension id, codes) pairs in data structure order
+    and `key` is the SDMX data key they form, with REGION and unselected
+    dimensions left as wildcards (e.g. "M13.3.1599.20..M").
+    """
+    dataflow: str
+    dimensions: Tuple[Tuple[str, Tuple[str, ...]], ...]
+    key: str
+
+    @property
+    def series_id(self) -> str:
+        """Cache identity of the selected series (dataflow/data key)"""
+        return f"{self.dataflow}/{self.key}"
+
+    def filters(self) -> Dict[str, str]:
+        """Upstream component filters, one c[DIMENSION] parameter per selected dimension"""
+        return {f"c[{dimension}]": '+'.join(codes) for dimension, codes in self.dimensions}
+
+    def codes(self) -> Dict[str, Tuple[str, ...]]:
+        return dict(self.dimensions)
+
+class DataStructure:
+    """
+    Index over a dataflow's data structure definition
+
+    Maps every dimension id to its position in the series key and every
+    codelist code to its position in the codelist, so selections can be
+    validated and turned into data keys without scanning the codelists.
+    """
+    def __init__(self, dataflow: str, dimensions: List[Dimension]):
+        self.dataflow = dataflow
+        self.dimensions = sorted(dimensions, key=lambda dimension: dimension.position)
+        self.positions = {dimension.id: i for i, dimension in enumerate(self.dimensions)}
+
+    @classmethod
+    def from_sdmx_json(cls, dataflow: str, message: Dict[str, Any]) -> 'DataStructure':
+        """
+        Build the index from an SDMX-JSON structure message that includes
+        the data structure and its codelists (references=codelist)
+        """
+        data = message.get('data', message)
+        structures = data.get('dataStructures') or []
+        if not structures:
+            raise ValueError(f"No data structure found for dataflow {dataflow}")
+        codelists = {
+            codelist.get('id'): [code.get('id') for code in codelist.get('codes', [])]
+            for codelist in data.get('codelists', [])
+        }
+
+        dimension_list = structures[0].get('dataStructureComponents', {}).get('dimensionList', {})
+        dimensions = []
+        for i, dimension in enumerate(dimension_list.get('dimensions', [])):
+            enumeration = dimension.get('localRepresentation', {}).get('enumeration', '')
+            match = _CODELIST_URN.search(enumeration)
+            codes = codelists.get(match.group(1), []) if match else []
+            dimensions.append(Dimension(
+                id=dimension.get('id'),
+                position=dimension.get('position', i),
+                codes={code: index for index, code in enumerate(codes)}
+            ))
+        return cls(dataflow, dimensions)
+
+    def dimension(self, dimension_id: str) -> Dimension:
+        position = self.positions.get(dimension_id)
+        if position is None:
+            raise ValueError(f"Unknown dimension {dimension_id} in dataflow {self.dataflow}")
+        return self.dimensions[position]
+
+    def select(self, selection: Dict[str, Union[str, Iterable[str]]]) -> SeriesSelection:
+        """
+        Validate a selection and build its data key
+
+        Args:
+            selection: Codes per dimension id, as a list or a "+"-joined
+                string (e.g. {'MEASURE': 'M13', 'SEX': '1+2'})
+
+        Returns:
+            SeriesSelection with the codes in data structure order
+
+        Raises:
+            ValueError: for unknown dimensions or codes, or for REGION and
+                TIME_PERIOD, which are set per request
+        """
+        chosen: Dict[int, Tuple[str, ...]] = {}
+        for dimension_id, codes in selection.items():
+            if dimension_id in (REGION_DIMENSION, TIME_DIMENSION):
+                raise ValueError(f"{dimension_id} cannot be part of a series selection")
+            dimension = self.dimension(dimension_id)
+            codes = tuple(codes.split('+') if isinstance(codes, str) else codes)
+            if not codes:
+                raise ValueError(f"No {dimension_id} codes selected")
+            unknown = [code for code in codes if code not in dimension.codes]
+            if unknown:
+                raise ValueError(f"Unknown {dimension_id} codes: {', '.join(unknown)}")
+            # Codelist order keeps equal selections equal
+            chosen[self.positions[dimension_id]] = tuple(sorted(set(codes), key=dimension.codes.get))
+
+        return SeriesSelection(
+            dataflow=self.dataflow,
+            dimensions=tuple((self.dimensions[i].id, codes) for i, codes in sorted(chosen.items())),
+            key='.'.join('+'.join(chosen.get(i, ())) for i in range(len(self.dimensions)))
+        )
+
+class StructureRegistry:
+    """
+    Fetches dataflow structures through the request manager and keeps
+    their indexes for `ttl` seconds (structures change far less often
+    than data). An expired structure is still used if it cannot be
+    refreshed.
+    """
+    def __init__(self, request_manager, url: str = 'https://api.data.abs.gov.au/datastructure',
+                 agency: str = 'ABS', ttl: int = 7 * 86400):
+        self.request_manager = request_manager
+        self.url = url.rstrip('/')
+        self.agency = agency
+        self.ttl = ttl
+        self.structures: Dict[str, Tuple[DataStructure, float]] = {}
+        self.lock = Lock()
+
+    @classmethod
+    def from_env(cls, request_manager) -> 'StructureRegistry':
+        """Build a registry from ABS_API_STRUCTURE_URL, ABS_STRUCTURE_AGENCY and ABS_STRUCTURE_TTL"""
+        return cls(
+            request_manager,
+            url=os.getenv('ABS_API_STRUCTURE_URL', 'https://api.data.abs.gov.au/datastructure'),
+            agency=os.getenv('ABS_STRUCTURE_AGENCY', 'ABS'),
+            ttl=int(os.getenv('ABS_STRUCTURE_TTL', 7 * 86400))
+        )
+
+    def get(self, dataflow: str, timeout: Optional[float] = 60) -> DataStructure:
+        """
+        Return the structure index of a dataflow, fetching it when missing or expired
+
+        Args:
+            dataflow: Dataflow id (e.g. 'LM')
+            timeout: Seconds to wait for the structure (None to wait
+                indefinitely); the fetch is dropped once they run out
+        """
+        with self.lock:
+            cached = self.structures.get(dataflow)
+        if cached and cached[1] > time.time():
+            return cached[0]
+
+        future = self.request_manager.submit(
+            endpoint=f"{self.url}/{self.agency}/{dataflow}",
+            params={'references': 'codelist', 'format': 'structure-json'},
+            priority=0,
+            deadline=time.time() + timeout if timeout is not None else None
+        )
+        try:
+            message = future.result(timeout=max(timeout, 0) if timeout is not None else None)
+            structure = DataStructure.from_sdmx_json(dataflow, message)
+        except Exception as e:
+            future.cancel()
+            if cached:
+                logging.warning(f"Using expired structure of {dataflow}: {str(e)}")
+                return cached[0]
+            raise
+
+        with self.lock:
+            self.structures[dataflow] = (structure, time.time() + self.ttl)
+        logging.info(f"Loaded structure of {dataflow} with {len(structure.dimensions)} dimensions")
+        return structure
+
+    def select(self, dataflow: str, selection: Dict[str, Union[str, Iterable[str]]],
+               timeout: Optional[float] = 60) -> SeriesSelection:
+        """Validate a selection against a dataflow's structure (see get for timeout)"""
+        return self.get(dataflow, timeout).select(selection)
@@ -0,0 +1,381 @@
+"""
+End-to-end benchmark of the labour force RPC server
+
+Starts a local stand-in for api.data.abs.gov.au serving synthetic SDMX-JSON,
+runs the RPC server in a child process pointed at it, and drives
+analyze_labour_force with concurrent clients. Each query set is run once
+against cold caches and then repeated warm. For each phase the benchmark
+reports throughput, latency percentiles, upstream calls per RPC, peak server
+memory and the server's own stage timings.
+
+Usage:
+    python bench_abs_rpc.py --queries 40 --concurrency 8 --latency 0.05 --output bench.jsonl
+
+Results are printed as JSON; --output appends them as one JSON line per run
+so regressions can be tracked over time.
+"""
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import platform
+import subprocess
+import http.client
+from datetime import datetime, timezone
+from functools import lru_cache
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, Lock
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+
+REGION_CODES = [
+    '2GMEL', '2RVIC', '2', '1GSYD', '1RNSW', '1', '3GBRI', '3RQLD', '3',
+    '4GADE', '4RSAU', '4', '5GPER', '5RWAU', '5', '6GHOB', '6RTAS', '6',
+    '7GDAR', '7RNTE', '7', '8ACTE', '0'
+]
+
+def _months(start: str, end: str) -> List[str]:
+    year, month = map(int, start.split('-'))
+    end_year, end_month = map(int, end.split('-'))
+    months = []
+    while (year, month) <= (end_year, end_month):
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+@lru_cache(maxsize=1024)
+def build_sdmx_json(regions: Tuple[str, ...], start: str, end: str, series: int, attributes: int) -> bytes:
+    """Synthetic SDMX-JSON with `series` measures per region and month"""
+    periods = _months(start, end)
+    padding = [0] * attributes
+    observations = {}
+    for s in range(series):
+        for r, region in enumerate(regions):
+            base = 100.0 * (s + 1) + sum(map(ord, region))
+            for t in range(len(periods)):
+                observations[f"{s}:{r}:{t}"] = [round(base + t * 0.1, 3)] + padding
+    return json.dumps({
+        'structure': {
+            'dimensions': {
+                'observation': [
+                    {'id': 'MEASURE', 'values': [{'id': f"M{s + 1}"} for s in range(series)]},
+                    {'id': 'REGION', 'values': [{'id': region} for region in regions]},
+                    {'id': 'TIME_PERIOD', 'values': [{'id': period} for period in periods]}
+                ]
+            }
+        },
+        'dataSets': [{'observations': observations}]
+    }, separators=(',', ':')).encode('utf-8')
+
+@lru_cache(maxsize=1024)
+def build_sdmx_csv(regions: Tuple[str, ...], start: str, end: str, series: int) -> bytes:
+    """Synthetic SDMX-CSV carrying the same observations as build_sdmx_json"""
+    lines = ['DATAFLOW,MEASURE,REGION,TIME_PERIOD,OBS_VALUE']
+    for s in range(series):
+        for region in regions:
+            base = 100.0 * (s + 1) + sum(map(ord, region))
+            for t, period in enumerate(_months(start, end)):
+                lines.append(f"ABS:LF(1.0.0),M{s + 1},{region},{period},{round(base + t * 0.1, 3)}")
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+class StubABSServer(ThreadingHTTPServer):
+    """Local stand-in for the ABS data API serving synthetic payloads"""
+    daemon_threads = True
+
+    def __init__(self, addr, latency: float = 0.0, series: int = 3, attributes: int = 0):
+        super().__init__(addr, StubABSHandler)
+        self.latency = latency
+        self.series = series
+        self.attributes = attributes
+        self.lock = Lock()
+        self.calls = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+
+    def counters(self) -> Dict[str, int]:
+        with self.lock:
+            return {'calls': self.calls, 'not_modified': self.not_modified, 'bytes': self.bytes_sent}
+
+class StubABSHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        regions = tuple(query.get('c[REGION]', '0').split('+'))
+        start, end = query.get('startPeriod', '2024-01'), query.get('endPeriod', '2024-12')
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if query.get('format') == 'csv':
+            body = build_sdmx_csv(regions, start, end, self.server.series)
+            content_type = 'application/vnd.sdmx.data+csv'
+        else:
+            body = build_sdmx_json(regions, start, end, self.server.series, self.server.attributes)
+            content_type = 'application/json'
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+
+        with self.server.lock:
+            self.server.calls += 1
+            if self.headers.get('If-None-Match') == etag:
+                self.server.not_modified += 1
+            else:
+                self.server.bytes_sent += len(body)
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def build_queries(count: int, regions_per_call: int, months: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Deterministic analyze_labour_force parameter sets ending at 2024-12"""
+    rng = random.Random(seed)
+    all_months = _months('2015-01', '2024-12')
+    queries = []
+    for _ in range(count):
+        span = rng.randint(max(1, months // 2), months)
+        queries.append({
+            'start_date': all_months[-span],
+            'end_date': all_months[-1],
+            'selected_regions': rng.sample(REGION_CODES, min(regions_per_call, len(REGION_CODES)))
+        })
+    return queries
+
+def rpc_call(port: int, method: str, params: Any, timeout: float = 120) -> Dict[str, Any]:
+    body = json.dumps({'jsonrpc': '2.0', 'method': method, 'params': params, 'id': 1})
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        connection.request('POST', '/', body, {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        payload = response.read()
+    finally:
+        connection.close()
+    if response.status != 200:
+        return {'error': {'code': response.status, 'message': payload.decode('utf-8', 'replace')}}
+    return json.loads(payload)
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    """High-water resident memory of a process (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+def stage_delta(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """Server stage timings accumulated between two get_metrics snapshots"""
+    stages = {}
+    for stage, timing in after.items():
+        count = timing['count'] - before.get(stage, {}).get('count', 0)
+        total = timing['total_seconds'] - before.get(stage, {}).get('total_seconds', 0.0)
+        if count:
+            stages[stage] = {
+                'count': count,
+                'total_seconds': round(total, 6),
+                'avg_ms': round(total / count * 1000, 3)
+            }
+    return stages
+
+def run_phase(name: str, port: int, pid: int, stub: StubABSServer, queries: List[Dict[str, Any]],
+              concurrency: int) -> Dict[str, Any]:
+    """Run every query through the RPC server and summarise the phase"""
+    before = stub.counters()
+    stages_before = rpc_call(port, 'get_metrics', []).get('result', {}).get('stages', {})
+    latencies = []
+    errors = 0
+
+    def call(params):
+        start = time.perf_counter()
+        result = rpc_call(port, 'analyze_labour_force', [params])
+        return time.perf_counter() - start, 'error' in result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for latency, failed in executor.map(call, queries):
+            latencies.append(latency)
+            errors += failed
+    elapsed = time.perf_counter() - start
+
+    after = stub.counters()
+    server_metrics = rpc_call(port, 'get_metrics', []).get('result', {})
+    latencies_ms = np.array(latencies) * 1000
+    upstream_calls = after['calls'] - before['calls']
+    return {
+        'phase': name,
+        'rpc_calls': len(queries),
+        'errors': errors,
+        'seconds': round(elapsed, 4),
+        'throughput_rps': round(len(queries) / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'p50': round(float(np.percentile(latencies_ms, 50)), 2),
+            'p90': round(float(np.percentile(latencies_ms, 90)), 2),
+            'p99': round(float(np.percentile(latencies_ms, 99)), 2),
+            'max': round(float(latencies_ms.max()), 2)
+        },
+        'upstream_calls': upstream_calls,
+        'upstream_not_modified': after['not_modified'] - before['not_modified'],
+        'upstream_calls_per_rpc': round(upstream_calls / len(queries), 3),
+        'upstream_bytes': after['bytes'] - before['bytes'],
+        'server_peak_rss_mb': peak_rss_mb(pid),
+        'server_stages': stage_delta(stages_before, server_metrics.get('stages', {}))
+    }
+
+def start_rpc_process(stub_port: int, upstream_rate: int, env: Optional[Dict[str, str]] = None) -> Tuple[subprocess.Popen, int]:
+    """Start the RPC server in a child process pointed at the stub"""
+    child_env = {
+        **os.environ,
+        'ABS_API_KEY': os.environ.get('ABS_API_KEY', 'bench'),
+        'ABS_API_BASE_URL': f"http://127.0.0.1:{stub_port}/data",
+        'ABS_REQUESTS_PER_MINUTE': str(upstream_rate),
+        'ABS_RATE_LIMIT_BURST': str(max(1, upstream_rate // 60)),
+        'ABS_LOG_LEVEL': os.environ.get('ABS_LOG_LEVEL', 'WARNING'),
+        **(env or {})
+    }
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve-rpc'],
+        env=child_env,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.PIPE,
+        text=True
+    )
+    line = process.stdout.readline()
+    if not line.startswith('READY'):
+        process.kill()
+        raise RuntimeError(f"RPC server failed to start: {line!r}")
+    return process, int(line.split()[1])
+
+def serve_rpc() -> None:
+    """Child process entry point: serve RPC on an ephemeral port"""
+    from abs_rpc_server import create_rpc_server
+    server = create_rpc_server('127.0.0.1', 0)
+    server.logRequests = False
+    print(f"READY {server.server_address[1]}", flush=True)
+    server.serve_forever()
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def run_benchmark(queries: int = 20, regions_per_call: int = 4, months: int = 24,
+                  concurrency: int = 4, warm_rounds: int = 2, latency: float = 0.02,
+                  series: int = 3, attributes: int = 0, upstream_rate: int = 6000,
+                  seed: int = 0, env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Run the cold and warm phases and return the results
+
+    Args:
+        queries: Distinct analyze_labour_force calls per round
+        regions_per_call: Regions selected per call
+        months: Maximum months requested per call
+        concurrency: Concurrent RPC clients
+        warm_rounds: Times the query set is repeated after the cold round
+        latency: Stub upstream latency in seconds
+        series: Measures per region in the stub payload (payload size)
+        attributes: Extra attribute values per observation (payload size)
+        upstream_rate: ABS_REQUESTS_PER_MINUTE for the server under test
+        seed: Query generator seed
+        env: Extra environment for the server process (e.g. cache settings)
+    """
+    stub = StubABSServer(('127.0.0.1', 0), latency=latency, series=series, attributes=attributes)
+    Thread(target=stub.serve_forever, daemon=True).start()
+    process, port = start_rpc_process(stub.server_address[1], upstream_rate, env)
+    try:
+        query_set = build_queries(queries, regions_per_call, months, seed)
+        phases = [run_phase('cold', port, process.pid, stub, query_set, concurrency)]
+        if warm_rounds:
+            phases.append(run_phase('warm', port, process.pid, stub, query_set * warm_rounds, concurrency))
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        stub.shutdown()
+        stub.server_close()
+
+    return {
+        'benchmark': 'abs_rpc',
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'config': {
+            'queries': queries,
+            'regions_per_call': regions_per_call,
+            'months': months,
+            'concurrency': concurrency,
+            'warm_rounds': warm_rounds,
+            'latency': latency,
+            'series': series,
+            'attributes': attributes,
+            'upstream_rate': upstream_rate,
+            'seed': seed,
+            'env': env or {}
+        },
+        'phases': {phase['phase']: phase for phase in phases}
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--regions-per-call', type=int, default=4)
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--warm-rounds', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.02, help='stub upstream latency (seconds)')
+    parser.add_argument('--series', type=int, default=3, help='measures per region in stub payloads')
+    parser.add_argument('--attributes', type=int, default=0, help='extra attribute values per observation')
+    parser.add_argument('--upstream-rate', type=int, default=6000, help='requests per minute allowed upstream')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE',
+                        help='extra environment for the server under test')
+    parser.add_argument('--output', help='append the result as a JSON line to this file')
+    parser.add_argument('--serve-rpc', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_rpc:
+        serve_rpc()
+        return
+
+    result = run_benchmark(
+        queries=args.queries,
+        regions_per_call=args.regions_per_call,
+        months=args.months,
+        concurrency=args.concurrency,
+        warm_rounds=args.warm_rounds,
+        latency=args.latency,
+        series=args.series,
+        attributes=args.attributes,
+        upstream_rate=args.upstream_rate,
+        seed=args.seed,
+        env=dict(item.split('=', 1) for item in args.env)
+    )
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'a') as f:
+            f.write(json.dumps(result, separators=(',', ':')) + '\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+import unittest
+from unittest.mock import patch
+from abs_circuit_breaker import CircuitBreaker
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+        patcher = patch.object(self.breaker, 'clock', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_opens_after_consecutive_failures(self):
+        """Test that only consecutive failures open the circuit"""
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.is_open())
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.state()['retry_in'], 30)
+
+    def test_half_open_probe_closes_on_success(self):
+        """Test that one probe is let through after the reset timeout"""
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.now += 30
+
+        self.assertFalse(self.breaker.is_open())
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state()['state'], 'closed')
+        self.assertTrue(self.breaker.allow())
+
+    def test_half_open_probe_failure_reopens(self):
+        """Test that a failed probe opens the circuit for another reset timeout"""
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.record_failure()
+
+        self.assertTrue(self.breaker.is_open())
+        self.assertEqual(self.breaker.state()['trips'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+from abs_disk_cache import DiskCache
+from abs_request_manager import ABSRequestManager
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'cache', 'abs.sqlite')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_survives_restart(self):
+        """Test that entries written by one instance are read by the next"""
+        cache = DiskCache(self.path, compress=True)
+        cache.set('key', {'data': [1, 2, 3]}, ttl=60, validators={'etag': '"v1"', 'last_modified': None})
+        cache.flush()
+
+        restarted = DiskCache(self.path, compress=True)
+        value, expiry, validators = restarted.get_entry('key')
+        self.assertEqual(value, {'data': [1, 2, 3]})
+        self.assertGreater(expiry, time.time())
+        self.assertEqual(validators, {'etag': '"v1"', 'last_modified': None})
+
+    def test_shared_dir_default_path(self):
+        """Test that ABS_SHARED_DIR places one cache database in the shared directory"""
+        with patch.dict('os.environ', {'ABS_SHARED_DIR': self.tmpdir.name, 'ABS_DISK_CACHE_PATH': ''}):
+            cache = DiskCache.from_env()
+
+        self.assertEqual(cache.path, os.path.join(self.tmpdir.name, 'abs_cache.sqlite3'))
+
+    def test_expired_entries_are_not_returned(self):
+        """Test that TTLs are kept on disk"""
+        cache = DiskCache(self.path)
+        cache.set('key', {'data': 'old'}, ttl=-1)
+        cache.flush()
+
+        self.assertIsNone(cache.get('key'))
+
+    def test_size_bounded_eviction(self):
+        """Test that least recently used entries are evicted over budget"""
+        cache = DiskCache(self.path, max_bytes=250)
+        for i in range(3):
+            cache.set(f'key{i}', {'data': 'x' * 100}, ttl=60)
+            cache.flush()
+
+        self.assertIsNone(cache.get('key0'))
+        self.assertIsNotNone(cache.get('key2'))
+        self.assertLessEqual(cache.stats()['bytes'], 250)
+
+    def test_reads_do_not_wait_for_writers(self):
+        """Test that reads are not blocked by another process's write and access times are batched"""
+        cache = DiskCache(self.path)
+        cache.set('key', {'data': 'shared'}, ttl=60)
+        cache.flush()
+        writer = sqlite3.connect(self.path, timeout=30)
+        writer.execute('BEGIN IMMEDIATE')
+
+        start = time.time()
+        for _ in range(3):
+            self.assertEqual(cache.get('key'), {'data': 'shared'})
+            # Lets the writer pick up the access times and block on the lock
+            time.sleep(0.1)
+        self.assertLess(time.time() - start, 1)
+
+        writer.rollback()
+        writer.close()
+        cache.flush()
+        accessed = cache.conn.execute('SELECT accessed FROM entries WHERE key = ?', ('key',)).fetchone()[0]
+        self.assertGreaterEqual(accessed, start)
+
+    @patch('requests.Session.get')
+    def test_disk_read_outside_inflight_lock(self, mock_get):
+        """Test that submit reads the disk tier without holding the in-flight lock"""
+        with patch.dict('os.environ', {'ABS_API_KEY': 'test_key'}):
+            manager = ABSRequestManager(disk_cache=DiskCache(self.path))
+        locked = []
+        def get_entry(key):
+            locked.append(manager.inflight_lock.locked())
+            return {'data': 'disk'}, time.time() + 60, None
+        
+        with patch.object(manager.disk_cache, 'get_entry', side_effect=get_entry):
+            future = manager.submit('test_endpoint', {'disk': 2})
+
+        self.assertEqual(future.result(timeout=1), {'data': 'disk'})
+        self.assertEqual(locked, [False])
+
+    @patch('requests.Session.get')
+    def test_manager_reads_through_disk(self, mock_get):
+        """Test that a fresh manager serves responses cached by a previous one"""
+        with patch.dict('os.environ', {'ABS_API_KEY': 'test_key'}):
+            first = ABSRequestManager(disk_cache=DiskCache(self.path))
+            key = first._generate_cache_key('test_endpoint', {'disk': 1})
+            first._cache_response(key, {'data': 'warm'})
+            first.disk_cache.flush()
+
+            second = ABSRequestManager(disk_cache=DiskCache(self.path))
+        future = second.submit('test_endpoint', {'disk': 1})
+
+        self.assertEqual(future.result(timeout=1), {'data': 'warm'})
+        mock_get.assert_not_called()
+
+    @patch('requests.Session.get')
+    def test_validators_survive_restart(self, mock_get):
+        """Test that entries read back from disk can still be revalidated with a conditional request"""
+        with patch.dict('os.environ', {'ABS_API_KEY': 'test_key'}):
+            first = ABSRequestManager(disk_cache=DiskCache(self.path))
+            key = first._generate_cache_key('test_endpoint', {'disk': 3})
+            first._cache_response(key, {'data': 'kept'}, validators={'etag': '"v1"', 'last_modified': None})
+            first.disk_cache.flush()
+
+            second = ABSRequestManager(disk_cache=DiskCache(self.path))
+        self.assertEqual(second.submit('test_endpoint', {'disk': 3}).result(timeout=1), {'data': 'kept'})
+
+        # The memory copy keeps the validators used for If-None-Match
+        self.assertEqual(second.cache.get_stale(key)[2], {'etag': '"v1"', 'last_modified': None})
+        mock_get.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
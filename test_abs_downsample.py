@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+import pandas as pd
+from abs_downsample import resample_series, downsample_series
+
+def make_frame(regions, months, value=lambda r, t: 100.0 * (r + 1) + t):
+    """Build a period-sorted monthly frame for several regions"""
+    periods = pd.date_range('2020-01-01', periods=months, freq='MS')
+    frames = [
+        pd.DataFrame({
+            'region': region,
+            'date': periods.strftime('%Y-%m'),
+            'period': periods,
+            'value': [value(r, t) for t in range(months)]
+        })
+        for r, region in enumerate(regions)
+    ]
+    return pd.concat(frames, ignore_index=True).sort_values('period', kind='stable')
+
+class TestResampleSeries(unittest.TestCase):
+    def test_quarterly_mean(self):
+        """Test that months are averaged into labelled quarters per region"""
+        resampled = resample_series(make_frame(['1', '2'], 7), 'quarterly')
+
+        region = resampled[resampled['region'] == '2']
+        self.assertEqual(region['date'].tolist(), ['2020-Q1', '2020-Q2', '2020-Q3'])
+        self.assertEqual(region['value'].tolist(), [201.0, 204.0, 206.0])
+        self.assertEqual(str(region['period'].iloc[1].date()), '2020-04-01')
+
+    def test_annual_last(self):
+        """Test that the last month of each year is kept"""
+        resampled = resample_series(make_frame(['1'], 15), 'annual', 'last')
+
+        self.assertEqual(resampled['date'].tolist(), ['2020', '2021'])
+        self.assertEqual(resampled['value'].tolist(), [111.0, 114.0])
+
+    def test_unknown_frequency_rejected(self):
+        with self.assertRaises(ValueError):
+            resample_series(make_frame(['1'], 3), 'weekly')
+
+class TestDownsampleSeries(unittest.TestCase):
+    def test_long_series_keep_extremes_and_endpoints(self):
+        """Test that long series are cut to max_points with their peaks kept"""
+        spike = lambda r, t: 1000.0 if t == 50 else (-1000.0 if t == 70 else float(t % 5))
+        frame = make_frame(['1', '2'], 120, spike)
+
+        reduced = downsample_series(frame, 10)
+
+        for region, series in reduced.groupby('region'):
+            self.assertLessEqual(len(series), 10)
+            self.assertIn(1000.0, series['value'].tolist())
+            self.assertIn(-1000.0, series['value'].tolist())
+            self.assertEqual(series['date'].iloc[0], '2020-01')
+            self.assertEqual(series['date'].iloc[-1], '2029-12')
+            self.assertTrue(series['period'].is_monotonic_increasing)
+
+    def test_short_series_untouched(self):
+        """Test that series within max_points are returned whole"""
+        frame = make_frame(['1', '2'], 6)
+
+        reduced = downsample_series(frame, 6)
+
+        self.assertEqual(len(reduced), 12)
+        np.testing.assert_array_equal(reduced['value'].to_numpy(), frame['value'].to_numpy())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import time
+from queue import Empty
+from dataclasses import dataclass
+from abs_fair_queue import FairRequestQueue
+
+@dataclass
+class Item:
+    name: str
+    priority: int = 1
+    client: str = 'default'
+    timestamp: float = 0.0
+    endpoint: str = 'LM'
+
+def drain(queue):
+    names = []
+    while not queue.empty():
+        names.append(queue.get().name)
+        queue.task_done()
+    return names
+
+class TestFairRequestQueue(unittest.TestCase):
+    def setUp(self):
+        self.queue = FairRequestQueue(aging_interval=30)
+        self.now = time.time()
+
+    def test_fifo_within_priority(self):
+        """Test that equal-priority requests are served in arrival order"""
+        for i, name in enumerate(['a', 'b', 'c']):
+            self.queue.put(Item(name, timestamp=self.now + i * 0.001))
+        self.queue.put(Item('urgent', priority=0, timestamp=self.now + 1))
+
+        self.assertEqual(drain(self.queue), ['urgent', 'a', 'b', 'c'])
+
+    def test_clients_take_turns(self):
+        """Test that a client's backlog does not hold up other clients"""
+        for i in range(4):
+            self.queue.put(Item(f"bulk{i}", client='bulk', timestamp=self.now + i * 0.001))
+        self.queue.put(Item('interactive', client='interactive', timestamp=self.now + 1))
+
+        self.assertEqual(drain(self.queue), ['bulk0', 'interactive', 'bulk1', 'bulk2', 'bulk3'])
+
+    def test_waiting_requests_age(self):
+        """Test that low-priority requests move up while they wait"""
+        self.queue.put(Item('old-refresh', priority=3, client='refresh', timestamp=self.now - 100))
+        self.queue.put(Item('new', priority=1, client='rpc', timestamp=self.now))
+        self.queue.put(Item('new-refresh', priority=3, client='refresh', timestamp=self.now))
+
+        self.assertEqual(drain(self.queue), ['old-refresh', 'new', 'new-refresh'])
+
+    def test_reschedule_prefers_more_urgent_request(self):
+        """Test that a taken request gives way to a more urgent one for the same endpoint"""
+        self.queue.put(Item('low', priority=2, timestamp=self.now))
+        taken = self.queue.get()
+        self.queue.put(Item('other-endpoint', priority=0, endpoint='CPI', timestamp=self.now))
+        self.queue.put(Item('high', priority=1, timestamp=self.now))
+
+        chosen = self.queue.reschedule(taken, lambda item: item.endpoint == 'LM')
+
+        self.assertEqual(chosen.name, 'high')
+        self.assertEqual(drain(self.queue), ['other-endpoint', 'low'])
+        self.queue.task_done()
+        self.queue.join()
+
+    def test_get_times_out_when_empty(self):
+        """Test that get raises Empty like queue.PriorityQueue"""
+        with self.assertRaises(Empty):
+            self.queue.get(timeout=0.01)
+        with self.assertRaises(Empty):
+            self.queue.get(block=False)
+
+if __name__ == '__main__':
+    unittest.main()
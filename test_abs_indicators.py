@@ -0,0 +1,59 @@
+import unittest
+import numpy as np
+import pandas as pd
+from abs_indicators import align_regions, compute_indicators, region_indicators
+
+def make_frame(series):
+    """Build a frame from {region: (first month, values)} with monthly periods"""
+    frames = [
+        pd.DataFrame({
+            'region': region,
+            'period': pd.date_range(first, periods=len(values), freq='MS'),
+            'value': values
+        })
+        for region, (first, values) in series.items()
+    ]
+    return pd.concat(frames, ignore_index=True)
+
+class TestAlignRegions(unittest.TestCase):
+    def test_dense_month_columns(self):
+        """Test that regions share one column per month, with gaps as NaN"""
+        frame = make_frame({'2': ('2024-02-01', [5.0, 6.0]), '1': ('2024-01-01', [1.0])})
+
+        matrix = align_regions(frame)
+
+        self.assertEqual(matrix.regions, ['2', '1'])
+        self.assertEqual(matrix.labels.tolist(), ['2024-01', '2024-02', '2024-03'])
+        np.testing.assert_array_equal(matrix.values, [[np.nan, 5.0, 6.0], [1.0, np.nan, np.nan]])
+
+class TestComputeIndicators(unittest.TestCase):
+    def test_changes_rolling_means_and_rank(self):
+        """Test every indicator against a direct computation"""
+        frame = make_frame({
+            'A': ('2023-01-01', list(np.arange(14.0))),
+            'B': ('2023-01-01', list(np.arange(12.0) * 2))
+        })
+
+        indicators = region_indicators(align_regions(frame))
+
+        self.assertEqual(indicators['A'], {
+            'latest_date': '2024-02', 'value': 13.0, 'month_on_month': 1.0, 'year_on_year': 12.0,
+            'rolling_mean_3': 12.0, 'rolling_mean_12': 7.5, 'rank': 2
+        })
+        self.assertEqual(indicators['B']['latest_date'], '2023-12')
+        self.assertIsNone(indicators['B']['year_on_year'])
+        self.assertEqual((indicators['B']['rolling_mean_12'], indicators['B']['rank']), (11.0, 1))
+
+    def test_missing_months_skipped(self):
+        """Test that a trailing missing value falls back to the last observation"""
+        frame = make_frame({'A': ('2024-01-01', [1.0, np.nan, 3.0, np.nan]), 'B': ('2024-01-01', [3.0] * 4)})
+
+        indicators = compute_indicators(align_regions(frame))
+
+        self.assertEqual(indicators['latest'].tolist(), [2, 3])
+        self.assertTrue(np.isnan(indicators['month_on_month'][0]))
+        self.assertEqual(indicators['rolling_mean_3'].tolist(), [2.0, 3.0])
+        self.assertEqual(indicators['rank'].tolist(), [1.0, 1.0])
+
+if __name__ == '__main__':
+    unittest.main()
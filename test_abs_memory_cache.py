@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import patch
+from abs_memory_cache import MemoryCache
+
+class TestMemoryCache(unittest.TestCase):
+    def test_byte_budget_evicts_lru(self):
+        """Test that the byte budget evicts the least recently used entry"""
+        cache = MemoryCache(max_bytes=300, shards=1)
+
+        cache.set('a', {'v': 1}, size=100)
+        cache.set('b', {'v': 2}, size=100)
+        cache.set('c', {'v': 3}, size=100)
+        cache.get('a')
+        cache.set('d', {'v': 4}, size=100)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), {'v': 1})
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(cache.stats()['bytes'], 300)
+
+    def test_expired_entries_evicted_first(self):
+        """Test that expired entries make room before live ones"""
+        cache = MemoryCache(max_bytes=200, shards=1)
+
+        cache.set('live', {'v': 1}, ttl=3600, size=100)
+        cache.set('expired', {'v': 2}, ttl=-1, size=100)
+        cache.set('new', {'v': 3}, size=100)
+
+        self.assertEqual(cache.get('live'), {'v': 1})
+        self.assertIsNone(cache.get_stale('expired'))
+        self.assertEqual(cache.stats()['evictions'], 0)
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_stale_entries_kept_for_grace_period(self):
+        """Test that expired entries stay revalidatable until the grace period ends"""
+        cache = MemoryCache(stale_ttl=60, shards=2)
+        cache.set('key', {'v': 1}, ttl=-1, validators={'etag': '"v1"'})
+
+        cache.clear_expired()
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.get_stale('key')[2], {'etag': '"v1"'})
+
+        with patch('abs_memory_cache.time.time', return_value=cache.get_stale('key')[1] + 61):
+            cache.clear_expired()
+        self.assertIsNone(cache.get_stale('key'))
+
+    def test_hit_and_miss_counters(self):
+        """Test that lookups are counted across shards"""
+        cache = MemoryCache(shards=4)
+        for i in range(8):
+            cache.set(f"key{i}", {'v': i})
+
+        for i in range(10):
+            cache.get(f"key{i}")
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (8, 2, 8))
+        self.assertGreater(stats['bytes'], 0)
+
+    def test_entries_larger_than_a_shard(self):
+        """Test that an entry over one shard's budget is cached within the total budget"""
+        cache = MemoryCache(max_bytes=1000, shards=4)
+        for i in range(8):
+            cache.set(f"key{i}", {'v': i}, size=100)
+
+        cache.set('wide', {'v': 'wide'}, validators={'etag': '"w"'}, size=700)
+
+        self.assertEqual(cache.get('wide'), {'v': 'wide'})
+        self.assertEqual(cache.get_stale('wide')[2], {'etag': '"w"'})
+        self.assertLessEqual(cache.stats()['bytes'], 1000)
+        self.assertEqual(cache.stats()['large_entries'], 1)
+
+        # Stored again at a regular size, it moves back to its own shard
+        cache.set('wide', {'v': 'narrow'}, size=10)
+        self.assertEqual(cache.get('wide'), {'v': 'narrow'})
+        self.assertEqual(cache.stats()['large_entries'], 0)
+
+    def test_entries_over_the_total_budget_dropped_with_warning(self):
+        """Test that only entries larger than the whole cache are dropped, with a warning"""
+        cache = MemoryCache(max_bytes=1000, shards=4)
+        with self.assertLogs(level='WARNING'):
+            cache.set('huge', {'v': 'huge'}, size=1001)
+
+        self.assertIsNone(cache.get('huge'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from abs_metrics import Metrics
+
+class TestMetrics(unittest.TestCase):
+    def test_snapshot(self):
+        """Test that counters, gauges and stage timings appear in snapshots"""
+        metrics = Metrics()
+        metrics.inc('requests', result='cache_hit')
+        metrics.inc('requests', result='cache_hit')
+        metrics.observe('http', 0.2)
+        metrics.observe('http', 0.4)
+        metrics.register_gauge('queue_depth', lambda: 3)
+
+        snapshot = metrics.snapshot()
+
+        self.assertEqual(snapshot['counters']['requests'], {'result=cache_hit': 2})
+        self.assertEqual(snapshot['gauges'], {'queue_depth': 3.0})
+        self.assertEqual(snapshot['stages']['http']['count'], 2)
+        self.assertAlmostEqual(snapshot['stages']['http']['avg_seconds'], 0.3)
+        self.assertAlmostEqual(snapshot['stages']['http']['max_seconds'], 0.4)
+
+    def test_prometheus_text(self):
+        """Test the Prometheus exposition of counters and cumulative histogram buckets"""
+        metrics = Metrics()
+        metrics.inc('upstream_errors', endpoint='LM', error=503)
+        with metrics.timed('decode'):
+            pass
+        metrics.observe('decode', 20.0)
+
+        lines = metrics.prometheus().splitlines()
+
+        self.assertIn('# TYPE abs_upstream_errors_total counter', lines)
+        self.assertIn('abs_upstream_errors_total{endpoint="LM",error="503"} 1', lines)
+        self.assertIn('abs_stage_seconds_bucket{stage="decode",le="0.001"} 1', lines)
+        self.assertIn('abs_stage_seconds_bucket{stage="decode",le="30"} 2', lines)
+        self.assertIn('abs_stage_seconds_count{stage="decode"} 2', lines)
+
+if __name__ == '__main__':
+    unittest.main()
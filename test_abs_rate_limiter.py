@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from abs_rate_limiter import TokenBucket, SharedTokenBucket, RateLimiter, AdaptiveRateLimiter
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_refill_rate(self):
+        """Test that a full bucket allows a burst and then spaces requests"""
+        bucket = TokenBucket(rate_per_minute=60, burst=3)
+
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(bucket.reserve(), 1.0, places=1)
+        self.assertAlmostEqual(bucket.reserve(), 2.0, places=1)
+
+    def test_try_acquire(self):
+        """Test that try_acquire never goes into debt"""
+        bucket = TokenBucket(rate_per_minute=60, burst=1)
+
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+        self.assertGreater(bucket.state()['seconds_until_token'], 0)
+
+class TestAdaptiveRateLimiter(unittest.TestCase):
+    def test_throttle_backs_off_and_recovers(self):
+        """Test that 429 halves the rate and successes recover it"""
+        limiter = AdaptiveRateLimiter(requests_per_minute=30, burst=1, recovery_step=5)
+
+        limiter.record_response('LM', 429, {})
+        self.assertEqual(limiter.state()['global']['rate_per_minute'], 15)
+        self.assertEqual(limiter.state()['throttled_count'], 1)
+
+        for _ in range(5):
+            limiter.record_response('LM', 200, {})
+        self.assertEqual(limiter.state()['global']['rate_per_minute'], 30)
+
+    def test_retry_after_pauses_requests(self):
+        """Test that Retry-After delays the next acquire"""
+        limiter = AdaptiveRateLimiter(requests_per_minute=600, burst=5)
+
+        limiter.record_response('LM', 429, {'Retry-After': '2'})
+
+        with patch('abs_rate_limiter.sleep') as mock_sleep:
+            slept = limiter.acquire('LM')
+        self.assertAlmostEqual(slept, 2.0, places=1)
+        mock_sleep.assert_called_once()
+
+    def test_endpoint_budget(self):
+        """Test that a per-endpoint budget is enforced on top of the global one"""
+        limiter = AdaptiveRateLimiter(requests_per_minute=600, burst=1, endpoint_limits={'LM': 60})
+
+        with patch('abs_rate_limiter.sleep'):
+            self.assertEqual(limiter.acquire('LM'), 0.0)
+            self.assertAlmostEqual(limiter.acquire('LM'), 1.0, places=1)
+            self.assertLess(limiter.acquire('CPI'), 0.5)
+
+    def test_limiters_must_implement_acquire(self):
+        """Test that a limiter without acquire fails when it is built"""
+        class Incomplete(RateLimiter):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+class TestSharedRateLimit(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_buckets_share_one_budget(self):
+        """Test that buckets on the same file draw from one set of tokens"""
+        path = os.path.join(self.tmpdir.name, 'global.bucket')
+        first = SharedTokenBucket(path, rate_per_minute=60, burst=2)
+        second = SharedTokenBucket(path, rate_per_minute=60, burst=2)
+
+        self.assertTrue(first.try_acquire())
+        self.assertTrue(second.try_acquire())
+        self.assertFalse(first.try_acquire())
+        self.assertAlmostEqual(second.reserve(), 1.0, places=1)
+
+    def test_backoff_and_pause_shared_across_limiters(self):
+        """Test that a 429 seen by one worker slows down the others"""
+        first = AdaptiveRateLimiter(requests_per_minute=30, burst=1, shared_dir=self.tmpdir.name)
+        second = AdaptiveRateLimiter(requests_per_minute=30, burst=1, shared_dir=self.tmpdir.name)
+
+        first.record_response('LM', 429, {'Retry-After': '5'})
+
+        self.assertEqual(second.state()['global']['rate_per_minute'], 15)
+        self.assertGreater(second.state()['paused_for'], 4)
+
+if __name__ == '__main__':
+    unittest.main()
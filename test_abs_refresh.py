@@ -0,0 +1,54 @@
+import unittest
+from concurrent.futures import Future
+from unittest.mock import MagicMock
+from abs_refresh import RefreshScheduler
+
+def done_future():
+    future = Future()
+    future.set_result(None)
+    return future
+
+class TestRefreshScheduler(unittest.TestCase):
+    def test_refreshes_hot_keys_ahead_of_expiry(self):
+        """Test that only frequently accessed keys close to expiry are refreshed, hottest first"""
+        scheduler = RefreshScheduler(refresh_ahead=60, max_per_cycle=2, min_hits=2)
+        refreshed = []
+        expiries = {'warm': 1000 + 30, 'hot': 1000 + 10, 'fresh': 1000 + 600, 'cold': 1000 + 5}
+        hits = {'warm': 2, 'hot': 5, 'fresh': 5, 'cold': 1}
+        for key, count in hits.items():
+            for _ in range(count):
+                scheduler.track(
+                    key,
+                    lambda key=key: refreshed.append(key) or done_future(),
+                    lambda key=key: expiries[key]
+                )
+
+        self.assertEqual(scheduler.run_once(now=1000), 2)
+        self.assertEqual(refreshed, ['hot', 'warm'])
+
+    def test_pending_refresh_not_repeated(self):
+        """Test that a key is not refreshed again while its refresh is running"""
+        scheduler = RefreshScheduler(min_hits=1)
+        pending = Future()
+        refresh = MagicMock(return_value=pending)
+        scheduler.track('key', refresh, lambda: None)
+
+        scheduler.run_once(now=1000)
+        scheduler.run_once(now=1001)
+
+        refresh.assert_called_once()
+
+    def test_release_calendar_triggers_refresh(self):
+        """Test that a published release refreshes keys of its dataflow"""
+        scheduler = RefreshScheduler(min_hits=1, release_calendar={'LM': [1500]})
+        scheduler.last_run = 1000
+        refresh = MagicMock(return_value=done_future())
+        scheduler.track('key', refresh, lambda: 1000 + 86400, group='LM')
+
+        scheduler.run_once(now=1400)
+        refresh.assert_not_called()
+        scheduler.run_once(now=1600)
+        refresh.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,20 @@
 import unittest
 import time
+import asyncio
+from threading import Event
 from unittest.mock import patch, MagicMock
-from abs_request_manager import get_request_manager, ABSRequestManager
+import requests
+from abs_request_manager import get_request_manager, ABSRequestManager, StaleResponse
+from abs_rate_limiter import AdaptiveRateLimiter
+from abs_circuit_breaker import CircuitOpenError
 
 class TestABSRequestManager(unittest.TestCase):
-    @patch.dict('os.environ', {'ABS_API_KEY': 'test_key', 'ABS_REQUESTS_PER_MINUTE': '30'})
+    @patch.dict('os.environ', {'ABS_API_KEY': 'test_key', 'ABS_REQUESTS_PER_MINUTE': '30',
+                               'ABS_RETRY_BASE_DELAY': '0.01'})
     def setUp(self):
         self.manager = get_request_manager()
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_rate_limiting(self, mock_get):
         """Test that requests are rate limited"""
         # Mock response
@@ -35,7 +41,7 @@ class TestABSRequestManager(unittest.TestCase):
         # Check that requests were processed with proper intervals
         self.assertEqual(len(responses), 5)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_caching(self, mock_get):
         """Test that responses are cached"""
         # Mock response
@@ -64,7 +70,7 @@ class TestABSRequestManager(unittest.TestCase):
         # Check that only one actual API call was made
         self.assertEqual(mock_get.call_count, 1)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_priority_queue(self, mock_get):
         """Test that high priority requests are processed first"""
         # Mock response
@@ -78,6 +84,10 @@ class TestABSRequestManager(unittest.TestCase):
         def callback(response):
             responses.append(response)
 
+        # Hold the upstream lane (as a Retry-After pause would) so the
+        # second request arrives while the first waits for its token
+        self.manager.rate_limiter.bucket.pause(1)
+
         # Queue requests with different priorities
         # Queue low priority request first
         self.manager.request(
@@ -102,9 +112,11 @@ class TestABSRequestManager(unittest.TestCase):
         # Check that requests were received
         self.assertEqual(len(responses), 2, "Expected 2 responses")
         
-        # Check that high priority request was processed first
-        first_response = responses[0]['params']['order']
-        second_response = responses[1]['params']['order']
+        # Check that high priority request was processed first (callbacks of
+        # parallel HTTP workers may finish in any order, so use fetch order)
+        fetched = [call.kwargs['params'] for call in mock_get.call_args_list]
+        first_response = fetched[0]['order']
+        second_response = fetched[1]['order']
         self.assertEqual(
             first_response,
             1,
@@ -116,5 +128,294 @@ class TestABSRequestManager(unittest.TestCase):
             f"Expected low priority (2) second, got {second_response}"
         )
 
+    @patch('requests.Session.get')
+    def test_inflight_coalescing(self, mock_get):
+        """Test that identical concurrent requests share one upstream fetch"""
+        release = Event()
+        def slow_get(url, headers, params, timeout):
+            release.wait(5)
+            return MagicMock(json=lambda: {'data': 'shared'})
+        mock_get.side_effect = slow_get
+
+        futures = [
+            self.manager.submit(endpoint='test_endpoint', params={'coalesce': 'value'})
+            for _ in range(3)
+        ]
+        release.set()
+        responses = [future.result(timeout=10) for future in futures]
+        self.manager.request_queue.join()
+
+        self.assertEqual(len(responses), 3)
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(self.manager.inflight, {})
+
+    @patch('requests.Session.get')
+    def test_cache_hit_answered_immediately(self, mock_get):
+        """Test that cache hits are delivered without queueing"""
+        params = {'cached': 'value'}
+        cache_key = self.manager._generate_cache_key('test_endpoint', params)
+        self.manager._cache_response(cache_key, {'data': 'cached'})
+
+        responses = []
+        self.manager.request(
+            endpoint='test_endpoint',
+            params=params,
+            callback=responses.append
+        )
+
+        self.assertEqual(responses, [{'data': 'cached'}])
+        mock_get.assert_not_called()
+
+    @patch('requests.Session.get')
+    def test_submit_returns_future(self, mock_get):
+        """Test that submit resolves a future with the response"""
+        mock_get.return_value = MagicMock(json=lambda: {'data': 'future'})
+
+        future = self.manager.submit(endpoint='test_endpoint', params={'submit': 'value'})
+
+        self.assertEqual(future.result(timeout=10), {'data': 'future'})
+
+    @patch('requests.Session.get')
+    def test_submit_propagates_errors(self, mock_get):
+        """Test that request failures are set on the future"""
+        mock_get.side_effect = requests.exceptions.ConnectionError('upstream down')
+
+        future = self.manager.submit(endpoint='test_endpoint', params={'submit': 'error'})
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            future.result(timeout=10)
+        self.assertEqual(self.manager.inflight, {})
+
+    @patch('requests.Session.get')
+    def test_submit_async(self, mock_get):
+        """Test that submit_async can be awaited from an event loop"""
+        mock_get.return_value = MagicMock(json=lambda: {'data': 'async'})
+
+        async def gather():
+            return await asyncio.gather(
+                self.manager.submit_async('test_endpoint', {'async': 1}),
+                self.manager.submit_async('test_endpoint', {'async': 2})
+            )
+
+        self.assertEqual(asyncio.run(gather()), [{'data': 'async'}, {'data': 'async'}])
+
+    @patch('requests.Session.get')
+    def test_expired_entry_revalidated_with_304(self, mock_get):
+        """Test that an expired entry is revalidated and its TTL extended on 304"""
+        params = {'revalidate': 'value'}
+        cache_key = self.manager._generate_cache_key('test_endpoint', params)
+        self.manager._cache_response(cache_key, {'data': 'stale'}, ttl=-1, validators={'etag': '"v1"', 'last_modified': None})
+        mock_get.return_value = MagicMock(status_code=304, headers={})
+
+        future = self.manager.submit(endpoint='test_endpoint', params=params)
+
+        self.assertEqual(future.result(timeout=10), {'data': 'stale'})
+        self.assertEqual(mock_get.call_args.kwargs['headers'], {'If-None-Match': '"v1"'})
+        self.assertEqual(self.manager.get_cached('test_endpoint', params), {'data': 'stale'})
+
+    def test_untracked_requests_not_refreshed(self):
+        """Test that requests submitted with track=False are not reported to the refresh scheduler"""
+        self.manager.prime_cache('test_endpoint', {'track': 'no'}, {'data': 'kept elsewhere'})
+        self.manager.prime_cache('test_endpoint', {'track': 'yes'}, {'data': 'refreshed'})
+
+        with patch.object(self.manager, 'refresh_scheduler') as scheduler:
+            self.manager.submit('test_endpoint', {'track': 'no'}, track=False).result(timeout=1)
+            self.manager.submit('test_endpoint', {'track': 'yes'}).result(timeout=1)
+
+        self.assertEqual(scheduler.track.call_count, 1)
+        self.assertIn('"yes"', scheduler.track.call_args.args[0])
+
+    @patch('requests.Session.get')
+    def test_stale_while_revalidate(self, mock_get):
+        """Test that an expired entry is served at once while one refresh runs"""
+        params = {'swr': 'value'}
+        cache_key = self.manager._generate_cache_key('test_endpoint', params)
+        self.manager._cache_response(cache_key, {'data': 'stale'}, ttl=-1)
+        release = Event()
+        def fresh_get(url, headers, params, timeout):
+            release.wait(5)
+            return MagicMock(json=lambda: {'data': 'fresh'})
+        mock_get.side_effect = fresh_get
+
+        with patch.object(self.manager, 'stale_while_revalidate', True):
+            first = self.manager.submit(endpoint='test_endpoint', params=params)
+            second = self.manager.submit(endpoint='test_endpoint', params=params)
+
+        self.assertEqual(first.result(timeout=0), {'data': 'stale'})
+        self.assertEqual(second.result(timeout=0), {'data': 'stale'})
+        self.assertIsInstance(first.result(), StaleResponse)
+        release.set()
+        self.assertEqual(first.result().refresh.result(timeout=10), {'data': 'fresh'})
+        self.assertEqual(second.result().refresh.result(timeout=10), {'data': 'fresh'})
+        deadline = time.time() + 10
+        while self.manager.get_cached('test_endpoint', params) != {'data': 'fresh'} and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(self.manager.get_cached('test_endpoint', params), {'data': 'fresh'})
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch('requests.Session.get')
+    def test_refresh_bypasses_fresh_cache(self, mock_get):
+        """Test that refresh() fetches even when a fresh copy is cached"""
+        params = {'refresh': 'value'}
+        self.manager.prime_cache('test_endpoint', params, {'data': 'old'})
+        mock_get.return_value = MagicMock(json=lambda: {'data': 'new'})
+
+        future = self.manager.refresh('test_endpoint', params)
+
+        self.assertEqual(future.result(timeout=10), {'data': 'new'})
+        self.assertEqual(self.manager.get_cached('test_endpoint', params), {'data': 'new'})
+
+    @patch('requests.Session.get')
+    def test_csv_response_streamed(self, mock_get):
+        """Test that SDMX-CSV responses are streamed into compact columns"""
+        response = MagicMock(status_code=200, headers={}, encoding=None)
+        response.iter_lines.return_value = iter(['REGION,TIME_PERIOD,OBS_VALUE', '2,2024-01,1.5'])
+        mock_get.return_value = response
+
+        future = self.manager.submit(endpoint='test_endpoint', params={'format': 'csv'})
+
+        self.assertEqual(future.result(timeout=10)['format'], 'sdmx-columns')
+        self.assertTrue(mock_get.call_args.kwargs['stream'])
+        self.assertEqual(mock_get.call_args.kwargs['headers']['Accept'], 'application/vnd.sdmx.data+csv')
+        response.json.assert_not_called()
+
+class TestABSRequestManagerWorkers(unittest.TestCase):
+    @patch.dict('os.environ', {'ABS_API_KEY': 'test_key', 'ABS_HTTP_WORKERS': '4',
+                               'ABS_RETRY_BASE_DELAY': '0.01', 'ABS_CIRCUIT_FAILURE_THRESHOLD': '3'})
+    def setUp(self):
+        self.manager = ABSRequestManager(
+            rate_limiter=AdaptiveRateLimiter(requests_per_minute=6000, burst=10)
+        )
+
+    @patch('requests.Session.get')
+    def test_requests_fetched_in_parallel(self, mock_get):
+        """Test that slow upstream calls overlap across HTTP workers"""
+        def slow_get(url, headers, params, timeout):
+            time.sleep(0.5)
+            return MagicMock(json=lambda: {'params': params})
+        mock_get.side_effect = slow_get
+
+        start = time.time()
+        futures = [
+            self.manager.submit(endpoint='test_endpoint', params={'parallel': i})
+            for i in range(4)
+        ]
+        for future in futures:
+            future.result(timeout=10)
+
+        self.assertLess(time.time() - start, 1.5)
+
+    @patch('requests.Session.get')
+    def test_abandoned_requests_dropped_before_fetch(self, mock_get):
+        """Test that cancelled and expired requests are dropped from the queue"""
+        release = Event()
+        def blocking_get(url, headers, params, timeout):
+            release.wait(5)
+            return MagicMock(json=lambda: {'params': params})
+        mock_get.side_effect = blocking_get
+        with patch.dict('os.environ', {'ABS_API_KEY': 'test_key', 'ABS_HTTP_WORKERS': '1'}):
+            manager = ABSRequestManager(
+                rate_limiter=AdaptiveRateLimiter(requests_per_minute=6000, burst=10)
+            )
+
+        # The only HTTP worker is busy, so the next requests stay queued
+        busy = manager.submit(endpoint='test_endpoint', params={'abandon': 'busy'})
+        cancelled = manager.submit(endpoint='test_endpoint', params={'abandon': 'cancelled'})
+        expired = manager.submit(endpoint='test_endpoint', params={'abandon': 'expired'}, deadline=time.time() + 0.2)
+        self.assertTrue(cancelled.cancel())
+        time.sleep(0.3)
+        release.set()
+
+        self.assertEqual(busy.result(timeout=10), {'params': {'abandon': 'busy'}})
+        with self.assertRaises(TimeoutError):
+            expired.result(timeout=10)
+        manager.request_queue.join()
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(manager.inflight, {})
+        self.assertEqual(manager.deadlines, {})
+
+    @patch('requests.Session.get')
+    def test_transient_errors_retried(self, mock_get):
+        """Test that timeouts and 5xx responses are retried until the fetch succeeds"""
+        server_error = requests.exceptions.HTTPError('503 Server Error', response=MagicMock(status_code=503))
+        mock_get.side_effect = [
+            requests.exceptions.Timeout('read timed out'),
+            MagicMock(raise_for_status=MagicMock(side_effect=server_error)),
+            MagicMock(json=lambda: {'data': 'recovered'})
+        ]
+
+        future = self.manager.submit(endpoint='test_endpoint', params={'retry': 'transient'})
+
+        self.assertEqual(future.result(timeout=10), {'data': 'recovered'})
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(self.manager.get_circuit_state()['state'], 'closed')
+
+    @patch('requests.Session.get')
+    def test_client_errors_fail_without_retry(self, mock_get):
+        """Test that a 4xx response reaches the error callback after one attempt"""
+        not_found = requests.exceptions.HTTPError('404 Not Found', response=MagicMock(status_code=404))
+        mock_get.return_value = MagicMock(raise_for_status=MagicMock(side_effect=not_found))
+        failed = Event()
+        errors = []
+
+        self.manager.request(
+            endpoint='test_endpoint',
+            params={'retry': 'client'},
+            callback=lambda response: self.fail('callback called for a failed request'),
+            error_callback=lambda error: errors.append(error) or failed.set()
+        )
+
+        self.assertTrue(failed.wait(5))
+        self.assertIs(errors[0], not_found)
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch('requests.Session.get')
+    def test_open_circuit_fails_fast_or_serves_stale(self, mock_get):
+        """Test that an open circuit rejects new requests at once unless a stale copy exists"""
+        mock_get.side_effect = requests.exceptions.ConnectionError('upstream down')
+        self.manager.prime_cache('test_endpoint', {'circuit': 'stale'}, {'data': 'stale'}, ttl=-1)
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.manager.submit(endpoint='test_endpoint', params={'circuit': 'trip'}).result(timeout=10)
+        self.assertEqual(self.manager.get_circuit_state()['state'], 'open')
+        calls = mock_get.call_count
+
+        with self.assertRaises(CircuitOpenError):
+            self.manager.submit(endpoint='test_endpoint', params={'circuit': 'new'}).result(timeout=0)
+        stale = self.manager.submit(endpoint='test_endpoint', params={'circuit': 'stale'})
+        self.assertEqual(stale.result(timeout=0), {'data': 'stale'})
+        self.assertEqual(mock_get.call_count, calls)
+
+    @patch('requests.Session.get')
+    def test_slow_callback_does_not_block_fetching(self, mock_get):
+        """Test that a blocking callback does not delay other requests"""
+        mock_get.side_effect = lambda url, headers, params, timeout: MagicMock(
+            json=lambda: {'params': params}
+        )
+        release = Event()
+        self.manager.request(
+            endpoint='test_endpoint',
+            params={'callback': 'slow'},
+            callback=lambda response: release.wait(5)
+        )
+
+        future = self.manager.submit(endpoint='test_endpoint', params={'callback': 'fast'})
+
+        self.assertEqual(future.result(timeout=2), {'params': {'callback': 'fast'}})
+        release.set()
+
+    @patch('requests.Session.get')
+    def test_threads_started_on_first_request(self, mock_get):
+        """Test that building the manager starts no threads until it is used"""
+        mock_get.return_value = MagicMock(json=lambda: {'data': 'lazy'})
+        self.assertFalse(self.manager.started)
+        self.assertIsNone(self.manager.processing_thread)
+
+        future = self.manager.submit(endpoint='test_endpoint', params={'lazy': 1})
+
+        self.assertEqual(future.result(timeout=2), {'data': 'lazy'})
+        self.assertTrue(self.manager.processing_thread.is_alive())
+        self.assertTrue(self.manager.cleanup_thread.is_alive())
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+from abs_result_cache import ResultCache
+
+class TestResultCache(unittest.TestCase):
+    def test_changed_dependency_invalidates(self):
+        """Test that a result is only served while its dependency versions match"""
+        cache = ResultCache()
+        cache.set('key', (1, 1), {'value': 1})
+
+        self.assertEqual(cache.get('key', (1, 1)), {'value': 1})
+        self.assertIsNone(cache.get('key', (1, 2)))
+        self.assertIsNone(cache.get('key', (1, 1)))
+        self.assertEqual(cache.stats()['invalidations'], 1)
+
+    def test_missing_dependency_not_cached(self):
+        """Test that results built without versioned data are not stored"""
+        cache = ResultCache()
+        cache.set('key', (1, None), {'value': 1})
+
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_lru_bound(self):
+        """Test that the least recently used result is dropped over max_entries"""
+        cache = ResultCache(max_entries=2)
+        for key in ('a', 'b'):
+            cache.set(key, (1,), key)
+        cache.get('a', (1,))
+        cache.set('c', (1,), 'c')
+
+        self.assertIsNone(cache.get('b', (1,)))
+        self.assertEqual(cache.get('a', (1,)), 'a')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,558 @@
+import unittest
+import time
+import json
+import gzip
+import base64
+import sys
+import http.client
+import subprocess
+import numpy as np
+from threading import Thread, Event
+import jsonrpclib
+import requests
+from concurrent.futures import Future
+from unittest.mock import patch, MagicMock
+from abs_rpc_server import ABSDataRetriever, ABSAnalyzer, LazyAnalyzer, ConcurrentJSONRPCServer, create_rpc_server
+from abs_sdmx import observation_columns
+from abs_result_cache import SerializedResult
+from abs_request_manager import StaleResponse
+from abs_structure import DataStructure, Dimension
+from abs_indicators import region_indicators
+
+
+def make_sdmx_response(region_codes, periods, value=lambda r, t: 100.0 * (r + 1) + t):
+    """Build a flat SDMX-JSON response with REGION and TIME_PERIOD dimensions"""
+    observations = {
+        f"0:{r}:{t}": [value(r, t)]
+        for r in range(len(region_codes))
+        for t in range(len(periods))
+    }
+    return {
+        'structure': {
+            'dimensions': {
+                'observation': [
+                    {'id': 'MEASURE', 'values': [{'id': 'M13'}]},
+                    {'id': 'REGION', 'values': [{'id': code} for code in region_codes]},
+                    {'id': 'TIME_PERIOD', 'values': [{'id': period} for period in periods]},
+                ]
+            }
+        },
+        'dataSets': [{'observations': observations}]
+    }
+
+
+class TestABSDataRetriever(unittest.TestCase):
+    @patch.dict('os.environ', {'ABS_API_KEY': 'test_key'})
+    def setUp(self):
+        self.manager = MagicMock()
+        self.manager.get_cached.return_value = None
+        with patch('abs_rpc_server.get_request_manager', return_value=self.manager):
+            self.retriever = ABSDataRetriever()
+
+    def test_split_by_region(self):
+        """Test that a multi-region response splits into single-region responses"""
+        raw = make_sdmx_response(['1', '2', '3GBRI'], ['2024-01', '2024-02'])
+
+        split = self.retriever._split_by_region(raw, ['1', '3GBRI'])
+
+        self.assertEqual(set(split), {'1', '3GBRI'})
+        brisbane = split['3GBRI']
+        region_dim = brisbane['structure']['dimensions']['observation'][1]
+        self.assertEqual(region_dim['values'], [{'id': '3GBRI'}])
+        _, indices, values = observation_columns(brisbane)
+        self.assertEqual(indices.tolist(), [[0, 0, 0], [0, 0, 1]])
+        self.assertEqual(values.tolist(), [300.0, 301.0])
+
+    def test_batch_primes_single_region_cache(self):
+        """Test that a batched query is issued once and cached per region"""
+        raw = make_sdmx_response(['1', '2'], ['2024-01'])
+        future = Future()
+        future.set_result(raw)
+        with patch.object(self.retriever, '_submit', return_value=future) as mock_submit:
+            results = self.retriever.get_labour_force_data_batch('2024-01', '2024-01', ['1', '2'])
+
+        mock_submit.assert_called_once()
+        self.assertEqual(mock_submit.call_args[0][0]['c[REGION]'], '1+2')
+        self.assertEqual(set(results), {'1', '2'})
+        # Later single-region requests are served without an upstream fetch
+        self.assertEqual(self.retriever._missing_ranges('2024-01', '2024-01', '1'), [])
+        self.assertEqual(self.retriever._missing_ranges('2024-01', '2024-01', '2'), [])
+
+    def test_abandoned_wait_cancels_requests(self):
+        """Test that giving up on a region's data cancels its queued requests"""
+        pending = Future()
+        self.manager.submit.return_value = pending
+        deadline = time.time() + 0.1
+
+        future = self.retriever.submit_labour_force_data('2024-01', '2024-02', '1', deadline)
+        with self.assertRaises(TimeoutError):
+            self.retriever.wait_for_response(future, deadline)
+
+        self.assertEqual(self.manager.submit.call_args.kwargs['deadline'], deadline)
+        self.assertTrue(future.cancelled())
+        self.assertTrue(pending.cancelled())
+
+    def test_only_missing_edge_months_are_fetched(self):
+        """Test that extending a cached range fetches only the new months"""
+        def respond(params, deadline=None, client=None):
+            periods = [f"2024-{m:02d}" for m in range(int(params['startPeriod'][5:]), int(params['endPeriod'][5:]) + 1)]
+            future = Future()
+            future.set_result(make_sdmx_response([params['c[REGION]']], periods))
+            return future
+
+        with patch.object(self.retriever, '_submit', side_effect=respond) as mock_submit:
+            self.retriever.get_labour_force_data('2024-01', '2024-06', '2')
+            data = self.retriever.get_labour_force_data('2024-01', '2024-07', '2')
+
+        self.assertEqual(mock_submit.call_count, 2)
+        narrowed = mock_submit.call_args_list[1][0][0]
+        self.assertEqual((narrowed['startPeriod'], narrowed['endPeriod']), ('2024-07', '2024-07'))
+        periods = [value['id'] for value in data['structure']['dimensions']['observation'][2]['values']]
+        self.assertEqual(periods, [f"2024-{m:02d}" for m in range(1, 8)])
+        self.assertEqual(len(observation_columns(data)[2]), 7)
+
+    def test_series_cache_entries_tracked_instead_of_raw_keys(self):
+        """Test that LM requests merged into the series cache leave refreshes to the series entries"""
+        future = Future()
+        future.set_result(make_sdmx_response(['2'], ['2024-01', '2024-02']))
+        self.manager.submit.return_value = future
+
+        self.retriever.get_labour_force_data('2024-01', '2024-02', '2')
+
+        self.assertFalse(self.manager.submit.call_args.kwargs['track'])
+        # Unfiltered requests keep the full response
+        self.assertEqual(self.manager.submit.call_args.kwargs['params']['detail'], 'Full')
+        tracked = self.manager.refresh_scheduler.track.call_args
+        self.assertEqual(tracked.args[0], ('series', 'LM', '2'))
+        self.assertIsNotNone(tracked.args[2]())
+
+    def test_series_cache_bounded_and_swept(self):
+        """Test that series entries are evicted least recently used first and expired ones are swept"""
+        series_cache = self.retriever.series_cache
+        self.manager.add_cleanup.assert_called_once_with(series_cache.clear_expired)
+        periods = ['2024-01', '2024-02']
+        # Two months of one series take 24 bytes (int32 months, float64 values)
+        series_cache.max_bytes = 60
+        for region in ('1', '2'):
+            series_cache.merge('LM', region, make_sdmx_response([region], periods), '2024-01', '2024-02')
+        series_cache.covered_range('LM', '1')
+        series_cache.merge('LM', '3', make_sdmx_response(['3'], periods), '2024-01', '2024-02')
+
+        self.assertEqual(set(series_cache.entries), {('LM', '1'), ('LM', '3')})
+        self.assertEqual(series_cache.bytes, 48)
+
+        series_cache.entries[('LM', '1')].created -= series_cache.ttl + 1
+        self.assertEqual(series_cache.clear_expired(), 1)
+        self.assertEqual(set(series_cache.entries), {('LM', '3')})
+        self.assertEqual(series_cache.bytes, 24)
+
+    def test_unpublished_months_stay_fetchable(self):
+        """Test that months beyond the last observation are not marked cached once their check expires"""
+        self.retriever.series_cache.empty_ttl = 0
+        future = Future()
+        future.set_result(make_sdmx_response(['2'], ['2024-01', '2024-02']))
+        with patch.object(self.retriever, '_submit', return_value=future):
+            self.retriever.get_labour_force_data('2024-01', '2024-03', '2')
+
+        self.assertEqual(
+            self.retriever._missing_ranges('2024-01', '2024-03', '2'),
+            [('2024-03', '2024-03')]
+        )
+
+    def test_unpublished_tail_answered_404(self):
+        """Test that a 404 for the months after the cached range serves the cached months"""
+        def respond(params, deadline=None, client=None):
+            future = Future()
+            if params['startPeriod'] > '2024-02':
+                future.set_exception(requests.HTTPError('NoRecordsFound', response=MagicMock(status_code=404)))
+            else:
+                regions = params['c[REGION]'].split('+')
+                future.set_result(make_sdmx_response(regions, ['2024-01', '2024-02']))
+            return future
+
+        self.retriever.series_cache.empty_ttl = 0
+        with patch.object(self.retriever, '_submit', side_effect=respond) as mock_submit:
+            self.retriever.get_labour_force_data('2024-01', '2024-03', '2')
+            self.retriever.get_labour_force_data_batch('2024-01', '2024-03', ['1', '3'])
+            single = self.retriever.get_labour_force_data('2024-01', '2024-03', '2')
+            batch = self.retriever.get_labour_force_data_batch('2024-01', '2024-03', ['1', '3'])
+            self.assertEqual(mock_submit.call_count, 4)
+            
+            # A checked tail is not asked for again until empty_ttl passes
+            self.retriever.series_cache.empty_ttl = 60
+            self.retriever.get_labour_force_data('2024-01', '2024-03', '2')
+            self.retriever.get_labour_force_data('2024-01', '2024-03', '2')
+        
+        self.assertEqual(mock_submit.call_count, 5)
+        tail = mock_submit.call_args_list[2][0][0]
+        self.assertEqual((tail['startPeriod'], tail['endPeriod']), ('2024-03', '2024-03'))
+        self.assertEqual(len(observation_columns(single)[2]), 2)
+        self.assertEqual(set(batch), {'1', '3'})
+
+    def test_stale_responses_not_cached_as_fresh(self):
+        """Test that stale-while-revalidate answers are served but only their refresh reaches the series cache"""
+        periods = ['2024-01', '2024-02']
+        refreshes = []
+        def respond(params, deadline=None, client=None):
+            regions = params['c[REGION]'].split('+')
+            refresh = Future()
+            refreshes.append((regions, refresh))
+            future = Future()
+            future.set_result(StaleResponse(make_sdmx_response(regions, periods, value=lambda r, t: 1.0), refresh))
+            return future
+
+        series_cache = self.retriever.series_cache
+        with patch.object(self.retriever, '_submit', side_effect=respond) as mock_submit:
+            single = self.retriever.get_labour_force_data('2024-01', '2024-02', '2')
+            batch = self.retriever.get_labour_force_data_batch('2024-01', '2024-02', ['1', '3'])
+            self.assertEqual(list(observation_columns(single)[2]), [1.0, 1.0])
+            self.assertEqual(set(batch), {'1', '3'})
+            for region in ('1', '2', '3'):
+                self.assertIsNone(series_cache.covered_range('LM', region))
+            
+            # The revalidated copies are merged as they arrive
+            for regions, refresh in refreshes:
+                refresh.set_result(make_sdmx_response(regions, periods, value=lambda r, t: 2.0))
+            single = self.retriever.get_labour_force_data('2024-01', '2024-02', '2')
+            batch = self.retriever.get_labour_force_data_batch('2024-01', '2024-02', ['1', '3'])
+        
+        self.assertEqual(mock_submit.call_count, 2)
+        self.assertEqual(list(observation_columns(single)[2]), [2.0, 2.0])
+        self.assertEqual(list(observation_columns(batch['3'])[2]), [2.0, 2.0])
+
+
+class TestABSAnalyzer(unittest.TestCase):
+    @patch.dict('os.environ', {'ABS_API_KEY': 'test_key'})
+    def setUp(self):
+        manager = MagicMock()
+        manager.get_cached.return_value = None
+        with patch('abs_rpc_server.get_request_manager', return_value=manager):
+            self.analyzer = ABSAnalyzer()
+
+    def test_analyze_labour_force(self):
+        """Test latest values, changes and time series across regions"""
+        periods = ['2024-01', '2024-02', '2024-03']
+        raw = make_sdmx_response(['1', '2'], periods)
+        future = Future()
+        future.set_result(raw)
+        with patch.object(self.analyzer.data_retriever, '_submit', return_value=future):
+            result = self.analyzer.analyze_labour_force({
+                'start_date': '2024-01',
+                'end_date': '2024-03',
+                'selected_regions': ['1', '2']
+            })
+
+        self.assertEqual(result['latest_date'], '2024-03')
+        region = result['regions']['2']
+        self.assertEqual((region['current'], region['changes']), ({'value': 202.0}, {'value': 1.0}))
+        self.assertEqual(region['indicators'], {
+            'latest_date': '2024-03', 'value': 202.0, 'month_on_month': 1.0, 'year_on_year': None,
+            'rolling_mean_3': 201.0, 'rolling_mean_12': None, 'rank': 1
+        })
+        self.assertEqual(result['regions']['1']['indicators']['rank'], 2)
+        self.assertEqual(
+            result['time_series']['1'],
+            [{'date': period, 'value': 100.0 + t} for t, period in enumerate(periods)]
+        )
+
+
+    def test_columnar_and_binary_series_formats(self):
+        """Test that the opt-in wire formats carry the same series"""
+        periods = ['2024-01', '2024-02']
+        future = Future()
+        future.set_result(make_sdmx_response(['1'], periods))
+        params = {'start_date': '2024-01', 'end_date': '2024-02', 'selected_regions': ['1']}
+        with patch.object(self.analyzer.data_retriever, '_submit', return_value=future):
+            columnar = self.analyzer.analyze_labour_force({**params, 'series_format': 'columnar'})
+            binary = self.analyzer.analyze_labour_force({**params, 'series_format': 'binary'})
+
+        self.assertEqual(columnar['time_series']['1'], {'dates': periods, 'values': [100.0, 101.0]})
+        encoded = binary['time_series']['1']
+        months = np.frombuffer(base64.b64decode(encoded['dates']), dtype='<i4')
+        values = np.frombuffer(base64.b64decode(encoded['values']), dtype='<f8')
+        self.assertEqual(list(months.astype('datetime64[M]').astype(str)), periods)
+        self.assertEqual(values.tolist(), [100.0, 101.0])
+
+    def test_indicators_shared_across_series_options(self):
+        """Test that indicators are computed once per region set and range"""
+        future = Future()
+        future.set_result(make_sdmx_response(['1', '2'], ['2024-01', '2024-02']))
+        params = {'start_date': '2024-01', 'end_date': '2024-02', 'selected_regions': ['1', '2']}
+        with patch.object(self.analyzer.data_retriever, '_submit', return_value=future), \
+                patch('abs_indicators.region_indicators', wraps=region_indicators) as mock_indicators:
+            records = self.analyzer.analyze_labour_force(params)
+            columnar = self.analyzer.analyze_labour_force({**params, 'series_format': 'columnar', 'max_points': 4})
+
+        mock_indicators.assert_called_once()
+        self.assertEqual(columnar['regions'], records['regions'])
+
+    def test_resampled_and_downsampled_series(self):
+        """Test that resample and max_points shrink only the time series"""
+        periods = [f"{year}-{month:02d}" for year in (2022, 2023) for month in range(1, 13)]
+        future = Future()
+        future.set_result(make_sdmx_response(['1'], periods))
+        params = {'start_date': '2022-01', 'end_date': '2023-12', 'selected_regions': ['1']}
+        with patch.object(self.analyzer.data_retriever, '_submit', return_value=future):
+            quarterly = self.analyzer.analyze_labour_force({**params, 'resample': 'quarterly', 'resample_method': 'last'})
+            reduced = self.analyzer.analyze_labour_force({**params, 'max_points': 6})
+            with self.assertRaises(ValueError):
+                self.analyzer.analyze_labour_force({**params, 'resample': 'weekly'})
+
+        self.assertEqual(quarterly['time_series_resolution'], 'quarterly')
+        self.assertEqual(quarterly['time_series']['1'][0], {'date': '2022-Q1', 'value': 102.0})
+        self.assertEqual(len(quarterly['time_series']['1']), 8)
+        self.assertEqual(quarterly['regions']['1']['current']['value'], 123.0)
+        series = reduced['time_series']['1']
+        self.assertLessEqual(len(series), 6)
+        self.assertEqual((series[0]['date'], series[-1]['date']), ('2022-01', '2023-12'))
+
+    def test_dimension_selection(self):
+        """Test that selected dimensions are filtered upstream and kept apart in the caches"""
+        periods = ['2024-01', '2024-02']
+        raw = make_sdmx_response(['1'], periods)
+        raw['structure']['dimensions']['observation'][0]['values'].append({'id': 'M16'})
+        raw['dataSets'][0]['observations'].update({f"1:0:{t}": [900.0] for t in range(len(periods))})
+        future = Future()
+        future.set_result(raw)
+        structure = DataStructure('LM', [
+            Dimension('MEASURE', 0, {'M13': 0, 'M16': 1}),
+            Dimension('REGION', 1, {'1': 0})
+        ])
+        params = {'start_date': '2024-01', 'end_date': '2024-02', 'selected_regions': ['1']}
+        with patch.object(self.analyzer.data_retriever.structures, 'get', return_value=structure) as mock_get, \
+                patch.object(self.analyzer.data_retriever, '_submit', return_value=future) as mock_submit:
+            selected = self.analyzer.analyze_labour_force({**params, 'dimensions': {'MEASURE': 'M13'}, 'timeout': 5})
+            with self.assertRaises(ValueError):
+                self.analyzer.analyze_labour_force({**params, 'dimensions': {'MEASURE': 'M99'}})
+
+        # The structure lookup waits no longer than the client's budget
+        self.assertLessEqual(mock_get.call_args_list[0].args[1], 5)
+        upstream_params = mock_submit.call_args.args[0]
+        self.assertEqual(upstream_params['c[MEASURE]'], 'M13')
+        self.assertEqual(upstream_params['detail'], 'dataonly')
+        self.assertEqual([point['value'] for point in selected['time_series']['1']], [100.0, 101.0])
+        series_cache = self.analyzer.data_retriever.series_cache
+        self.assertIsNone(series_cache.covered_range('LM', '1'))
+        self.assertEqual(series_cache.covered_range('LM/M13.', '1'), ('2024-01', '2024-02'))
+
+    def test_repeat_analysis_served_from_result_cache(self):
+        """Test that a repeat request skips processing until a region's data changes"""
+        periods = ['2024-01', '2024-02']
+        future = Future()
+        future.set_result(make_sdmx_response(['1', '2'], periods))
+        params = {'start_date': '2024-01', 'end_date': '2024-02', 'selected_regions': ['2', '1']}
+        with patch.object(self.analyzer.data_retriever, '_submit', return_value=future):
+            first = self.analyzer.analyze_labour_force(params)
+            with patch.object(self.analyzer, '_process_region_data') as mock_process:
+                repeat = self.analyzer.analyze_labour_force({**params, 'selected_regions': ['1', '2', '1']})
+            mock_process.assert_not_called()
+            self.assertIs(repeat, first)
+            self.assertEqual(json.loads(repeat.serialized), json.loads(json.dumps(dict(first))))
+
+            # Refreshed region data invalidates the stored result
+            self.analyzer.data_retriever.series_cache.merge(
+                'LM', '1', make_sdmx_response(['1'], periods, value=lambda r, t: 500.0 + t), '2024-01', '2024-02'
+            )
+            refreshed = self.analyzer.analyze_labour_force(params)
+        self.assertIsNot(refreshed, first)
+        self.assertEqual(refreshed['regions']['1']['current']['value'], 501.0)
+
+    def test_results_cached_under_versions_they_were_built_from(self):
+        """Test that a merge landing while a result is aggregated is not masked by the result cache"""
+        periods = ['2024-01', '2024-02']
+        future = Future()
+        future.set_result(make_sdmx_response(['1', '2'], periods))
+        params = {'start_date': '2024-01', 'end_date': '2024-02', 'selected_regions': ['1', '2']}
+        series_cache = self.analyzer.data_retriever.series_cache
+        aggregate = self.analyzer._aggregate_results
+        
+        def refresh_during_aggregation(*args, **kwargs):
+            series_cache.merge(
+                'LM', '1', make_sdmx_response(['1'], periods, value=lambda r, t: 500.0 + t), '2024-01', '2024-02'
+            )
+            return aggregate(*args, **kwargs)
+        
+        with patch.object(self.analyzer.data_retriever, '_submit', return_value=future):
+            with patch.object(self.analyzer, '_aggregate_results', side_effect=refresh_during_aggregation):
+                first = self.analyzer.analyze_labour_force(params)
+            repeat = self.analyzer.analyze_labour_force(params)
+        
+        self.assertEqual(first['regions']['1']['current']['value'], 101.0)
+        self.assertEqual(repeat['regions']['1']['current']['value'], 501.0)
+
+    def test_unknown_series_format_rejected(self):
+        """Test that an unsupported format fails before fetching"""
+        with patch.object(self.analyzer.data_retriever, '_submit') as mock_submit:
+            with self.assertRaises(ValueError):
+                self.analyzer.analyze_labour_force({
+                    'start_date': '2024-01', 'end_date': '2024-02',
+                    'selected_regions': ['1'], 'series_format': 'xml'
+                })
+        mock_submit.assert_not_called()
+
+
+class TestLazyStartup(unittest.TestCase):
+    def test_import_does_not_load_pandas_or_configure(self):
+        """Test that importing the server leaves numpy, pandas, logging and .env for later"""
+        code = (
+            "import sys, logging, abs_rpc_server; "
+            "print('numpy' in sys.modules, 'pandas' in sys.modules, bool(logging.getLogger().handlers))"
+        )
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+
+        self.assertEqual(output.stdout.split(), ['False', 'False', 'False'])
+
+    def test_analyzer_built_once_on_first_use(self):
+        """Test that the analyzer is built by the first call that needs it"""
+        analyzer = MagicMock()
+        analyzer.data_retriever.request_manager.started = False
+        analyzer.data_retriever.request_manager.get_circuit_state.return_value = {'state': 'closed'}
+        factory = MagicMock(return_value=analyzer)
+        lazy = LazyAnalyzer(factory)
+        self.assertEqual(lazy.health()['analyzer'], 'idle')
+
+        lazy.analyze_labour_force({'start_date': '2024-01'})
+        lazy.get_metrics()
+
+        factory.assert_called_once()
+        analyzer.analyze_labour_force.assert_called_once_with({'start_date': '2024-01'})
+        self.assertEqual(lazy.health()['analyzer'], 'loaded')
+        self.assertTrue(lazy.health()['ready'])
+
+    def test_failed_build_reported_not_ready(self):
+        """Test that a failing analyzer build makes the server not ready"""
+        lazy = LazyAnalyzer(MagicMock(side_effect=ValueError('bad config')))
+
+        lazy.warm_up().join(5)
+
+        health = lazy.health()
+        self.assertFalse(health['ready'])
+        self.assertEqual((health['analyzer'], health['error']), ('failed', 'bad config'))
+
+    @patch.dict('os.environ', {'ABS_API_KEY': 'test_key'})
+    def test_get_regions_served_before_analyzer_is_built(self):
+        """Test that a new server answers get_regions and probes without building the analyzer"""
+        with patch('abs_rpc_server.ABSAnalyzer.__init__') as mock_init:
+            server = create_rpc_server('localhost', 0, warm_up=False)
+            server.logRequests = False
+            Thread(target=server.serve_forever, daemon=True).start()
+            try:
+                port = server.server_address[1]
+                regions = jsonrpclib.ServerProxy(f"http://localhost:{port}").get_regions()
+                connection = http.client.HTTPConnection('localhost', port)
+                connection.request('GET', '/readyz')
+                response = connection.getresponse()
+                health = json.loads(response.read())
+            finally:
+                server.shutdown()
+                server.server_close()
+            mock_init.assert_not_called()
+
+        self.assertIn({"code": "0", "name": "Australia", "state": "Australia"}, regions['regions'])
+        self.assertEqual(response.status, 200)
+        self.assertEqual((health['ready'], health['analyzer']), (True, 'idle'))
+
+
+class TestConcurrentJSONRPCServer(unittest.TestCase):
+    def setUp(self):
+        self.release = Event()
+        self.server = ConcurrentJSONRPCServer(
+            ('localhost', 0),
+            workers=2,
+            max_pending=2,
+            slow_methods=['slow'],
+            slow_workers=1,
+            slow_max_pending=0,
+            logRequests=False
+        )
+        self.server.register_function(lambda: self.release.wait(5), 'slow')
+        self.server.register_function(lambda: 'pong', 'ping')
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://localhost:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.release.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_cheap_methods_not_blocked_by_slow_lane(self):
+        """Test that cheap calls answer while the slow lane is full and extra slow calls are rejected"""
+        Thread(target=lambda: jsonrpclib.ServerProxy(self.url).slow(), daemon=True).start()
+        time.sleep(0.2)
+
+        start = time.time()
+        self.assertEqual(jsonrpclib.ServerProxy(self.url).ping(), 'pong')
+        self.assertLess(time.time() - start, 1)
+
+        with self.assertRaises(jsonrpclib.ProtocolError) as raised:
+            jsonrpclib.ServerProxy(self.url).slow()
+        self.assertIn('busy', str(raised.exception))
+
+    def test_prometheus_metrics_endpoint(self):
+        """Test that call counters and stage timings are exposed at /metrics"""
+        jsonrpclib.ServerProxy(self.url).ping()
+
+        connection = http.client.HTTPConnection('localhost', self.server.server_address[1])
+        connection.request('GET', '/metrics')
+        response = connection.getresponse()
+        text = response.read().decode('utf-8')
+
+        self.assertEqual(response.status, 200)
+        self.assertIn('abs_rpc_calls_total{method="ping"}', text)
+        self.assertIn('abs_stage_seconds_count{method="ping",stage="rpc"}', text)
+
+    def test_unknown_methods_share_one_label(self):
+        """Test that unregistered method names never become metric labels"""
+        for method in ('no_such_method', 'another_one'):
+            with self.assertRaises(jsonrpclib.ProtocolError):
+                getattr(jsonrpclib.ServerProxy(self.url), method)()
+
+        connection = http.client.HTTPConnection('localhost', self.server.server_address[1])
+        connection.request('GET', '/metrics')
+        text = connection.getresponse().read().decode('utf-8')
+
+        self.assertIn('abs_rpc_calls_total{method="unknown"}', text)
+        self.assertNotIn('no_such_method', text)
+        self.assertNotIn('another_one', text)
+
+    def test_health_probes(self):
+        """Test that liveness always answers and readiness follows the health check"""
+        def get(path):
+            connection = http.client.HTTPConnection('localhost', self.server.server_address[1])
+            connection.request('GET', path)
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+
+        self.assertEqual(get('/healthz'), (200, {'status': 'ok'}))
+        self.assertEqual(get('/readyz')[0], 200)
+
+        self.server.health_check = lambda: {'status': 'error', 'ready': False}
+        self.assertEqual(get('/readyz'), (503, {'status': 'error', 'ready': False}))
+        self.assertEqual(get('/healthz')[0], 200)
+
+        self.server.health_check = None
+        self.server.draining = True
+        self.assertEqual(get('/readyz'), (503, {'status': 'draining', 'ready': False}))
+
+    def test_serialized_results_written_as_is(self):
+        """Test that pre-serialized results are spliced into the response"""
+        result = SerializedResult({'value': 1}, b'{"value":2}')
+        self.server.register_function(lambda: result, 'memoized')
+
+        self.assertEqual(jsonrpclib.ServerProxy(self.url).memoized(), {'value': 2})
+
+    def test_large_responses_gzipped(self):
+        """Test that responses are gzipped for clients accepting gzip"""
+        self.server.register_function(lambda: list(range(2000)), 'numbers')
+        body = json.dumps({'jsonrpc': '2.0', 'method': 'numbers', 'params': [], 'id': 1})
+
+        connection = http.client.HTTPConnection('localhost', self.server.server_address[1])
+        connection.request('POST', '/', body, {'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'})
+        response = connection.getresponse()
+
+        self.assertEqual(response.getheader('Content-Encoding'), 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.read()))['result'], list(range(2000)))
+
+
+if __name__ == '__main__':
+    unittest.main()
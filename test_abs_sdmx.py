@@ -0,0 +1,90 @@
+import unittest
+import numpy as np
+from abs_sdmx import decode_observations, observation_columns, read_sdmx_csv, select_observations
+
+def make_payload(observations):
+    return {
+        'structure': {
+            'dimensions': {
+                'observation': [
+                    {'id': 'MEASURE', 'values': [{'id': 'M13'}, {'id': 'M3'}]},
+                    {'id': 'REGION', 'values': [{'id': '2'}]},
+                    {'id': 'TIME_PERIOD', 'values': [{'id': '2024-02'}, {'id': '2024-01'}]},
+                ]
+            }
+        },
+        'dataSets': [{'observations': observations}]
+    }
+
+class TestDecodeObservations(unittest.TestCase):
+    def test_typed_columns_sorted_by_period(self):
+        """Test that keys map through the structure to periods and series"""
+        df = decode_observations(make_payload({
+            '0:0:0': [2.0],
+            '0:0:1': [1.0],
+            '1:0:0': [20.0],
+            '1:0:1': [10.0],
+        }))
+
+        self.assertEqual(df['value'].dtype, np.float64)
+        self.assertEqual(df['period'].dtype.kind, 'M')
+        self.assertEqual(list(df['date'].astype(str)), ['2024-01', '2024-01', '2024-02', '2024-02'])
+        self.assertEqual(list(df['value']), [1.0, 10.0, 2.0, 20.0])
+        self.assertEqual(list(df['series'].astype(str)), ['M13', 'M3', 'M13', 'M3'])
+
+    def test_missing_values_become_nan(self):
+        """Test that null observations decode to NaN"""
+        df = decode_observations(make_payload({'0:0:0': [None], '0:0:1': [1.5]}))
+
+        self.assertEqual(df['value'].isna().tolist(), [False, True])
+
+    def test_requires_time_dimension(self):
+        """Test that payloads without TIME_PERIOD are rejected"""
+        payload = make_payload({'0:0:0': [1.0]})
+        payload['structure']['dimensions']['observation'].pop()
+
+        with self.assertRaises(ValueError):
+            decode_observations(payload)
+
+class TestSelectObservations(unittest.TestCase):
+    def test_unselected_codes_dropped(self):
+        """Test that observations outside the selection are removed"""
+        payload = make_payload({'0:0:0': [2.0], '0:0:1': [1.0], '1:0:0': [20.0]})
+
+        selected = decode_observations(select_observations(payload, {'MEASURE': ['M3']}))
+
+        self.assertEqual(list(selected['value']), [20.0])
+
+    def test_matching_payload_returned_unchanged(self):
+        """Test that a payload already limited to the selection is not copied"""
+        payload = make_payload({'0:0:0': [2.0]})
+
+        self.assertIs(select_observations(payload, {'REGION': ['2'], 'SEX': ['3']}), payload)
+
+class TestReadSDMXCSV(unittest.TestCase):
+    def test_streams_rows_into_columns(self):
+        """Test that SDMX-CSV rows decode like the equivalent SDMX-JSON"""
+        lines = iter([
+            'DATAFLOW,MEASURE: Measure,REGION,TIME_PERIOD,OBS_VALUE,OBS_STATUS',
+            'ABS:LF(1.0.0),M13: Unemployment rate,2,2024-02,2.0,',
+            'ABS:LF(1.0.0),M13: Unemployment rate,2,2024-01,1.0,',
+            'ABS:LF(1.0.0),M3: Employed,2,2024-01,,',
+        ])
+
+        payload = read_sdmx_csv(lines)
+        dimensions, indices, values = observation_columns(payload)
+
+        self.assertEqual([dim['id'] for dim in dimensions], ['MEASURE', 'REGION', 'TIME_PERIOD'])
+        self.assertEqual(indices.tolist(), [[0, 0, 0], [0, 0, 1], [1, 0, 1]])
+        self.assertTrue(np.isnan(values[2]))
+        df = decode_observations(payload)
+        self.assertEqual(list(df['series'].astype(str)), ['M13', 'M3', 'M13'])
+
+    def test_header_only(self):
+        """Test that a response without rows yields an empty payload"""
+        payload = read_sdmx_csv(iter(['DATAFLOW,REGION,TIME_PERIOD,OBS_VALUE']))
+
+        self.assertEqual(len(observation_columns(payload)[2]), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+from concurrent.futures import Future
+from unittest.mock import MagicMock
+from abs_structure import DataStructure, StructureRegistry
+
+def make_structure_message():
+    """SDMX-JSON structure message for a small LM-like dataflow"""
+    def dimension(dimension_id, position, codelist):
+        return {
+            'id': dimension_id,
+            'position': position,
+            'localRepresentation': {
+                'enumeration': f"urn:sdmx:org.sdmx.infomodel.codelist.Codelist=ABS:{codelist}(1.0.0)"
+            }
+        }
+    return {
+        'data': {
+            'dataStructures': [{
+                'id': 'LM',
+                'dataStructureComponents': {
+                    'dimensionList': {
+                        'dimensions': [
+                            dimension('MEASURE', 0, 'CL_MEASURE'),
+                            dimension('SEX', 1, 'CL_SEX'),
+                            dimension('REGION', 2, 'CL_REGION'),
+                            dimension('FREQ', 3, 'CL_FREQ')
+                        ],
+                        'timeDimensions': [{'id': 'TIME_PERIOD', 'position': 4}]
+                    }
+                }
+            }],
+            'codelists': [
+                {'id': 'CL_MEASURE', 'codes': [{'id': 'M13'}, {'id': 'M16'}]},
+                {'id': 'CL_SEX', 'codes': [{'id': '1'}, {'id': '2'}, {'id': '3'}]},
+                {'id': 'CL_REGION', 'codes': [{'id': '1'}, {'id': '2'}]},
+                {'id': 'CL_FREQ', 'codes': [{'id': 'M'}]}
+            ]
+        }
+    }
+
+class TestDataStructure(unittest.TestCase):
+    def setUp(self):
+        self.structure = DataStructure.from_sdmx_json('LM', make_structure_message())
+
+    def test_index_positions_and_codes(self):
+        """Test that dimensions and codes are indexed by position"""
+        self.assertEqual(self.structure.positions, {'MEASURE': 0, 'SEX': 1, 'REGION': 2, 'FREQ': 3})
+        self.assertEqual(self.structure.dimension('SEX').codes, {'1': 0, '2': 1, '3': 2})
+
+    def test_selection_builds_data_key(self):
+        """Test that a selection becomes a data key and upstream filters in structure order"""
+        selection = self.structure.select({'SEX': '2+1', 'MEASURE': ['M13'], 'FREQ': 'M'})
+
+        self.assertEqual(selection.key, 'M13.1+2..M')
+        self.assertEqual(selection.series_id, 'LM/M13.1+2..M')
+        self.assertEqual(selection.filters(), {'c[MEASURE]': 'M13', 'c[SEX]': '1+2', 'c[FREQ]': 'M'})
+        self.assertEqual(selection, self.structure.select({'MEASURE': 'M13', 'FREQ': 'M', 'SEX': '1+2'}))
+
+    def test_invalid_selections_rejected(self):
+        """Test that unknown dimensions and codes, and REGION, are rejected"""
+        for selection in ({'AGE': '1599'}, {'SEX': '9'}, {'REGION': '1'}, {'SEX': ''}):
+            with self.assertRaises(ValueError):
+                self.structure.select(selection)
+
+class TestStructureRegistry(unittest.TestCase):
+    def setUp(self):
+        self.manager = MagicMock()
+        future = Future()
+        future.set_result(make_structure_message())
+        self.manager.submit.return_value = future
+
+    def test_structure_fetched_once_and_cached(self):
+        """Test that the structure is fetched once and reused until it expires"""
+        registry = StructureRegistry(self.manager, url='http://abs.test/datastructure')
+
+        registry.select('LM', {'MEASURE': 'M13'})
+        registry.select('LM', {'SEX': '3'})
+
+        self.manager.submit.assert_called_once()
+        self.assertEqual(self.manager.submit.call_args.kwargs['endpoint'], 'http://abs.test/datastructure/ABS/LM')
+
+    def test_expired_structure_used_when_refresh_fails(self):
+        """Test that an expired structure is kept if it cannot be refreshed"""
+        registry = StructureRegistry(self.manager, ttl=-1)
+        structure = registry.get('LM')
+        failed = Future()
+        failed.set_exception(ConnectionError('upstream down'))
+        self.manager.submit.return_value = failed
+
+        self.assertIs(registry.get('LM'), structure)
+
+    def test_fetch_bounded_by_timeout(self):
+        """Test that a slow structure fetch gives up at the caller's timeout and is dropped"""
+        pending = Future()
+        self.manager.submit.return_value = pending
+        registry = StructureRegistry(self.manager)
+
+        with self.assertRaises(TimeoutError):
+            registry.get('LM', timeout=0.05)
+
+        self.assertIsNotNone(self.manager.submit.call_args.kwargs['deadline'])
+        self.assertTrue(pending.cancelled())
+
+if __name__ == '__main__':
+    unittest.main()
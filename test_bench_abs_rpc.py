@@ -0,0 +1,33 @@
+import unittest
+from bench_abs_rpc import run_benchmark, build_queries, build_sdmx_json
+from abs_sdmx import decode_observations
+import json
+
+class TestBenchmark(unittest.TestCase):
+    def test_stub_payload_decodes(self):
+        """Test that stub payloads are valid SDMX-JSON for the decoder"""
+        raw = json.loads(build_sdmx_json(('1', '2'), '2024-01', '2024-03', 2, 1))
+
+        df = decode_observations(raw)
+
+        self.assertEqual(len(df), 2 * 2 * 3)
+        self.assertEqual(sorted(df['series'].astype(str).unique()), ['M1', 'M2'])
+
+    def test_queries_are_deterministic(self):
+        """Test that the same seed yields the same workload"""
+        self.assertEqual(build_queries(5, 3, 12, seed=1), build_queries(5, 3, 12, seed=1))
+
+    def test_cold_and_warm_phases(self):
+        """Test an end-to-end run against the stub server"""
+        result = run_benchmark(queries=4, regions_per_call=2, months=6, concurrency=2,
+                               warm_rounds=1, latency=0)
+
+        cold, warm = result['phases']['cold'], result['phases']['warm']
+        self.assertEqual((cold['errors'], warm['errors']), (0, 0))
+        self.assertGreater(cold['upstream_calls'], 0)
+        self.assertEqual(warm['upstream_calls'], 0)
+        self.assertIn('p99', warm['latency_ms'])
+        self.assertIn('aggregate_results', warm['server_stages'])
+
+if __name__ == '__main__':
+    unittest.main()